@@ -1,91 +1,53 @@
 import cv2
-import pyautogui
 import mediapipe as mp
-import time
 
-cap = cv2.VideoCapture(0)
+from board import config
+from capture import CameraSource
+from inputbus import InputBus, GestureProducer, KeyInjector, ONE_PLAYER_ZONES
+from calibration import load as load_calibration
+from vision import VisionWorker, draw_hands
 
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 80) 
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 60)
+# Drives an external Tetris through key presses, using the same gesture
+# pipeline as the built-in game: camera -> vision thread -> debounced
+# gestures -> input bus -> key injector.
 
+# Unmirrored frames, as this script has always read them: the key
+# injector's left/right zones are laid out for the camera's own view
+source = CameraSource(0, 80, 60, flip=False)
 
 mp_hands = mp.solutions.hands
 hands_detector = mp_hands.Hands(static_image_mode=False, max_num_hands=1,
                        min_detection_confidence=0.8, min_tracking_confidence=0.5)
 
-mp_drawing = mp.solutions.drawing_utils
+vision = VisionWorker(source, hands_detector)
+vision.start()
+
+# Gestures are debounced over a few frames; held moves and drops repeat on a
+# schedule, rotate fires once per pointing gesture
+bus = InputBus()
+bus.subscribe(KeyInjector())
+gestures = GestureProducer(bus, ONE_PLAYER_ZONES, config['gesture_window'],
+                           config['gesture_enter'], config['gesture_release'], {
+                               'left':  (config['repeat_delay'], config['repeat_interval']),
+                               'right': (config['repeat_delay'], config['repeat_interval']),
+                               'drop':  (config['drop_repeat_delay'], config['drop_repeat_interval']),
+                           }, calibration=load_calibration(config['calibration'])
+                                          if config['calibration'] else None)
+
+while vision.error is None:
+    latest = vision.poll()
+    if latest is not None:
+        t, frame, hands, _ = latest
+        # One player: whichever hand is there is theirs
+        gestures.update(t, hands[:1], [0])
+        bus.flush()
+
+        draw_hands(frame, hands)
+        cv2.imshow('CV', frame)
 
-is_pointing_detected = False
-
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = hands_detector.process(image_rgb)
-    
-    if results.multi_hand_landmarks:
-        for hand_no, hand_landmarks in enumerate(results.multi_hand_landmarks):
-            mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            
-            thumb_tip = hand_landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP]
-            index_finger_tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-            middle_finger_tip = hand_landmarks.landmark[mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-            ring_finger_tip = hand_landmarks.landmark[mp_hands.HandLandmark.RING_FINGER_TIP]
-            pinky_tip = hand_landmarks.landmark[mp_hands.HandLandmark.PINKY_TIP]
-            
-            #cv2.putText(frame, f"Thumb tip y: {round(thumb_tip.y, 2)}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            #cv2.putText(frame, f"Index tip y: {round(index_finger_tip.y, 2)}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            #cv2.putText(frame, f"Middle tip y: {round(middle_finger_tip.y, 2)}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            #cv2.putText(frame, f"Ring tip y: {round(ring_finger_tip.y, 2)}", (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            #cv2.putText(frame, f"Pinky tip y: {round(pinky_tip.y, 2)}", (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            is_hand_closed = (
-                index_finger_tip.y > thumb_tip.y and
-                middle_finger_tip.y > thumb_tip.y and
-                ring_finger_tip.y > thumb_tip.y and
-                pinky_tip.y > thumb_tip.y
-            )
-
-            is_pointing = (
-                index_finger_tip.y < thumb_tip.y and 
-                middle_finger_tip.y > index_finger_tip.y and  
-                ring_finger_tip.y > index_finger_tip.y and
-                pinky_tip.y > index_finger_tip.y
-            )
-
-            hand_center_x = (
-                thumb_tip.x + index_finger_tip.x + 
-                middle_finger_tip.x + ring_finger_tip.x + pinky_tip.x
-            ) / 5
-
-            if hand_no == 0:
-              if is_pointing and not is_pointing_detected:
-                pyautogui.press('up')
-                is_pointing_detected = True
-              if is_hand_closed:
-                pyautogui.press('down')
-              elif hand_center_x < 0.4:
-                pyautogui.press('left')
-                time.sleep(0.1)
-              elif hand_center_x > 0.6:
-                pyautogui.press('right')
-                time.sleep(0.1)
-
-          #  elif hand_no == 1 and not is_hand_closed:
-           #     pyautogui.press('down')
-            #    time.sleep(0.1)
-
-            if not is_pointing:
-                is_pointing_detected = False
-            
-            
-    cv2.imshow('CV', frame)
-    
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
-    
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+
+vision.stop()
+source.release()
+cv2.destroyAllWindows()
@@ -35,495 +35,397 @@
 #!/usr/bin/env python
 #-*- coding: utf-8 -*-
 
+import argparse
+import os
 import sys
-import time
-from random import randrange as rand
 
 import pygame
-import cv2
-import mediapipe as mp
 
-# ------------------------------------------------------------------
-# TETRIS CONFIG
-# ------------------------------------------------------------------
-config = {
-    'cell_size':  20,
-    'cols':       10,  # typical Tetris width
-    'rows':       20,  # typical Tetris height
-    'delay':      500, # ms between automatic piece drops
-    'maxfps':     30
-}
-
-colors = [
-    (0,   0,   0),     # dummy (index 0)
-    (255, 0,   0),     # 1
-    (0,   150, 0),     # 2
-    (0,   0,   255),   # 3
-    (255, 120, 0),     # 4
-    (255, 255, 0),     # 5
-    (180, 0,   255),   # 6
-    (0,   220, 220)    # 7
-]
-
-tetris_shapes = [
-    [[1, 1, 1],
-     [0, 1, 0]],
-
-    [[0, 2, 2],
-     [2, 2, 0]],
-
-    [[3, 3, 0],
-     [0, 3, 3]],
-
-    [[4, 0, 0],
-     [4, 4, 4]],
-
-    [[0, 0, 5],
-     [5, 5, 5]],
-
-    [[6, 6, 6, 6]],
-
-    [[7, 7],
-     [7, 7]]
-]
-
-# ------------------------------------------------------------------
-# HELPER FUNCTIONS
-# ------------------------------------------------------------------
-def rotate_clockwise(shape):
-    return [
-        [ shape[y][x] for y in range(len(shape)) ]
-        for x in range(len(shape[0]) - 1, -1, -1)
-    ]
-
-def check_collision(board, shape, offset):
-    off_x, off_y = offset
-    for cy, row in enumerate(shape):
-        for cx, cell in enumerate(row):
-            if cell:
-                if (cx + off_x < 0 or 
-                    cx + off_x >= config['cols'] or
-                    cy + off_y >= config['rows'] or
-                    board[cy + off_y][cx + off_x]):
-                    return True
-    return False
-
-def remove_row(board, row):
-    del board[row]
-    return [[0 for _ in range(config['cols'])]] + board
-
-def join_matrices(mat1, mat2, mat2_off):
-    off_x, off_y = mat2_off
-    for cy, row in enumerate(mat2):
-        for cx, val in enumerate(row):
-            if val:
-                mat1[cy + off_y][cx + off_x] = val
-    return mat1
-
-def new_board():
-    return [
-        [0 for _ in range(config['cols'])] 
-        for _ in range(config['rows'])
-    ]
-
-def add_garbage(board, lines):
-    """Send garbage lines to the *bottom* of the board with a random hole."""
-    from random import randrange
-    if lines <= 0:
-        return board
-    for _ in range(lines):
-        hole = randrange(config['cols'])
-        new_row = [1]*config['cols']
-        new_row[hole] = 0
-        board.pop(0)
-        board.append(new_row)
-    return board
+from board import config, colors, piece_names
+from core import TetrisCore, ROUTINGS
+from render import BoardRenderer, TextCache
+from startup import VisionLoader
+from profiler import Profiler, NULL_PROFILER
+from timestep import FixedStep
+from snapshots import SnapshotLog, resume
+from telemetry import TelemetryLog
+from inputbus import (InputBus, GestureProducer, KeyboardProducer, EventReplay,
+                      GameConsumer, LogSink, ONE_PLAYER_ZONES, player_zones)
+from ai import SearchBot
+from calibration import load as load_calibration
 
 # ------------------------------------------------------------------
 # TETRIS CLASS
 # ------------------------------------------------------------------
-class Tetris2P:
-    def __init__(self):
+class Tetris2P(TetrisCore):
+    def __init__(self, seed=None, loader=None, profiler=NULL_PROFILER, profile_out=None,
+                 log_events=None, replay_events=None, snapshots=None, resume_match=False,
+                 ai_player=None, players=2, calibration=None, telemetry=None, names=None):
+        TetrisCore.__init__(self, seed, players)
+
+        # Every tick is written to a memory-mapped ring buffer that spectators
+        # can read; after a crash the match picks up from the newest snapshot
+        snap = None
+        if resume_match and snapshots and os.path.exists(snapshots):
+            snap = resume(self, snapshots)
+            if snap is not None:
+                print("Resumed match %d at tick %d" % (self.seed, snap.tick))
+        self.snapshots = (SnapshotLog(snapshots, self, resume=snap is not None)
+                          if snapshots else None)
+
+        # Stage timings; F3 toggles the on-screen table when enabled
+        self.profiler     = profiler
+        self.profile_out  = profile_out
+        self.show_profile = False
+        self.profile_area = None
+        self.profile_text = []
+        self.profile_next = 0.0
+
         pygame.init()
         pygame.key.set_repeat(250, 25)
-        pygame.display.set_caption("2-Player Tetris w/ CV Hand Gestures")
+        pygame.display.set_caption("%d-Player Tetris w/ CV Hand Gestures" % players)
 
-        # Tetris surfaces
-        self.screen_width  = config['cell_size'] * config['cols'] * 2 + 40
-        self.screen_height = config['cell_size'] * config['rows']
+        # Tetris surfaces: boards side by side, two cells apart
+        self.board_stride  = config['cols'] + 2
+        self.screen_width  = config['cell_size'] * (self.board_stride * players - 2)
+        self.board_height  = config['cell_size'] * config['rows']
+        self.screen_height = self.board_height + config['hud_height']
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
 
-        # Setup a timer for dropping pieces
-        pygame.time.set_timer(pygame.USEREVENT + 1, config['delay'])
+        # Boards repaint only the cells that changed since the last frame
+        self.renderers = [BoardRenderer(self.screen, i * self.board_stride)
+                          for i in range(players)]
+        self.overlays  = None
 
-        # Create boards
-        self.board1 = new_board()
-        self.board2 = new_board()
+        # Text is rasterised once per distinct string and reused
+        self.text = TextCache()
+        self.hud  = {}
+        self.draw_loading("Starting")
 
-        # Create first stones
-        self.new_stone_p1()
-        self.new_stone_p2()
-
-        # State
-        self.paused      = False
-        self.gameover_p1 = False
-        self.gameover_p2 = False
-        self.b2b_p1      = False  # track back-to-back Tetrises
-        self.b2b_p2      = False
+        # Game logic runs in fixed steps, independent of the frame rate
+        self.timestep = FixedStep(config['tick_rate'])
 
         # -----------------------
-        # Initialize camera + Mediapipe
+        # Camera (or a recording) + Mediapipe load in the background; run()
+        # shows a loading screen until they are ready. Each player's hand is
+        # followed in its own crop once it has been found; against the
+        # computer the one human gets the whole frame
         # -----------------------
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
-
-        self.mp_hands = mp.solutions.hands
-        self.hands_detector = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,  # up to two hands if needed
-            min_detection_confidence=0.8,
-            min_tracking_confidence=0.5
-        )
-        self.mp_drawing = mp.solutions.drawing_utils
-
-        # Track if we have an "up" press locked to avoid spamming
-        self.p1_is_pointing = False
-        self.p2_is_pointing = False
-        
-        #For secret command
-        self.p1_secret = False
-        self.p2_secret = False
-
-    # ----------------------------------------------------------------
-    # Stone Management
-    # ----------------------------------------------------------------
-    def new_stone_p1(self):
-        self.stone1 = tetris_shapes[rand(len(tetris_shapes))]
-        self.stone1_x = config['cols'] // 2 - len(self.stone1[0]) // 2
-        self.stone1_y = 0
-        if check_collision(self.board1, self.stone1, (self.stone1_x, self.stone1_y)):
-            self.gameover_p1 = True
-
-    def new_stone_p2(self):
-        self.stone2 = tetris_shapes[rand(len(tetris_shapes))]
-        self.stone2_x = config['cols'] // 2 - len(self.stone2[0]) // 2
-        self.stone2_y = 0
-        if check_collision(self.board2, self.stone2, (self.stone2_x, self.stone2_y)):
-            self.gameover_p2 = True
+        humans = players if ai_player is None else 1
+        self.loader = (loader if loader is not None else VisionLoader()).load(
+            players, humans, self.profiler)
+        self.vision = None
+
+        # Gestures, keys and replayed logs all become events on one bus,
+        # which is flushed into the game once per loop
+        self.bus = InputBus()
+        self.bus.subscribe(GameConsumer(self))
+        repeats = {
+            'left':  (config['repeat_delay'], config['repeat_interval']),
+            'right': (config['repeat_delay'], config['repeat_interval']),
+            'drop':  (config['drop_repeat_delay'], config['drop_repeat_interval']),
+        }
+        if ai_player is None:
+            zones, first = player_zones(players), 1
+        else:
+            first = 3 - ai_player
+            zones = {first: ONE_PLAYER_ZONES[1]}
+        self.gestures = GestureProducer(self.bus, zones, config['gesture_window'],
+                                        config['gesture_enter'], config['gesture_release'],
+                                        repeats, first, calibration)
+        self.keyboard = KeyboardProducer(self.bus)
+        self.event_replay = EventReplay(self.bus, replay_events) if replay_events else None
+        self.event_log = self.bus.subscribe(LogSink(log_events)) if log_events else None
+        self.ai = SearchBot(self.bus, ai_player) if ai_player else None
+
+        # Match statistics: the core reports locks, garbage and top-outs,
+        # the bus every input; a writer thread does the file I/O
+        self.telemetry_log = telemetry
+        if telemetry is not None:
+            self.bus.subscribe(telemetry.match(self, names).inputs)
 
     # ----------------------------------------------------------------
     # Drawing
     # ----------------------------------------------------------------
-    def draw_matrix(self, matrix, offset=(0,0)):
-        off_x, off_y = offset
-        for y, row in enumerate(matrix):
-            for x, val in enumerate(row):
-                if val:
-                    pygame.draw.rect(
-                        self.screen,
-                        colors[val],
-                        pygame.Rect(
-                            (off_x + x)*config['cell_size'],
-                            (off_y + y)*config['cell_size'],
-                            config['cell_size'], config['cell_size']
-                        ),
-                        0
-                    )
+    def draw_loading(self, message):
+        self.screen.fill(colors[0])
+        self.center_msg(message, self.screen_width//2, self.board_height//2)
+        pygame.display.flip()
 
     def center_msg(self, msg, offset_x, offset_y):
-        font = pygame.font.Font(pygame.font.get_default_font(), 18)
         lines = msg.splitlines()
+        rects = []
         for i, line in enumerate(lines):
-            msg_image = font.render(line, False, (255,255,255), (0,0,0))
+            msg_image = self.text.render(line, 18)
             w, h = msg_image.get_size()
-            self.screen.blit(msg_image, (offset_x - w//2, offset_y - h//2 + i*22))
-
-    # ----------------------------------------------------------------
-    # Player 1 Moves
-    # ----------------------------------------------------------------
-    def move_p1(self, delta_x):
-        if not self.gameover_p1 and not self.paused:
-            new_x = self.stone1_x + delta_x
-            if new_x < 0:
-                new_x = 0
-            if new_x > config['cols'] - len(self.stone1[0]):
-                new_x = config['cols'] - len(self.stone1[0])
-            if not check_collision(self.board1, self.stone1, (new_x, self.stone1_y)):
-                self.stone1_x = new_x
-
-    def rotate_p1(self):
-        if not self.gameover_p1 and not self.paused:
-            new_stone = rotate_clockwise(self.stone1)
-            if not check_collision(self.board1, new_stone, (self.stone1_x, self.stone1_y)):
-                self.stone1 = new_stone
-
-    def drop_p1(self):
-        if not self.gameover_p1 and not self.paused:
-            self.stone1_y += 1
-            if check_collision(self.board1, self.stone1, (self.stone1_x, self.stone1_y)):
-                self.stone1_y -= 1
-                self.board1 = join_matrices(self.board1, self.stone1, (self.stone1_x, self.stone1_y))
-                lines_cleared = 0
-                while True:
-                    for i, row in enumerate(self.board1):
-                        if 0 not in row:
-                            self.board1 = remove_row(self.board1, i)
-                            lines_cleared += 1
-                            break
-                    else:
-                        break
-                # Garbage logic
-                if lines_cleared > 0:
-                    if lines_cleared == 4:  # Tetris
-                        garbage = 4
-                        if self.b2b_p1:
-                            garbage += 1
-                        self.b2b_p1 = True
-                    else:
-                        garbage = lines_cleared - 1
-                        self.b2b_p1 = False
-                    self.board2 = add_garbage(self.board2, garbage)
-                # new stone
-                self.new_stone_p1()
-
-    # ----------------------------------------------------------------
-    # Player 2 Moves
-    # ----------------------------------------------------------------
-    def move_p2(self, delta_x):
-        if not self.gameover_p2 and not self.paused:
-            new_x = self.stone2_x + delta_x
-            if new_x < 0:
-                new_x = 0
-            if new_x > config['cols'] - len(self.stone2[0]):
-                new_x = config['cols'] - len(self.stone2[0])
-            if not check_collision(self.board2, self.stone2, (new_x, self.stone2_y)):
-                self.stone2_x = new_x
-
-    def rotate_p2(self):
-        if not self.gameover_p2 and not self.paused:
-            new_stone = rotate_clockwise(self.stone2)
-            if not check_collision(self.board2, new_stone, (self.stone2_x, self.stone2_y)):
-                self.stone2 = new_stone
-
-    def drop_p2(self):
-        if not self.gameover_p2 and not self.paused:
-            self.stone2_y += 1
-            if check_collision(self.board2, self.stone2, (self.stone2_x, self.stone2_y)):
-                self.stone2_y -= 1
-                self.board2 = join_matrices(self.board2, self.stone2, (self.stone2_x, self.stone2_y))
-                lines_cleared = 0
-                while True:
-                    for i, row in enumerate(self.board2):
-                        if 0 not in row:
-                            self.board2 = remove_row(self.board2, i)
-                            lines_cleared += 1
-                            break
-                    else:
-                        break
-
-                if lines_cleared > 0:
-                    if lines_cleared == 4:
-                        garbage = 4
-                        if self.b2b_p2:
-                            garbage += 1
-                        self.b2b_p2 = True
-                    else:
-                        garbage = lines_cleared - 1
-                        self.b2b_p2 = False
-                    self.board1 = add_garbage(self.board1, garbage)
-
-                self.new_stone_p2()
+            rects.append(self.screen.blit(msg_image, (offset_x - w//2, offset_y - h//2 + i*22)))
+        return rects
+
+    def draw_hud(self, p):
+        """Score/lines/next line under a board; only redrawn when it changes."""
+        text = "Score %d  Lines %d  Next %s" % (p.score, p.lines,
+                                                 piece_names[self.bag.peek(p.number)[0]])
+        if p.incoming:
+            text += "  +%d" % p.incoming
+        if self.hud.get(p.number) == text:
+            return []
+        self.hud[p.number] = text
+        offset_x = (p.number - 1) * self.board_stride
+        area = pygame.Rect(offset_x*config['cell_size'], self.board_height,
+                           config['cols']*config['cell_size'], config['hud_height'])
+        self.screen.fill(colors[0], area)
+        msg_image = self.text.render(text, 12)
+        self.screen.blit(msg_image, msg_image.get_rect(center=area.center))
+        return [area]
+
+    def draw_profile(self):
+        """p50/p95/p99 table over the top of board 1, refreshed twice a second."""
+        now = self.profiler.clock()
+        if now >= self.profile_next:
+            self.profile_next = now + 0.5
+            self.profile_text = [("ms", "p50", "p95", "p99")] + [
+                (stage, "%.1f" % s['p50_ms'], "%.1f" % s['p95_ms'], "%.1f" % s['p99_ms'])
+                for stage, s in sorted(self.profiler.stats().items())]
+        area = pygame.Rect(0, 0, config['cols']*config['cell_size'],
+                           14*len(self.profile_text) + 4)
+        self.screen.fill(colors[0], area)
+        self.screen.set_clip(area)
+        for i, row in enumerate(self.profile_text):
+            y = 2 + 14*i
+            self.screen.blit(self.text.render(row[0], 11), (2, y))
+            # Numbers right-aligned in fixed columns
+            for right, cell in zip((area.right - 74, area.right - 38, area.right - 2), row[1:]):
+                image = self.text.render(cell, 11)
+                self.screen.blit(image, (right - image.get_width(), y))
+        self.screen.set_clip(None)
+        self.profile_area = area
+        return [area]
+
+    def draw(self):
+        """Redraw what changed and return the dirty rects."""
+        overlays = []
+        for p in self.players:
+            if p.gameover:
+                offset_x = (p.number - 1) * self.board_stride
+                overlays.append(("P%d Game Over" % p.number,
+                                 offset_x*config['cell_size'] + config['cell_size']*config['cols']//2,
+                                 self.board_height//2))
+        if self.paused:
+            overlays.append(("Paused", self.screen_width//2, self.board_height//2))
+
+        # Overlays coming or going can uncover anything: repaint it all once
+        dirty = []
+        if overlays != self.overlays:
+            self.overlays = overlays
+            self.screen.fill(colors[0])
+            for renderer in self.renderers:
+                renderer.invalidate()
+            self.hud.clear()
+            dirty.append(self.screen.get_rect())
+
+        # Cells under last frame's profile table need painting again
+        if self.profile_area is not None:
+            self.renderers[0].invalidate_area(self.profile_area)
+            self.profile_area = None
+
+        for renderer, p in zip(self.renderers, self.players):
+            dirty += renderer.draw(p.board, None if p.gameover else p.stone, p.x, p.y)
+        for msg, x, y in overlays:
+            dirty += self.center_msg(msg, x, y)
+        for p in self.players:
+            dirty += self.draw_hud(p)
+        if self.show_profile:
+            dirty += self.draw_profile()
+        return dirty
 
     # ----------------------------------------------------------------
     # Misc
     # ----------------------------------------------------------------
-    def toggle_pause(self):
-        self.paused = not self.paused
-
     def quit(self):
-        self.cap.release()
-        cv2.destroyAllWindows()
+        if self.vision is not None:
+            import cv2
+            self.vision.stop()
+            print(self.vision.stats())
+            self.loader.source.release()
+            cv2.destroyAllWindows()
+        if self.event_log is not None:
+            self.event_log.close()
+        if self.snapshots is not None:
+            self.snapshots.close()
+        if self.telemetry_log is not None:
+            self.telemetry.end()
+            self.telemetry_log.close()
+        if self.profiler.enabled:
+            print("\n".join(self.profiler.summary_lines()))
+            if self.profile_out:
+                self.profiler.dump(self.profile_out)
         pygame.quit()
         sys.exit()
 
     # ----------------------------------------------------------------
     # The main game loop
     # ----------------------------------------------------------------
+    def wait_for_vision(self, clock):
+        """Keep the window alive with a loading screen until VisionLoader is done."""
+        loader = self.loader
+        frames = 0
+        while not loader.ready:
+            if loader.error is not None:
+                print(loader.error)
+                self.quit()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                                 event.key == pygame.K_ESCAPE):
+                    self.quit()
+            frames += 1
+            self.draw_loading(loader.message + "." * (frames // 10 % 4))
+            clock.tick(config['maxfps'])
+        print(loader.summary())
+        self.vision = loader.vision
+        # Play starts now: no catching up on the time spent loading
+        self.overlays = None
+        self.timestep.reset()
+
     def run(self):
         clock = pygame.time.Clock()
+        prof = self.profiler
+        shown_t = None   # capture time of the newest input not yet on screen
+
+        self.wait_for_vision(clock)
+        # Safe to touch OpenCV from here on: the loader has imported it
+        import cv2
+        from vision import draw_hands
 
         while True:
-            # 1) Grab a frame from the camera, run Mediapipe
-            ret, frame = self.cap.read()
-            frame = cv2.flip(frame, 1)
+            lap = frame_start = prof.clock()
 
-            if not ret:
-                print("Camera read error!")
-                self.quit()
-            
-            # Process with Mediapipe
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.hands_detector.process(image_rgb)
-
-            # If we see hands, figure out if they're on the left or right half
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Draw the landmarks on the debug frame
-                    self.mp_drawing.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-
-                    # Extract a few points for “gesture detection”
-                    thumb_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-                    index_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                    middle_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-                    ring_tip   = hand_landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP]
-                    pinky_tip  = hand_landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-
-                    # Approx “hand center” by averaging tip x coords:
-                    hand_center_x = (
-                        thumb_tip.x + index_tip.x + middle_tip.x +
-                        ring_tip.x + pinky_tip.x
-                    ) / 5.0
-
-                    # Example gestures
-                    is_hand_closed = (
-                        index_tip.y > thumb_tip.y and
-                        middle_tip.y > thumb_tip.y and
-                        ring_tip.y > thumb_tip.y and
-                        pinky_tip.y > thumb_tip.y
-                    )
-                    is_pointing = (
-                        index_tip.y < thumb_tip.y and 
-                        middle_tip.y > index_tip.y and  
-                        ring_tip.y > index_tip.y and
-                        pinky_tip.y > index_tip.y
-                    )
-
-                    #Special super secret move: try at your own risk
-                    special_up = (
-                        index_tip.y > thumb_tip.y and 
-                        middle_tip.y < index_tip.y and  
-                        ring_tip.y > index_tip.y and
-                        pinky_tip.y > index_tip.y
-                    )
-
-                    # Decide which player: left half <0.5 => P1, else => P2
-                    if hand_center_x < 0.5:
-                        #Player 2 Code
-                        if is_pointing and not self.p1_is_pointing:
-                            # Equivalent to pressing W => rotate
-                            self.rotate_p1()
-                            self.p1_is_pointing = True
-                        elif is_hand_closed:
-                            # Equivalent to pressing S => drop
-                            self.drop_p1()
-                        elif special_up and not self.p1_secret:
-                            self.board2 = add_garbage(self.board2, 1)
-                            self.p1_secret = True
-                        else:
-                            # Move left or right?
-                            if hand_center_x < 0.3:
-                                # Move left => 'a'
-                                self.move_p1(-1)
-                                time.sleep(0.1)
-                            elif hand_center_x > 0.35 and hand_center_x < 0.5:
-                                # Move right => 'd'
-                                self.move_p1(+1)
-                                time.sleep(0.1)
-                        # Reset pointing if not pointing
-                        if not is_pointing:
-                            self.p1_is_pointing = False
-                        if not special_up:
-                            self.p1_secret = False
-                        
-
-                    else:
-                        # Player 1 logic
-                        if is_pointing and not self.p2_is_pointing:
-                            # 'UP' => rotate
-                            self.rotate_p2()
-                            self.p2_is_pointing = True
-                        elif is_hand_closed:
-                            # 'DOWN' => drop
-                            self.drop_p2()
-                        elif special_up and not self.p2_secret:
-                            self.board1 = add_garbage(self.board1, 1)
-                            self.p2_secret = True
-                        else:
-                            # Move left or right?
-                            # But for P2, "left" = K_LEFT => move_p2(-1), "right" = K_RIGHT => move_p2(+1)
-                            if hand_center_x < 0.7:
-                                # Move left
-                                self.move_p2(-1)
-                                time.sleep(0.1)
-                            elif hand_center_x > 0.75:
-                                # Move right
-                                self.move_p2(+1)
-                                time.sleep(0.1)
-                        # Reset pointing
-                        if not is_pointing:
-                            self.p2_is_pointing = False
-                        if not special_up:
-                            self.p2_secret = False
-                        
-                        
+            # 1) Pick up the newest Mediapipe result, if one finished
+            latest = self.vision.poll()
+            if latest is None:
+                if self.vision.error:
+                    print(self.vision.error)
+                    self.quit()
+                frame, hands = None, None
+            else:
+                frame_t, frame, hands, players = latest
+                prof.since('camera->game', frame_t)
+                if prof.enabled:
+                    before = self.stone_state()
+
+            # Classify every hand in one vectorised pass, debounce, and publish
+            if hands is not None:
+                # Draw the landmarks on the debug frame
+                if frame is not None and len(hands):
+                    draw_hands(frame, hands)
+                self.gestures.update(frame_t, hands, players)
+                lap = prof.lap('gestures', lap)
 
             # Show CV debug window
-            cv2.imshow("Hand Gestures", frame)
+            if frame is not None:
+                cv2.imshow("Hand Gestures", frame)
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 self.quit()
+            lap = prof.lap('debug window', lap)
 
             # 2) Handle pygame events (like ESC key, pause, etc.)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.quit()
                 elif event.type == pygame.KEYDOWN:
+                    if self.keyboard.handle(event):
+                        continue
                     if event.key == pygame.K_ESCAPE:
                         self.quit()
                     if event.key == pygame.K_p:
                         self.toggle_pause()
-
-                elif event.type == pygame.USEREVENT + 1:
-                    # Automatic drop
-                    if not self.paused:
-                        if not self.gameover_p1:
-                            self.drop_p1()
-                        if not self.gameover_p2:
-                            self.drop_p2()
-
-            # 3) Draw the Tetris boards
-            self.screen.fill((0,0,0))
-
-            # Player 1 area
-            self.draw_matrix(self.board1, offset=(0,0))
-            if not self.gameover_p1:
-                self.draw_matrix(self.stone1, offset=(self.stone1_x, self.stone1_y))
-            else:
-                self.center_msg("P1 Game Over",
-                                offset_x=config['cell_size']*config['cols']//2, 
-                                offset_y=self.screen_height//2)
-
-            # Player 2 area
-            offset_x_2 = config['cols'] + 2
-            self.draw_matrix(self.board2, offset=(offset_x_2, 0))
-            if not self.gameover_p2:
-                self.draw_matrix(self.stone2, offset=(self.stone2_x + offset_x_2, self.stone2_y))
-            else:
-                center_x_2 = (offset_x_2*config['cell_size'] + config['cell_size']*config['cols']//2)
-                self.center_msg("P2 Game Over", center_x_2, self.screen_height//2)
-
-            # Pause overlay
-            if self.paused:
-                self.center_msg("Paused",
-                                offset_x=self.screen_width//2,
-                                offset_y=self.screen_height//2)
-
-            pygame.display.update()
+                    if event.key == pygame.K_F3 and prof.enabled:
+                        self.show_profile = not self.show_profile
+
+            if self.event_replay is not None:
+                self.event_replay.poll()
+            lap = prof.lap('events', lap)
+
+            if self.ai is not None:
+                self.ai.update(self)
+                lap = prof.lap('ai', lap)
+
+            # Everything this loop produced reaches the game as one batch,
+            # then gravity catches up with the time that has passed
+            self.bus.flush()
+            for _ in range(self.timestep.advance()):
+                self.tick()
+                if self.snapshots is not None:
+                    self.snapshots.write(self)
+            if self.gameover and self.telemetry is not None:
+                self.telemetry.end()
+            lap = prof.lap('update', lap)
+            if latest is not None and prof.enabled and self.stone_state() != before:
+                prof.since('camera->board', frame_t)
+                shown_t = frame_t
+
+            # 3) Draw the Tetris boards, pushing only what changed
+            dirty = self.draw()
+            lap = prof.lap('draw', lap)
+            if dirty:
+                pygame.display.update(dirty)
+            lap = prof.lap('display', lap)
+            if shown_t is not None:
+                prof.since('camera->display', shown_t)
+                shown_t = None
+            prof.since('frame', frame_start)
             clock.tick(config['maxfps'])
 
 # ---------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------
 if __name__ == "__main__":
-    game = Tetris2P()
+    parser = argparse.ArgumentParser(description="2-Player Tetris w/ CV Hand Gestures")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replay', metavar='DIR',
+                        help="play from a landmark recording instead of the camera")
+    parser.add_argument('--fast', action='store_true',
+                        help="replay as fast as possible instead of in real time")
+    parser.add_argument('--record', metavar='DIR', help="record landmarks while playing")
+    parser.add_argument('--record-frames', action='store_true',
+                        help="store camera frames in the recording too")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every pipeline stage (F3 shows the table)")
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help="write stage timings at exit (.json or .csv)")
+    parser.add_argument('--log-events', metavar='FILE',
+                        help="append every input event to a JSON-lines log")
+    parser.add_argument('--replay-events', metavar='FILE',
+                        help="feed a logged event stream back in as input")
+    parser.add_argument('--snapshots', metavar='FILE',
+                        help="log every tick to a memory-mapped snapshot ring")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue the match in the --snapshots file")
+    parser.add_argument('--no-governor', action='store_true',
+                        help="run the detector on every full-size frame")
+    parser.add_argument('--ai', type=int, choices=(1, 2), metavar='PLAYER',
+                        help="let the computer play this side (1 or 2)")
+    parser.add_argument('--calibration', metavar='FILE', default=config['calibration'],
+                        help="gesture profile recorded with calibration.py")
+    parser.add_argument('--players', type=int, default=2,
+                        help="players side by side on one screen and camera")
+    parser.add_argument('--routing', choices=ROUTINGS, default=config['garbage_routing'],
+                        help="who receives garbage when there are 3+ players")
+    parser.add_argument('--telemetry', metavar='FILE',
+                        help="append match statistics to a JSON-lines log (see telemetry.py)")
+    parser.add_argument('--names', metavar='NAME,NAME',
+                        help="player names for the telemetry leaderboard")
+    args = parser.parse_args()
+    if args.ai and args.players != 2:
+        parser.error("--ai needs a 2-player match")
+    config['garbage_routing'] = args.routing
+
+    loader = VisionLoader(args.replay, not args.fast, args.record, args.record_frames,
+                          not args.no_governor)
+    profiler = Profiler() if args.profile or args.profile_out else NULL_PROFILER
+    game = Tetris2P(args.seed, loader, profiler, args.profile_out,
+                    args.log_events, args.replay_events, args.snapshots, args.resume,
+                    args.ai, args.players,
+                    load_calibration(args.calibration) if args.calibration else None,
+                    TelemetryLog(args.telemetry) if args.telemetry else None,
+                    args.names.split(",") if args.names else None)
     game.run()
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Placement search for a computer opponent.
+#
+# The search works on rows as int bitmasks (board_bits), never on the game's
+# board objects. For every rotation of a piece the column profile is
+# precomputed, so the landing row of a placement is a min() over the piece's
+# columns against the stack heights instead of a step-by-step drop. After
+# placing, full rows are removed and the result is scored in one top-down
+# pass that yields column heights, holes and bumpiness together.
+#
+# Lookahead: every placement of the current piece is scored on its own
+# first; then, best first, each is extended with the best placement of the
+# next piece (and the one after, for depth 2) until the time budget runs
+# out. Only the placements that were fully extended are compared, so a
+# slow machine searches fewer lines of play but never mixes shallow and deep
+# scores, and the search always answers within its budget.
+#
+# SearchBot turns the chosen placement into 'rotate' / 'left' / 'right' /
+# 'drop' events on the input bus, at a limited rate, for either player.
+
+import time
+
+from board import config, shape_rotations, board_bits
+from core import garbage_sent
+
+# Feature weights; positive is good
+DEFAULT_WEIGHTS = {
+    'height':    -0.51,   # sum of column heights
+    'holes':     -0.36,   # empty cells with something above them
+    'bumpiness': -0.18,   # sum of height differences between neighbours
+    'lines':      0.76,   # lines cleared by the placement
+    'garbage':    0.50,   # garbage lines it would send
+}
+
+TOPPED_OUT = -1000.0   # score of a line of play that can't place its next piece
+
+popcount = getattr(int, 'bit_count', None) or (lambda v: bin(v).count('1'))
+
+
+# ------------------------------------------------------------------
+# PIECE PROFILES
+# ------------------------------------------------------------------
+class Profile:
+    """What the search needs to know about one rotation of one piece."""
+
+    def __init__(self, rotation):
+        self.rot    = rotation.index
+        self.width  = rotation.width
+        self.height = rotation.height
+        self.masks  = []          # (dy, row mask at x=0)
+        for dy, row in enumerate(rotation.shape):
+            mask = 0
+            for dx, cell in enumerate(row):
+                if cell:
+                    mask |= 1 << dx
+            if mask:
+                self.masks.append((dy, mask))
+        # Lowest filled cell of every column, for landing against heights
+        self.bottoms = [max(cy for cx, cy in rotation.cells if cx == col)
+                        for col in range(self.width)]
+
+profiles = [[Profile(rotation) for rotation in rotations]
+            for rotations in shape_rotations]
+
+
+# ------------------------------------------------------------------
+# BOARD EVALUATION
+# ------------------------------------------------------------------
+def column_tops(rows, cols):
+    """Index of the highest filled row per column (len(rows) when empty)."""
+    n = len(rows)
+    tops = [n] * cols
+    seen = 0
+    for y, row in enumerate(rows):
+        new = row & ~seen
+        while new:
+            low = new & -new
+            tops[low.bit_length() - 1] = y
+            new ^= low
+        seen |= row
+        if seen == (1 << cols) - 1:
+            break
+    return tops
+
+def evaluate(rows, cols):
+    """(aggregate height, holes, bumpiness) of a board given as row bitmasks."""
+    n = len(rows)
+    heights = [0] * cols
+    covered = holes = 0
+    for y, row in enumerate(rows):
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = n - y
+            new ^= low
+        covered |= row
+        if covered:
+            holes += popcount(covered & ~row)
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return sum(heights), holes, bumpiness
+
+def place(rows, tops, profile, x):
+    """Rows after dropping `profile` at column x, plus lines cleared; None if it can't fit."""
+    y = min(tops[x + col] - 1 - bottom for col, bottom in enumerate(profile.bottoms))
+    if y < 0:
+        return None, 0
+    rows = list(rows)
+    for dy, mask in profile.masks:
+        rows[y + dy] |= mask << x
+    full = (1 << len(tops)) - 1
+    if full in rows:
+        kept = [row for row in rows if row != full]
+        cleared = len(rows) - len(kept)
+        return [0] * cleared + kept, cleared
+    return rows, 0
+
+# ------------------------------------------------------------------
+# SEARCH
+# ------------------------------------------------------------------
+class OutOfTime(Exception):
+    pass
+
+class PlacementSearch:
+    def __init__(self, weights=None, depth=1, budget=0.005, cols=None):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.depth   = depth       # pieces of lookahead beyond the current one
+        self.budget  = budget      # seconds per decision
+        self.cols    = config['cols'] if cols is None else cols
+        self.evaluated = 0         # placements scored, for benchmarks
+
+    def moves(self, rows, piece):
+        """Every (profile, x, rows after, lines) for `piece` on `rows`."""
+        cols = self.cols
+        tops = column_tops(rows, cols)
+        out = []
+        for profile in profiles[piece]:
+            for x in range(cols - profile.width + 1):
+                after, lines = place(rows, tops, profile, x)
+                if after is not None:
+                    out.append((profile, x, after, lines))
+        return out
+
+    def score(self, rows, lines, b2b):
+        w = self.weights
+        height, holes, bumpiness = evaluate(rows, self.cols)
+        self.evaluated += 1
+        return (w['height'] * height + w['holes'] * holes + w['bumpiness'] * bumpiness +
+                w['lines'] * lines + w['garbage'] * garbage_sent(lines, b2b))
+
+    def best_value(self, rows, pieces, b2b, deadline):
+        """Best score reachable by placing `pieces` in order."""
+        if time.perf_counter() >= deadline:
+            raise OutOfTime
+        best = None
+        for profile, x, after, lines in self.moves(rows, pieces[0]):
+            value = self.score(after, lines, b2b)
+            if len(pieces) > 1:
+                value += self.best_value(after, pieces[1:], b2b or lines == 4, deadline)
+            if best is None or value > best:
+                best = value
+        return TOPPED_OUT if best is None else best
+
+    def choose(self, board, piece, upcoming=(), b2b=False):
+        """(rot, x) for `piece`, or None when nothing fits."""
+        deadline = time.perf_counter() + self.budget
+        rows = board_bits(board)
+        candidates = []
+        for profile, x, after, lines in self.moves(rows, piece):
+            candidates.append((self.score(after, lines, b2b), profile.rot, x, after, lines))
+        if not candidates:
+            return None
+        lookahead = list(upcoming)[:self.depth]
+        if lookahead:
+            # Extend the most promising placements first; only fully searched
+            # ones compete, since a shallow score isn't comparable to a deep one
+            candidates.sort(key=lambda c: -c[0])
+            deep = []
+            try:
+                for score, rot, x, after, lines in candidates:
+                    rest = self.best_value(after, lookahead, b2b or lines == 4, deadline)
+                    deep.append((score + rest, rot, x))
+            except OutOfTime:
+                pass
+            if deep:
+                candidates = deep
+        best = max(candidates, key=lambda c: c[0])
+        return best[1], best[2]
+
+
+# ------------------------------------------------------------------
+# BOT
+# ------------------------------------------------------------------
+class SearchBot:
+    """Plays one side of a TetrisCore through the input bus."""
+
+    def __init__(self, bus, player, search=None, apm=None, clock=time.monotonic):
+        self.bus    = bus
+        self.player = player
+        self.search = search if search is not None else PlacementSearch(
+            config['ai_weights'], config['ai_depth'], config['ai_budget'] / 1000.0)
+        self.interval = 60.0 / (config['ai_apm'] if apm is None else apm)
+        self.drop_interval = config['drop_repeat_interval'] / 1000.0
+        self.clock  = clock
+        self.next_t = 0.0
+        self.pieces = -1
+        self.target = None
+        self.last   = None   # (action, stone state) of the last move, to spot walls
+
+    def update(self, core):
+        """Publish at most one action if one is due."""
+        p = core.player(self.player)
+        if p.gameover or core.paused:
+            return
+        now = self.clock()
+        if now < self.next_t:
+            return
+
+        if p.pieces != self.pieces:
+            # New stone: plan once, then just walk towards the plan
+            self.pieces = p.pieces
+            self.last   = None
+            self.target = self.search.choose(p.board, p.piece,
+                                             core.bag.peek(p.number, self.search.depth), p.b2b)
+        action = self.action(p)
+        # Once lined up, hold drop like a fist would
+        self.next_t = now + (self.drop_interval if action == 'drop' else self.interval)
+        self.bus.publish(p.number, action, 'ai')
+
+    def action(self, p):
+        state = (p.rot, p.x)
+        if self.last is not None and self.last[1] == state:
+            # The last move was blocked (no wall kicks): settle for here
+            self.target = None
+        if self.target is None:
+            return 'drop'
+        rot, x = self.target
+        if p.rot != rot:
+            action = 'rotate'
+        elif p.x > x:
+            action = 'left'
+        elif p.x < x:
+            action = 'right'
+        else:
+            return 'drop'
+        self.last = (action, state)
+        return action
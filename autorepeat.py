@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Non-blocking auto-repeat for held gestures.
+#
+# Works like pygame.key.set_repeat(delay, interval): a held action fires once
+# straight away, again after `delay` ms, then every `interval` ms until it is
+# released. Nothing here sleeps; callers ask every frame whether the action
+# is due. The clock is injectable so the timing can be driven by hand.
+
+import time
+
+
+class AutoRepeat:
+    def __init__(self, delay=250, interval=100, clock=time.monotonic):
+        self.delay    = delay / 1000.0
+        self.interval = interval / 1000.0
+        self.clock    = clock
+        self._held    = {}   # player -> action currently held
+        self._due     = {}   # player -> time the held action fires next
+
+    def update(self, player, action):
+        """Report the action `player` is holding (falsy for none).
+
+        Returns True when that action should be performed this frame.
+        Switching to a different action releases the previous one.
+        """
+        now = self.clock()
+        if not action:
+            self.release(player)
+            return False
+        if self._held.get(player) != action:
+            self._held[player] = action
+            self._due[player] = now + self.delay
+            return True
+        due = self._due[player]
+        if now < due:
+            return False
+        # Stay on the fixed schedule unless we fell a whole interval behind
+        due += self.interval
+        self._due[player] = due if due > now else now + self.interval
+        return True
+
+    def release(self, player):
+        self._held.pop(player, None)
+        self._due.pop(player, None)
+
+    def held(self, player):
+        return self._held.get(player)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Batch runner: plays many seeded headless matches across a process pool
+# and prints aggregate stats, for tuning config['delay'] and the garbage
+# rules without anybody standing in front of the camera.
+#
+#   python batch.py --matches 5000 --delay 500 --apm 90
+#
+# Every player is driven by a simple greedy placer that gets a fixed number
+# of inputs per minute (at most one per tick), so a longer delay means more
+# inputs per gravity step.
+# Matches run on the game's fixed logic tick, just without waiting for it.
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from functools import partial
+
+from board import config, shape_rotations, check_collision
+from core import TetrisCore, ROUTINGS
+
+
+# ------------------------------------------------------------------
+# GREEDY POLICY
+# ------------------------------------------------------------------
+def stack_top(board):
+    for y, row in enumerate(board):
+        if any(row):
+            return y
+    return len(board)
+
+def landing_y(board, shape, x, top=0):
+    if check_collision(board, shape, (x, 0)):
+        return None
+    # Nothing can stop the piece above the stack, so start just over it
+    y = max(0, top - len(shape))
+    while not check_collision(board, shape, (x, y + 1)):
+        y += 1
+    return y
+
+def holes_below(board, rotation, x, y):
+    """Empty cells the piece would seal off directly underneath it."""
+    holes = 0
+    bottoms = {}
+    for cx, cy in rotation.cells:
+        if cy > bottoms.get(cx, -1):
+            bottoms[cx] = cy
+    for cx, cy in bottoms.items():
+        row = y + cy + 1
+        while row < config['rows'] and not board[row][x + cx]:
+            holes += 1
+            row += 1
+    return holes
+
+def plan(board, piece, mistake):
+    """Pick a (rotation, x) for `piece`, or None if nothing fits.
+
+    `mistake` is a random.random() draw used to pick a random placement.
+    """
+    best, best_score = None, None
+    options = []
+    top = stack_top(board)
+    for rotation in shape_rotations[piece]:
+        for x in range(config['cols'] - rotation.width + 1):
+            y = landing_y(board, rotation.shape, x, top)
+            if y is None:
+                continue
+            options.append((rotation.index, x))
+            score = (y + rotation.height) - 4 * holes_below(board, rotation, x, y)
+            if best_score is None or score > best_score:
+                best, best_score = (rotation.index, x), score
+    if mistake is not None and options:
+        return options[int(mistake * len(options))]
+    return best
+
+
+class GreedyBot:
+    def __init__(self, player, error_rate, rng):
+        self.player = player
+        self.error_rate = error_rate
+        self.rng = rng
+        self.pieces = -1
+        self.target = None
+
+    def next_action(self, core):
+        p = core.player(self.player)
+        if p.pieces != self.pieces:
+            self.pieces = p.pieces
+            mistake = self.rng.random() if self.rng.random() < self.error_rate else None
+            self.target = plan(p.board, p.piece, mistake)
+        if self.target is None:
+            return 'drop'
+        rot, x = self.target
+        if p.rot != rot:
+            return 'rotate'
+        if p.x > x:
+            return 'left'
+        if p.x < x:
+            return 'right'
+        return 'drop'
+
+
+# ------------------------------------------------------------------
+# MATCHES
+# ------------------------------------------------------------------
+def play_match(seed, actions_per_tick, max_ticks, error_rate, players=2, telemetry=None):
+    core = TetrisCore(seed, players)
+    recorder = telemetry.match(core) if telemetry is not None else None
+    rng = random.Random(seed)
+    bots = [GreedyBot(p.number, error_rate, rng) for p in core.players]
+    credit = [0.0] * players
+
+    while not core.gameover and core.ticks < max_ticks:
+        moving = []
+        for i, bot in enumerate(bots):
+            credit[i] += actions_per_tick
+            if credit[i] >= 1.0:
+                credit[i] -= 1.0
+                action = bot.next_action(core)
+                core.handle(bot.player, action)
+                if recorder is not None:
+                    recorder.emit('input', bot.player, action=action, source='bot')
+                if action in ('left', 'right'):
+                    moving.append((bot, core.players[i].x))
+        core.tick()
+        # A blocked sideways move would be retried forever; drop instead
+        for bot, x in moving:
+            if core.player(bot.player).x == x and bot.target is not None:
+                bot.target = (bot.target[0], x)
+    if recorder is not None:
+        recorder.end()
+
+    return {
+        'seed':      seed,
+        'ticks':     core.ticks,
+        'lines':     [p.lines for p in core.players],
+        'garbage':   [p.garbage for p in core.players],
+        'pieces':    [p.pieces for p in core.players],
+        'topout':    [p.gameover for p in core.players],
+    }
+
+
+def aggregate(results, elapsed):
+    n = len(results)
+    players = len(results[0]['lines'])
+    ticks = sum(r['ticks'] for r in results)
+    summary = {
+        'matches':          n,
+        'matches_per_sec':  n / elapsed if elapsed else 0.0,
+        'mean_ticks':       ticks / n,
+        'mean_game_sec':    ticks / float(config['tick_rate']) / n,
+        'mean_lines':       sum(sum(r['lines']) for r in results) / float(players * n),
+        'mean_garbage':     sum(sum(r['garbage']) for r in results) / float(players * n),
+        'mean_pieces':      sum(sum(r['pieces']) for r in results) / float(players * n),
+    }
+    for p in range(players):
+        summary['topouts_p%d' % (p + 1)] = sum(1 for r in results if r['topout'][p])
+    # A match that ended with two or more players still standing ran out of time
+    summary['timeouts'] = sum(1 for r in results
+                              if players - sum(r['topout']) >= min(2, players))
+    return summary
+
+
+def _init_worker(delay, shared_bag, routing):
+    config['delay'] = delay
+    config['shared_bag'] = shared_bag
+    config['garbage_routing'] = routing
+
+
+def run_batch(matches, seed=0, processes=None, delay=None, apm=90,
+              max_seconds=1000, error_rate=0.1, shared_bag=True, players=2, routing=None):
+    delay = config['delay'] if delay is None else delay
+    routing = config['garbage_routing'] if routing is None else routing
+    actions_per_tick = apm / 60.0 / config['tick_rate']
+    job = partial(play_match, actions_per_tick=actions_per_tick,
+                  max_ticks=int(max_seconds * config['tick_rate']), error_rate=error_rate,
+                  players=players)
+    seeds = range(seed, seed + matches)
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes, _init_worker, (delay, shared_bag, routing)) as pool:
+        chunksize = max(1, matches // (4 * (processes or multiprocessing.cpu_count())))
+        results = list(pool.imap_unordered(job, seeds, chunksize))
+    elapsed = time.perf_counter() - start
+    return aggregate(results, elapsed)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless matches in bulk.")
+    parser.add_argument('--matches',   type=int,   default=1000)
+    parser.add_argument('--seed',      type=int,   default=0, help="first match seed")
+    parser.add_argument('--processes', type=int,   default=None)
+    parser.add_argument('--delay',     type=int,   default=config['delay'],
+                        help="ms between automatic drops at level 0")
+    parser.add_argument('--apm',       type=float, default=90, help="inputs per minute per player")
+    parser.add_argument('--max-seconds', type=float, default=1000,
+                        help="game time after which a match counts as a timeout")
+    parser.add_argument('--error-rate', type=float, default=0.1,
+                        help="chance a bot places a piece at random")
+    parser.add_argument('--independent-bags', action='store_true',
+                        help="give each player their own piece sequence")
+    parser.add_argument('--players',   type=int,   default=2)
+    parser.add_argument('--routing', choices=ROUTINGS, default=config['garbage_routing'],
+                        help="who receives garbage when there are 3+ players")
+    parser.add_argument('--json', action='store_true', help="print stats as JSON")
+    args = parser.parse_args()
+
+    summary = run_batch(args.matches, args.seed, args.processes, args.delay,
+                        args.apm, args.max_seconds, args.error_rate,
+                        not args.independent_bags, args.players, args.routing)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print("%-16s %s" % (key, round(value, 3) if isinstance(value, float) else value))
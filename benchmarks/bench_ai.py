@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Placement search benchmark (see ai.py).
+#
+# Plays a seeded solo game with PlacementSearch choosing every piece, and
+# reports how many placements it scored per second, how long each decision
+# took and how well it played. Run it once per depth to see what lookahead
+# costs; --budget is the per-piece time limit in ms (0 = unlimited).
+#
+#   python benchmarks/bench_ai.py [--depth 1] [--pieces 500] [--budget 0]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import PlacementSearch
+from board import (config, new_board, join_matrices, clear_lines, check_collision,
+                   shape_rotations)
+from randomizer import PieceGenerator
+
+
+def run(depth, pieces, budget, seed):
+    search = PlacementSearch(config['ai_weights'], depth, budget / 1000.0 if budget else 1e9)
+    bag = PieceGenerator(len(shape_rotations), seed)
+    board = new_board()
+    lines = placed = 0
+    decisions = []
+    start = time.perf_counter()
+    for _ in range(pieces):
+        piece = bag.next(1)
+        t0 = time.perf_counter()
+        choice = search.choose(board, piece, bag.peek(1, depth))
+        decisions.append(time.perf_counter() - t0)
+        if choice is None:
+            break
+        rot, x = choice
+        shape = shape_rotations[piece][rot].shape
+        if check_collision(board, shape, (x, 0)):
+            break
+        y = 0
+        while not check_collision(board, shape, (x, y + 1)):
+            y += 1
+        board = join_matrices(board, shape, (x, y))
+        board, cleared = clear_lines(board)
+        lines += cleared
+        placed += 1
+    elapsed = time.perf_counter() - start
+
+    decisions.sort()
+    print("depth             %d" % depth)
+    print("pieces placed     %d (%d lines)" % (placed, lines))
+    print("placements scored %d" % search.evaluated)
+    print("throughput        %.0f placements/s" % (search.evaluated / elapsed))
+    print("decision p50      %.2f ms" % (decisions[len(decisions) // 2] * 1e3))
+    print("decision p99      %.2f ms" % (decisions[int(len(decisions) * 0.99)] * 1e3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the AI placement search.")
+    parser.add_argument('--depth', type=int, default=config['ai_depth'],
+                        help="upcoming pieces to look ahead (0-2)")
+    parser.add_argument('--pieces', type=int, default=500)
+    parser.add_argument('--budget', type=float, default=0,
+                        help="ms per decision, 0 for unlimited")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.depth, args.pieces, args.budget, args.seed)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Microbenchmark: list-of-lists board vs BitBoard behind the same helpers.
+#
+#   python benchmarks/bench_board.py
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import (config, shape_rotations, check_collision, join_matrices,
+                   clear_lines, new_board)
+
+
+def filled_board(engine, seed=0):
+    """A board with a ragged 14-row stack and three full rows to clear."""
+    config['board_engine'] = engine
+    board = new_board()
+    rng = random.Random(seed)
+    rows, cols = config['rows'], config['cols']
+    for y in range(rows - 14, rows):
+        row = [rng.randrange(1, 8) for _ in range(cols)]
+        if y % 5:
+            row[rng.randrange(cols)] = 0
+        for x, val in enumerate(row):
+            if val:
+                join_matrices(board, [[val]], (x, y))
+    return board
+
+
+def probes():
+    shapes = [rotation.shape for rotations in shape_rotations
+                             for rotation in rotations]
+    return [(shape, (x, y)) for shape in shapes
+            for x in range(-1, config['cols'])
+            for y in range(0, config['rows'], 3)]
+
+
+def bench(engine, number):
+    board = filled_board(engine)
+    cases = probes()
+
+    def collide():
+        for shape, offset in cases:
+            check_collision(board, shape, offset)
+
+    # Clearing mutates the board, so every run gets a fresh one
+    boards = [filled_board(engine, seed) for seed in range(number)]
+
+    def clear():
+        for full in boards:
+            clear_lines(full)
+
+    t_collide = timeit.timeit(collide, number=number) / (number * len(cases))
+    t_clear = timeit.timeit(clear, number=1) / number
+    return t_collide, t_clear
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    engine = config['board_engine']
+    results = {name: bench(name, number) for name in ('list', 'bitboard')}
+    config['board_engine'] = engine
+
+    print("%-9s %16s %16s" % ("engine", "collision (us)", "line clear (us)"))
+    for name, (t_collide, t_clear) in results.items():
+        print("%-9s %16.3f %16.3f" % (name, t_collide * 1e6, t_clear * 1e6))
+    base = results['list']
+    fast = results['bitboard']
+    print("speedup   %15.2fx %15.2fx" % (base[0] / fast[0], base[1] / fast[1]))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Station capacity benchmark for the kiosk host (see kiosk.py).
+#
+# Runs 1, 2, 4... synthetic stations at a fixed camera rate against one
+# shared detector pool and reports, after a warm-up (detector creation and
+# first inferences), the gesture rate each station actually got and its
+# capture->landmarks latency. A station count is sustained when the slowest
+# station still gets `--sustain` of the camera rate.
+#
+#   python benchmarks/bench_kiosk.py [--stations 1 2 4 8] [--fps 30] [--seconds 10]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kiosk import KioskHost, SyntheticSource
+
+
+def run(stations, fps, seconds, warmup, processes, sustain):
+    host = KioskHost([SyntheticSource(fps, seed=i) for i in range(stations)],
+                     processes=processes).start()
+    try:
+        for phase in (warmup, seconds):
+            end = time.monotonic() + phase
+            while time.monotonic() < end:
+                host.step()
+            rows = host.report()
+    finally:
+        host.close()
+    rates = [row['fps'] for row in rows]
+    print("%3d stations  %6.1f fps total  %5.1f min  %5.1f max  p50 %6.1f ms  p99 %6.1f ms  "
+          "%6.1f ms/inference  %s" % (
+              stations, sum(rates), min(rates), max(rates),
+              max(row['p50_ms'] for row in rows), max(row['p99_ms'] for row in rows),
+              max(row['inference_ms'] for row in rows),
+              "sustained" if min(rates) >= sustain * fps else "overloaded"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark how many stations one machine sustains.")
+    parser.add_argument('--stations', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--fps', type=int, default=30, help="camera rate of every station")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--sustain', type=float, default=0.9,
+                        help="fraction of the camera rate the slowest station must get")
+    args = parser.parse_args()
+    for stations in args.stations:
+        run(stations, args.fps, args.seconds, args.warmup, args.processes, args.sustain)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Load test for the match server (see net.py).
+#
+# Starts one server process on loopback and plays many matches against it
+# at once, every player a greedy bot (from batch.py) behind its own socket
+# that reads the board from its MatchMirror. Reports whether the server kept
+# its tick rate, the traffic per player and the round-trip time.
+#
+#   python benchmarks/bench_net.py [--matches 50] [--players 2] [--seconds 20] [--apm 120]
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import GreedyBot
+from board import config
+from net import MatchServer, NetClient
+
+
+def server_process(ports, results, stop, players):
+    async def main():
+        server = MatchServer(seed=0, players=players)
+        ports.put(await server.start('127.0.0.1', 0))
+        start = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        late = server.late + sum(match.late for match in server.matches.values())
+        results.put((server.ticks / elapsed, server.sent, late))
+        await server.close()
+    asyncio.run(main())
+
+
+async def bot(port, apm, seconds, rng, rtts):
+    client = await NetClient.connect('127.0.0.1', port)
+    player = GreedyBot(client.player, 0.1, rng)
+    end = time.monotonic() + seconds
+    next_ping = 0.0
+    while not client.done and time.monotonic() < end:
+        if client.mirror.tick:
+            client.send(player.next_action(client.mirror))
+        if time.monotonic() >= next_ping:
+            client.ping()
+            next_ping = time.monotonic() + 0.5
+            if client.rtt:
+                rtts.append(client.rtt)
+        await asyncio.sleep(60.0 / apm)
+    received = client.received
+    await client.close()
+    return received
+
+
+async def run_clients(port, matches, players, seconds, apm):
+    rng = random.Random(0)
+    rtts = []
+    received = await asyncio.gather(*(bot(port, apm, seconds, random.Random(rng.random()), rtts)
+                                      for _ in range(players * matches)))
+    return sum(received), rtts
+
+
+def run(matches, players, seconds, apm):
+    ports, results, stop = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Event()
+    proc = multiprocessing.Process(target=server_process, args=(ports, results, stop, players))
+    proc.start()
+    port = ports.get()
+    received, rtts = asyncio.run(run_clients(port, matches, players, seconds, apm))
+    stop.set()
+    tick_rate, sent, late = results.get()
+    proc.join()
+
+    rtts.sort()
+    print("matches           %d x %d players" % (matches, players))
+    print("server tick rate  %.1f / %d Hz" % (tick_rate, config['tick_rate']))
+    print("sent by server    %.1f KB/s total, %.0f B/s per player" % (
+        sent / seconds / 1024.0, sent / seconds / (players * matches)))
+    print("received          %d bytes" % received)
+    print("late inputs       %d" % late)
+    if rtts:
+        print("rtt p50 / p99     %.2f / %.2f ms" % (rtts[len(rtts) // 2] * 1e3,
+                                                   rtts[int(len(rtts) * 0.99)] * 1e3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the match server on loopback.")
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--players', type=int, default=2, help="players per match")
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--apm', type=float, default=120, help="inputs per minute per player")
+    args = parser.parse_args()
+    run(args.matches, args.players, args.seconds, args.apm)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Tick cost against player count (see core.py).
+#
+# Runs seeded headless matches of 2, 4, 8... players, every player a greedy
+# bot (from batch.py) at a fixed input rate, and times core.tick() alone:
+# latched inputs, gravity, locks, line clears and garbage routing. Bot
+# planning is left out. A match that ends is replaced by a fresh one.
+#
+#   python benchmarks/bench_players.py [--players 2 4 8 16] [--ticks 20000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import GreedyBot
+from board import config
+from core import TetrisCore, ROUTINGS
+
+
+def run(players, ticks, apm, seed):
+    every = max(1, int(config['tick_rate'] * 60.0 / apm))
+    rng = random.Random(seed)
+    spent = 0.0
+    matches = locks = 0
+    core = None
+    for t in range(ticks):
+        if core is None or core.gameover:
+            core = TetrisCore(seed + matches, players)
+            bots = [GreedyBot(p.number, 0.1, rng) for p in core.players]
+            matches += 1
+        if t % every == 0:
+            for bot in bots:
+                core.handle(bot.player, bot.next_action(core))
+        before = sum(p.pieces for p in core.players)
+        start = time.perf_counter()
+        core.tick()
+        spent += time.perf_counter() - start
+        locks += sum(p.pieces for p in core.players) - before
+    print("%3d players  %7.1f us/tick  %6.2f us/tick/player  %6d locks  %4d matches" % (
+        players, spent / ticks * 1e6, spent / ticks / players * 1e6, locks, matches))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tick cost against player count.")
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 4, 8, 16])
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--apm', type=float, default=120, help="inputs per minute per player")
+    parser.add_argument('--routing', choices=ROUTINGS, default=config['garbage_routing'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    config['garbage_routing'] = args.routing
+    for players in args.players:
+        run(players, args.ticks, args.apm, args.seed)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Frame-time benchmark: full redraw (fill + one draw.rect per cell + full
+# display.update) vs BoardRenderer's dirty-rect path, on two nearly full
+# boards with a stone moving every frame.
+#
+#   python benchmarks/bench_render.py [frames]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from board import config, colors, shape_rotations, new_board, join_matrices
+from render import BoardRenderer
+
+
+def nearly_full_board(seed):
+    board = new_board()
+    rng = random.Random(seed)
+    for y in range(3, config['rows']):
+        for x in range(config['cols']):
+            if rng.random() < 0.9:
+                join_matrices(board, ((rng.randrange(1, len(colors)),),), (x, y))
+    return board
+
+
+def draw_matrix(screen, matrix, offset):
+    # The pre-BoardRenderer drawing path
+    off_x, off_y = offset
+    for y, row in enumerate(matrix):
+        for x, val in enumerate(row):
+            if val:
+                pygame.draw.rect(
+                    screen, colors[val],
+                    pygame.Rect((off_x + x)*config['cell_size'],
+                                (off_y + y)*config['cell_size'],
+                                config['cell_size'], config['cell_size']), 0)
+
+
+def stone_at(frame):
+    # An I piece sliding back and forth over the stack
+    shape = shape_rotations[5][0].shape
+    return shape, frame % (config['cols'] - 3), 1
+
+
+def full_redraw(screen, boards, frames):
+    offset_2 = config['cols'] + 2
+    start = time.perf_counter()
+    for frame in range(frames):
+        shape, x, y = stone_at(frame)
+        screen.fill((0, 0, 0))
+        draw_matrix(screen, boards[0], (0, 0))
+        draw_matrix(screen, shape, (x, y))
+        draw_matrix(screen, boards[1], (offset_2, 0))
+        draw_matrix(screen, shape, (x + offset_2, y))
+        pygame.display.update()
+    return (time.perf_counter() - start) / frames
+
+
+def dirty_redraw(screen, boards, frames):
+    renderers = (BoardRenderer(screen, 0), BoardRenderer(screen, config['cols'] + 2))
+    screen.fill((0, 0, 0))
+    pygame.display.update()
+    start = time.perf_counter()
+    for frame in range(frames):
+        shape, x, y = stone_at(frame)
+        dirty = []
+        for renderer, board in zip(renderers, boards):
+            dirty += renderer.draw(board, shape, x, y)
+        pygame.display.update(dirty)
+    return (time.perf_counter() - start) / frames
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pygame.init()
+    width  = config['cell_size'] * config['cols'] * 2 + 40
+    height = config['cell_size'] * config['rows']
+    screen = pygame.display.set_mode((width, height))
+    boards = (nearly_full_board(1), nearly_full_board(2))
+
+    t_full = full_redraw(screen, boards, frames)
+    full_pixels = pygame.image.tostring(screen, 'RGB')
+    t_dirty = dirty_redraw(screen, boards, frames)
+    same = pygame.image.tostring(screen, 'RGB') == full_pixels
+    pygame.quit()
+
+    print("full redraw   %8.1f us/frame" % (t_full * 1e6))
+    print("dirty rects   %8.1f us/frame" % (t_dirty * 1e6))
+    print("speedup       %8.2fx" % (t_full / t_dirty))
+    print("identical final frame: %s" % same)
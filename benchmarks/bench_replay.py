@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Input pipeline benchmark on a landmark recording (see capture.py).
+#
+# Replays the recording through VisionWorker as fast as possible and
+# classifies every result the way the game loop does. With --infer the
+# stored frames go through Mediapipe again, which needs a recording made
+# with --frames; add --governor to let InferenceGovernor scale, crop and
+# skip that work.
+#
+#   python benchmarks/bench_replay.py DIR [--infer [--governor]] [--realtime]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import ReplaySource
+from governor import InferenceGovernor
+from gestures import classify, hand_centers
+from vision import VisionWorker
+
+
+def run(path, infer, realtime, governed=False):
+    detector = None
+    if infer:
+        import mediapipe as mp
+        detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=2,
+                                            min_detection_confidence=0.8,
+                                            min_tracking_confidence=0.5)
+    source = ReplaySource(path, realtime=realtime, landmarks=not infer)
+    governor = InferenceGovernor() if governed else None
+    worker = VisionWorker(source, detector, governor=governor)
+
+    latencies = []
+    hands_seen = 0
+    start = time.perf_counter()
+    worker.start()
+    while True:
+        latest = worker.poll()
+        if latest is None:
+            if worker.error:
+                break
+            time.sleep(0.0005)
+            continue
+        t, _, hands, _ = latest
+        classify(hands)
+        hand_centers(hands)
+        hands_seen += len(hands)
+        latencies.append(time.monotonic() - t)
+    elapsed = time.perf_counter() - start
+    worker.stop()
+
+    produced = worker.results.published
+    latencies.sort()
+    print("frames produced   %d" % produced)
+    print("frames consumed   %d (%d dropped)" % (worker.results.consumed, worker.results.dropped))
+    print("hands classified  %d" % hands_seen)
+    print("throughput        %.1f frames/s" % (produced / elapsed))
+    if latencies:
+        print("source->game p50  %.2f ms" % (latencies[len(latencies) // 2] * 1e3))
+        print("source->game p99  %.2f ms" % (latencies[int(len(latencies) * 0.99)] * 1e3))
+    if governor is not None:
+        print(governor.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the input pipeline on a recording.")
+    parser.add_argument('path')
+    parser.add_argument('--infer', action='store_true', help="re-run Mediapipe on stored frames")
+    parser.add_argument('--governor', action='store_true',
+                        help="with --infer, adapt resolution/ROI/frame skipping")
+    parser.add_argument('--realtime', action='store_true', help="replay at the recorded pace")
+    args = parser.parse_args()
+    run(args.path, args.infer, args.realtime, args.governor)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Startup cost benchmark (see startup.py).
+#
+# Every run is a fresh interpreter, so imports are cold as far as Python is
+# concerned (the OS file cache stays warm after the first run). Reports, as
+# medians over the runs:
+#   game modules    what Tetris.py imports before its window can open
+#   import cv2 / import mediapipe
+#   detector        building one 2-hand Mediapipe detector
+#   first inference process() on a blank frame, graph setup included
+#   next inference  the same again, which is what a warmed-up frame costs
+#
+#   python benchmarks/bench_startup.py [--runs 5]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, %r)
+out = {}
+t = time.perf_counter()
+import board, core, render, startup, profiler, timestep, snapshots, inputbus, ai
+out['game modules'] = time.perf_counter() - t
+t = time.perf_counter()
+import cv2
+out['import cv2'] = time.perf_counter() - t
+t = time.perf_counter()
+import mediapipe
+out['import mediapipe'] = time.perf_counter() - t
+t = time.perf_counter()
+detector = startup.make_detector(2)
+out['detector'] = time.perf_counter() - t
+t = time.perf_counter()
+startup.warm_up(detector)
+out['first inference'] = time.perf_counter() - t
+t = time.perf_counter()
+startup.warm_up(detector)
+out['next inference'] = time.perf_counter() - t
+print(json.dumps(out))
+''' % ROOT
+
+STAGES = ('game modules', 'import cv2', 'import mediapipe', 'detector',
+          'first inference', 'next inference')
+
+
+def run(runs):
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', PROBE], capture_output=True,
+                                text=True, check=True)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        for stage in STAGES:
+            samples[stage].append(timings[stage])
+    for stage in STAGES:
+        values = sorted(samples[stage])
+        print("%-16s %8.1f ms  (min %.1f, max %.1f)" % (
+            stage, values[len(values) // 2] * 1e3, values[0] * 1e3, values[-1] * 1e3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark startup stages in fresh processes.")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    run(args.runs)
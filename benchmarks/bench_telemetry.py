@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Telemetry cost benchmark (see telemetry.py).
+#
+# Plays the same seeded bot matches (batch.play_match) without and with a
+# TelemetryLog attached and reports the difference per match - what the
+# game thread pays for recording, since the writer thread does the JSON and
+# the file I/O. Then aggregates the log it wrote with telemetry.summarise.
+#
+#   python benchmarks/bench_telemetry.py [--matches 50] [--players 2]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import play_match
+from board import config
+from telemetry import TelemetryLog, summarise, leaderboard
+
+
+def play(matches, players, telemetry=None):
+    max_ticks = 1000 * config['tick_rate']
+    ticks = 0
+    start = time.perf_counter()
+    for seed in range(matches):
+        ticks += play_match(seed, 0.3, max_ticks, 0.1, players, telemetry)['ticks']
+    return time.perf_counter() - start, ticks
+
+
+def run(matches, players):
+    plain, ticks = play(matches, players)
+    path = os.path.join(tempfile.mkdtemp(), "telemetry.jsonl")
+    log = TelemetryLog(path)
+    recorded, _ = play(matches, players, log)
+    log.close()
+    print("%d matches, %d ticks" % (matches, ticks))
+    print("without telemetry  %8.3f s  %6.2f us/tick" % (plain, plain / ticks * 1e6))
+    print("with telemetry     %8.3f s  %6.2f us/tick  (+%.1f%%)" % (
+        recorded, recorded / ticks * 1e6, (recorded / plain - 1) * 100))
+
+    start = time.perf_counter()
+    rows = leaderboard(summarise(path))
+    elapsed = time.perf_counter() - start
+    print("%d events, %.1f MB; aggregated in %.3f s (%.0f events/s), %d players" % (
+        log.written, os.path.getsize(path) / 1e6, elapsed, log.written / elapsed, len(rows)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark telemetry recording and aggregation.")
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--players', type=int, default=2)
+    args = parser.parse_args()
+    run(args.matches, args.players)
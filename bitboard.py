@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Bitboard storage for a Tetris board.
+#
+# Every row is an int with bit x set when column x is filled, so collision is
+# one AND per piece row and a full row is a single compare. The colors live in
+# a separate plane (plain lists) that the renderer iterates exactly like the
+# list-of-lists board, which keeps BitBoard a drop-in for the helpers.
+
+
+# ------------------------------------------------------------------
+# PIECE MASKS
+# ------------------------------------------------------------------
+_masks = {}
+
+def _key(shape):
+    return shape if isinstance(shape, tuple) else tuple(map(tuple, shape))
+
+def piece_mask(shape):
+    """(width, ((dy, row_mask), ...)) for a shape, computed once per shape."""
+    key = _key(shape)
+    mask = _masks.get(key)
+    if mask is None:
+        rows = []
+        for dy, row in enumerate(key):
+            bits = 0
+            for dx, cell in enumerate(row):
+                if cell:
+                    bits |= 1 << dx
+            if bits:
+                rows.append((dy, bits))
+        mask = _masks[key] = (len(key[0]), tuple(rows))
+    return mask
+
+
+# ------------------------------------------------------------------
+# BITBOARD
+# ------------------------------------------------------------------
+class BitBoard:
+    def __init__(self, cols, rows):
+        self.cols  = cols
+        self.full  = (1 << cols) - 1
+        self.bits  = [0] * rows
+        self.cells = [[0] * cols for _ in range(rows)]
+        # The falling stone is checked many times in a row, so remember the
+        # mask of the last shape object we saw and skip the lookup for it.
+        self._shape = None
+        self._mask  = None
+
+    # List-like access to the color plane, for drawing and debugging
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __getitem__(self, y):
+        return self.cells[y]
+
+    def _mask_of(self, shape):
+        if shape is not self._shape:
+            self._shape = shape
+            self._mask = piece_mask(shape)
+        return self._mask
+
+    def collides(self, shape, offset):
+        off_x, off_y = offset
+        width, rows = self._mask_of(shape)
+        if off_x < 0 or off_x + width > self.cols:
+            return True
+        bits = self.bits
+        if off_y + rows[-1][0] >= len(bits):
+            return True
+        for dy, row_mask in rows:
+            if bits[off_y + dy] & (row_mask << off_x):
+                return True
+        return False
+
+    def join(self, shape, offset):
+        off_x, off_y = offset
+        for dy, mask in self._mask_of(shape)[1]:
+            self.bits[off_y + dy] |= mask << off_x
+        for cy, row in enumerate(shape):
+            cells = self.cells[off_y + cy]
+            for cx, val in enumerate(row):
+                if val:
+                    cells[off_x + cx] = val
+
+    def clear_lines(self):
+        """Drop every full row in one pass, returning how many went."""
+        full = self.full
+        if full not in self.bits:
+            return 0
+        kept = [y for y, bits in enumerate(self.bits) if bits != full]
+        cleared = len(self.bits) - len(kept)
+        if cleared:
+            self.bits  = [0] * cleared + [self.bits[y] for y in kept]
+            self.cells = ([[0] * self.cols for _ in range(cleared)] +
+                          [self.cells[y] for y in kept])
+        return cleared
+
+    def remove_row(self, y):
+        del self.bits[y]
+        del self.cells[y]
+        self.bits.insert(0, 0)
+        self.cells.insert(0, [0] * self.cols)
+
+    def push_row(self, row):
+        """Shift everything up one row and put `row` at the bottom."""
+        bits = 0
+        for x, val in enumerate(row):
+            if val:
+                bits |= 1 << x
+        del self.bits[0]
+        del self.cells[0]
+        self.bits.append(bits)
+        self.cells.append(list(row))
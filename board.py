@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Board, pieces and rules for the game, kept free of pygame/cv2 so they can
+# be imported (and benchmarked) without a display or a camera.
+#
+# Boards come in two flavours behind the same helpers: the original list of
+# lists, or a BitBoard (see bitboard.py). config['board_engine'] picks which
+# one new_board() hands out; every helper accepts either.
+
+import random
+from collections import namedtuple
+
+from bitboard import BitBoard, piece_mask
+
+# ------------------------------------------------------------------
+# TETRIS CONFIG
+# ------------------------------------------------------------------
+config = {
+    'cell_size':  20,
+    'cols':       10,  # typical Tetris width
+    'rows':       20,  # typical Tetris height
+    'delay':      500, # ms between automatic piece drops at level 0
+    'tick_rate':  60,  # fixed logic steps per second
+    'gravity_speedup': 0.8,  # drop delay multiplier per level
+    'lines_per_level': 10,
+    'lock_delay':  500, # ms a landed piece can still slide before it locks
+    'lock_resets': 15,  # moves/rotations that may restart the lock delay
+    'maxfps':     30,
+    'hud_height': 20,  # px strip under the boards for score/lines/next
+    'repeat_delay':    250, # ms a held move waits before repeating
+    'repeat_interval': 100, # ms between repeated moves while held
+    'drop_repeat_delay':    100, # same, for a held fist (soft drop)
+    'drop_repeat_interval': 50,
+    'gesture_window':  5,   # frames of gesture history each player votes over
+    'gesture_enter':   3,   # votes a gesture needs to start
+    'gesture_release': 2,   # votes below which it stops
+    'board_engine': 'bitboard', # 'bitboard' or 'list'
+    'shared_bag':   True,       # both players get the same piece sequence
+    'gesture_hz':   15,         # detector rate the vision governor aims to hold
+    'calibration':  None,       # gesture profile from calibration.py, loaded at startup
+    'net_input_delay': 4,       # ticks between an input and its networked effect
+    'garbage_routing': 'random', # who gets sent garbage with 3+ players: 'random',
+                                 # 'attacker' (whoever last attacked you) or 'even'
+    'ai_apm':       180,        # moves per minute the computer opponent may make
+    'ai_depth':     1,          # upcoming pieces the opponent looks ahead (0-2)
+    'ai_budget':    8,          # ms of search per piece
+    'ai_weights':   None        # overrides for ai.DEFAULT_WEIGHTS
+}
+
+colors = [
+    (0,   0,   0),     # dummy (index 0)
+    (255, 0,   0),     # 1
+    (0,   150, 0),     # 2
+    (0,   0,   255),   # 3
+    (255, 120, 0),     # 4
+    (255, 255, 0),     # 5
+    (180, 0,   255),   # 6
+    (0,   220, 220)    # 7
+]
+
+tetris_shapes = [
+    [[1, 1, 1],
+     [0, 1, 0]],
+
+    [[0, 2, 2],
+     [2, 2, 0]],
+
+    [[3, 3, 0],
+     [0, 3, 3]],
+
+    [[4, 0, 0],
+     [4, 4, 4]],
+
+    [[0, 0, 5],
+     [5, 5, 5]],
+
+    [[6, 6, 6, 6]],
+
+    [[7, 7],
+     [7, 7]]
+]
+
+piece_names = 'TSZJLIO'  # same order as tetris_shapes
+
+line_scores = [0, 40, 100, 300, 1200]  # by lines cleared at once
+
+# ------------------------------------------------------------------
+# HELPER FUNCTIONS
+# ------------------------------------------------------------------
+def rotate_clockwise(shape):
+    return [
+        [ shape[y][x] for y in range(len(shape)) ]
+        for x in range(len(shape[0]) - 1, -1, -1)
+    ]
+
+def check_collision(board, shape, offset):
+    if isinstance(board, BitBoard):
+        return board.collides(shape, offset)
+    off_x, off_y = offset
+    for cy, row in enumerate(shape):
+        for cx, cell in enumerate(row):
+            if cell:
+                if (cx + off_x < 0 or 
+                    cx + off_x >= config['cols'] or
+                    cy + off_y >= config['rows'] or
+                    board[cy + off_y][cx + off_x]):
+                    return True
+    return False
+
+def remove_row(board, row):
+    if isinstance(board, BitBoard):
+        board.remove_row(row)
+        return board
+    del board[row]
+    return [[0 for _ in range(config['cols'])]] + board
+
+def join_matrices(mat1, mat2, mat2_off):
+    if isinstance(mat1, BitBoard):
+        mat1.join(mat2, mat2_off)
+        return mat1
+    off_x, off_y = mat2_off
+    for cy, row in enumerate(mat2):
+        for cx, val in enumerate(row):
+            if val:
+                mat1[cy + off_y][cx + off_x] = val
+    return mat1
+
+def clear_lines(board):
+    """Remove every full row in a single pass. Returns (board, lines)."""
+    if isinstance(board, BitBoard):
+        return board, board.clear_lines()
+    if all(0 in row for row in board):
+        return board, 0
+    kept = [row for row in board if 0 in row]
+    cleared = len(board) - len(kept)
+    if cleared:
+        board = [[0 for _ in range(config['cols'])]
+                 for _ in range(cleared)] + kept
+    return board, cleared
+
+def board_bits(board):
+    """The board as one int per row, bit x set where column x is filled."""
+    if isinstance(board, BitBoard):
+        return board.bits
+    return [sum(1 << x for x, val in enumerate(row) if val) for row in board]
+
+def new_board():
+    if config['board_engine'] == 'bitboard':
+        return BitBoard(config['cols'], config['rows'])
+    return [
+        [0 for _ in range(config['cols'])] 
+        for _ in range(config['rows'])
+    ]
+
+def add_garbage(board, lines, rng=random):
+    """Send garbage lines to the *bottom* of the board with a random hole."""
+    if lines <= 0:
+        return board
+    for _ in range(lines):
+        hole = rng.randrange(config['cols'])
+        new_row = [1]*config['cols']
+        new_row[hole] = 0
+        if isinstance(board, BitBoard):
+            board.push_row(new_row)
+        else:
+            board.pop(0)
+            board.append(new_row)
+    return board
+
+# ------------------------------------------------------------------
+# ROTATION TABLE
+# ------------------------------------------------------------------
+# Every piece is canonicalised once at import: shape_rotations[piece][rot]
+# holds an immutable tuple-of-tuples shape plus its size and filled cells.
+# Stones only carry (piece, rot), so rotating is an index bump and nothing
+# can ever write into a shared shape.
+Rotation = namedtuple('Rotation', 'shape index width height cells')
+
+def _build_rotations(shape):
+    rotations = []
+    shape = tuple(map(tuple, shape))
+    while all(shape != r.shape for r in rotations):
+        cells = tuple((x, y) for y, row in enumerate(shape)
+                             for x, val in enumerate(row) if val)
+        rotations.append(Rotation(shape, len(rotations),
+                                  len(shape[0]), len(shape), cells))
+        shape = tuple(map(tuple, rotate_clockwise(shape)))
+    return tuple(rotations)
+
+shape_rotations = tuple(_build_rotations(shape) for shape in tetris_shapes)
+
+def next_rotation(piece, rot):
+    return (rot + 1) % len(shape_rotations[piece])
+
+# Build the bit masks for every rotation of every piece up front
+for _rotations in shape_rotations:
+    for _rotation in _rotations:
+        piece_mask(_rotation.shape)
+
+
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Per-player gesture calibration.
+#
+# The fixed move zones and finger rules suit one camera placement and one
+# kind of hand. Calibration records each player holding five poses (neutral
+# open hand, open hand moved left, moved right, fist, pointing) and fits:
+#
+#   shape  a nearest-centroid model over the finger features of gestures.py
+#          (PIP straightness and tip reach for index..pinky), with open,
+#          fist and point as the classes and every feature scaled by its
+#          within-class spread
+#   zones  left/right thresholds halfway between the neutral hand's x and
+#          the left/right hands' x
+#
+# Profiles are saved as one small .npz (float32 arrays, all players in one
+# file). Loading compiles each player into a PlayerCalibration: the centroid
+# distances fold into one (8, 3) matrix product plus a bias, and the zones
+# into a 256-entry table indexed by the quantised hand x, so a frame costs
+# one matmul and one table lookup per hand.
+#
+#   python calibration.py record PROFILE [--players 2] [--seconds 3]
+#   python calibration.py info PROFILE
+
+import argparse
+import time
+
+import numpy as np
+
+from gestures import finger_features, hand_centers, INDEX
+
+POSES = ('neutral', 'left', 'right', 'fist', 'point')
+SHAPES = ('open', 'fist', 'point')      # classes of the shape model
+SHAPE_OF = {'neutral': 0, 'left': 0, 'right': 0, 'fist': 1, 'point': 2}
+SHAPE_ACTIONS = (None, 'drop', 'rotate')
+ZONE_ACTIONS = (None, 'left', 'right')
+ZONE_BINS = 256
+
+PROMPTS = {
+    'neutral': "open hand, in the middle",
+    'left':    "open hand, moved to the left",
+    'right':   "open hand, moved to the right",
+    'fist':    "fist",
+    'point':   "point with the index finger",
+}
+
+
+def hand_features(hands):
+    """(N, 8) float32 shape features: straightness then reach, index..pinky."""
+    straight, reach = finger_features(hands)
+    return np.concatenate([straight[:, INDEX:], reach[:, INDEX:]], axis=1).astype(np.float32)
+
+
+# ------------------------------------------------------------------
+# FITTING
+# ------------------------------------------------------------------
+def fit(samples):
+    """(centroids (3, 8), scale (8,), zones (3,)) from {pose: (N, 21, 3) landmarks}."""
+    missing = [pose for pose in POSES if len(samples.get(pose, ())) == 0]
+    if missing:
+        raise ValueError("no samples for %s" % ", ".join(missing))
+    features = {pose: hand_features(samples[pose]) for pose in POSES}
+
+    centroids = np.zeros((len(SHAPES), features['fist'].shape[1]), np.float32)
+    spread = []
+    for shape in range(len(SHAPES)):
+        rows = np.concatenate([features[pose] for pose in POSES if SHAPE_OF[pose] == shape])
+        centroids[shape] = rows.mean(axis=0)
+        spread.append(rows - centroids[shape])
+    scale = np.maximum(np.concatenate(spread).std(axis=0), 1e-3).astype(np.float32)
+
+    x = {pose: float(np.median(hand_centers(samples[pose]))) for pose in ('neutral', 'left', 'right')}
+    if not x['left'] < x['neutral'] < x['right']:
+        raise ValueError("left, neutral and right hands must be left to right in the frame")
+    left_below = (x['left'] + x['neutral']) / 2
+    right_above = (x['neutral'] + x['right']) / 2
+    right_below = min(1.0, x['right'] + (x['right'] - right_above))
+    return centroids, scale, np.array([left_below, right_above, right_below], np.float32)
+
+
+def save(path, profiles):
+    """Write {player: (centroids, scale, zones)} to one compressed .npz."""
+    players = sorted(profiles)
+    np.savez_compressed(path,
+                        players=np.array(players, np.uint8),
+                        centroids=np.stack([profiles[p][0] for p in players]).astype(np.float32),
+                        scale=np.stack([profiles[p][1] for p in players]).astype(np.float32),
+                        zones=np.stack([profiles[p][2] for p in players]).astype(np.float32))
+
+
+# ------------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------------
+class PlayerCalibration:
+    """One player's profile, compiled for per-frame use."""
+
+    def __init__(self, centroids, scale, zones):
+        self.zones = tuple(float(z) for z in zones)
+        # argmin |(f - c) / s|^2 == argmax f . (2c / s^2) - |c / s|^2
+        weighted = centroids / scale ** 2
+        self.weights = (2 * weighted).T.astype(np.float32)              # (8, 3)
+        self.bias = -(centroids * weighted).sum(axis=1).astype(np.float32)
+
+        left_below, right_above, right_below = self.zones
+        centers = (np.arange(ZONE_BINS) + 0.5) / ZONE_BINS
+        self.table = np.zeros(ZONE_BINS, np.int8)
+        self.table[centers < left_below] = 1
+        self.table[(centers > right_above) & (centers < right_below)] = 2
+
+    def action(self, features, center_x):
+        """The raw action for one hand's (8,) features and x."""
+        shape = int(np.argmax(features @ self.weights + self.bias))
+        if shape:
+            return SHAPE_ACTIONS[shape]
+        return ZONE_ACTIONS[self.table[min(ZONE_BINS - 1, max(0, int(center_x * ZONE_BINS)))]]
+
+
+def load(path):
+    """{player: PlayerCalibration} from a profile written by save()."""
+    with np.load(path) as data:
+        return {int(p): PlayerCalibration(c, s, z)
+                for p, c, s, z in zip(data['players'], data['centroids'],
+                                      data['scale'], data['zones'])}
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def record(path, players, seconds, settle=2.0):
+    import cv2
+    from capture import CameraSource
+    from startup import make_detector
+    from gestures import landmarks_to_array
+    from vision import draw_hands
+
+    source = CameraSource()
+    detector = make_detector(1)
+    profiles = {}
+    try:
+        for player in range(1, players + 1):
+            samples = {}
+            for pose in POSES:
+                prompt = "Player %d: %s" % (player, PROMPTS[pose])
+                print(prompt)
+                start = time.monotonic()
+                hands = []
+                while time.monotonic() < start + settle + seconds:
+                    item = source.read()
+                    if item is None:
+                        raise SystemExit("camera stopped")
+                    _, frame, _ = item
+                    found = landmarks_to_array(
+                        detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+                    # Give the player a moment to get into the pose first
+                    if len(found) and time.monotonic() >= start + settle:
+                        hands.append(found[0])
+                    draw_hands(frame, found)
+                    cv2.putText(frame, prompt, (4, 16), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                                (255, 255, 255), 1)
+                    cv2.imshow("Calibration", frame)
+                    cv2.waitKey(1)
+                samples[pose] = np.array(hands, np.float32).reshape(-1, 21, 3)
+                print("  %d samples" % len(samples[pose]))
+            profiles[player] = fit(samples)
+    finally:
+        source.release()
+        cv2.destroyAllWindows()
+    save(path, profiles)
+    print("Saved %d profile(s) to %s" % (len(profiles), path))
+
+def info(path):
+    for player, calibration in sorted(load(path).items()):
+        print("Player %d: left below %.3f, right %.3f..%.3f" % ((player,) + calibration.zones))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or inspect gesture calibration profiles.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    rec = commands.add_parser('record', help="calibrate players in front of the camera")
+    rec.add_argument('path')
+    rec.add_argument('--players', type=int, default=2)
+    rec.add_argument('--seconds', type=float, default=3, help="seconds of samples per pose")
+    show = commands.add_parser('info', help="print a profile's thresholds")
+    show.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.path, args.players, args.seconds)
+    else:
+        info(args.path)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Capture sources for the vision pipeline, plus landmark recording/replay.
+#
+# A source's read() returns (timestamp, frame, hands) or None when it has
+# nothing more to give. `hands` is an (N, 21, 3) landmark array, or None when
+# the frame still has to go through the hand detector.
+#
+# Recordings are a directory of chunk_NNNNNN.npz files. Each chunk holds
+#   t       (K,)        float64 capture timestamps, seconds
+#   counts  (K,)        uint8   hands per frame
+#   hands   (sum, 21, 3) float32 landmarks of all hands, in frame order
+#   frames  (K, H, W, 3) uint8  optional, the flipped BGR frames
+#
+#   python capture.py record DIR [--frames] [--seconds N]
+#   python capture.py info DIR
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+# ------------------------------------------------------------------
+# CAMERA
+# ------------------------------------------------------------------
+class CameraSource:
+    """The camera; frames are mirrored unless flip=False, so the screen acts as a mirror."""
+
+    def __init__(self, index=0, width=320, height=240, flip=True):
+        self.name = "camera %d" % index
+        self.flip = flip
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        return time.monotonic(), cv2.flip(frame, 1) if self.flip else frame, None
+
+    def release(self):
+        self.cap.release()
+
+
+# ------------------------------------------------------------------
+# RECORDING
+# ------------------------------------------------------------------
+class LandmarkRecorder:
+    """Buffers landmark streams and writes them out one npz chunk at a time."""
+
+    def __init__(self, path, save_frames=False, chunk_size=256):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.save_frames = save_frames
+        self.chunk_size = chunk_size
+        self.chunks = len(glob.glob(os.path.join(path, 'chunk_*.npz')))
+        self._reset()
+
+    def _reset(self):
+        self.times, self.counts, self.hands, self.frames = [], [], [], []
+
+    def write(self, t, hands, frame=None):
+        self.times.append(t)
+        self.counts.append(len(hands))
+        self.hands.append(hands)
+        if self.save_frames and frame is not None:
+            self.frames.append(frame)
+        if len(self.times) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.times:
+            return
+        arrays = {
+            't':      np.array(self.times, np.float64),
+            'counts': np.array(self.counts, np.uint8),
+            'hands':  np.concatenate(self.hands).astype(np.float32),
+        }
+        if self.frames and len(self.frames) == len(self.times):
+            arrays['frames'] = np.stack(self.frames)
+        name = os.path.join(self.path, 'chunk_%06d.npz' % self.chunks)
+        np.savez_compressed(name, **arrays)
+        self.chunks += 1
+        self._reset()
+
+    def close(self):
+        self.flush()
+
+
+def read_chunks(path):
+    """Yield (t, counts, hands, frames-or-None) for every chunk in order."""
+    for name in sorted(glob.glob(os.path.join(path, 'chunk_*.npz'))):
+        with np.load(name) as chunk:
+            frames = chunk['frames'] if 'frames' in chunk.files else None
+            yield chunk['t'], chunk['counts'], chunk['hands'], frames
+
+
+# ------------------------------------------------------------------
+# REPLAY
+# ------------------------------------------------------------------
+class ReplaySource:
+    """Plays a recording back at its original pace or as fast as possible.
+
+    With landmarks=False the stored frames are handed out without their
+    landmarks, so they go through the detector again (needs --frames).
+    """
+
+    def __init__(self, path, realtime=True, landmarks=True, loop=False):
+        self.name = "replay %s" % path
+        self.path = path
+        self.realtime = realtime
+        self.landmarks = landmarks
+        self.loop = loop
+        self.stopped = False
+        self._items = self._iter()
+        self._start = None   # (wall clock, recording clock) of the first frame
+
+    def _iter(self):
+        while True:
+            played = False
+            for times, counts, hands, frames in read_chunks(self.path):
+                if not self.landmarks and frames is None:
+                    raise ValueError("%s has no frames to run inference on" % self.path)
+                ends = np.cumsum(counts)
+                starts = ends - counts
+                for i, t in enumerate(times):
+                    if self.stopped:
+                        return
+                    frame = frames[i] if frames is not None else None
+                    stored = hands[starts[i]:ends[i]] if self.landmarks else None
+                    played = True
+                    yield float(t), frame, stored
+            if not self.loop:
+                return
+            # Looping over nothing would spin here forever
+            if not played:
+                raise ValueError("%s has no frames to replay" % self.path)
+            self._start = None
+
+    def read(self):
+        if self.stopped:
+            return None
+        item = next(self._items, None)
+        if item is None:
+            return None
+        t, frame, hands = item
+        now = time.monotonic()
+        if self._start is None:
+            self._start = (now, t)
+        if self.realtime:
+            wait = (self._start[0] + t - self._start[1]) - now
+            if wait > 0:
+                time.sleep(wait)
+                now += wait
+        # Hand out the replay-time timestamp so latencies stay meaningful
+        return now, frame, hands
+
+    def release(self):
+        # The vision thread may be inside next() right now, and a running
+        # generator can't be closed from another thread. The flag makes it
+        # return at its next frame, which closes it from that side
+        self.stopped = True
+        try:
+            self._items.close()
+        except ValueError:
+            pass
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def record(path, save_frames, seconds):
+    import mediapipe as mp
+    from gestures import landmarks_to_array
+
+    source = CameraSource()
+    detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=2,
+                                        min_detection_confidence=0.8,
+                                        min_tracking_confidence=0.5)
+    recorder = LandmarkRecorder(path, save_frames)
+    end = time.monotonic() + seconds if seconds else None
+    frames = 0
+    try:
+        while end is None or time.monotonic() < end:
+            item = source.read()
+            if item is None:
+                break
+            t, frame, _ = item
+            results = detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            recorder.write(t, landmarks_to_array(results), frame)
+            frames += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+        source.release()
+    print("Recorded %d frames to %s" % (frames, path))
+
+def info(path):
+    frames = hands = 0
+    first = last = None
+    has_frames = False
+    for times, counts, _, stored in read_chunks(path):
+        frames += len(times)
+        hands += int(counts.sum())
+        first = times[0] if first is None else first
+        last = times[-1]
+        has_frames = has_frames or stored is not None
+    if not frames:
+        print("%s: empty" % path)
+        return
+    duration = last - first
+    print("%s: %d frames, %d hands, %.1f s (%.1f fps), frames stored: %s" % (
+        path, frames, hands, duration, (frames - 1) / duration if duration else 0.0,
+        has_frames))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or inspect landmark streams.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    rec = commands.add_parser('record', help="record from the camera")
+    rec.add_argument('path')
+    rec.add_argument('--frames', action='store_true', help="store the frames too")
+    rec.add_argument('--seconds', type=float, default=None)
+    show = commands.add_parser('info', help="summarise a recording")
+    show.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.path, args.frames, args.seconds)
+    else:
+        info(args.path)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Headless game state for an N-player match.
+#
+# TetrisCore owns one PlayerState per player (board, stone, timers,
+# counters) and is stepped purely by tick() and handle(), so it runs without
+# a display or camera. A tick is one fixed 1/tick_rate second logic step:
+# first every player's latched inputs are applied, then gravity (which
+# speeds up with level) and lock delay. Headless callers may tick as fast as
+# they like. Tetris2P adds pygame + the camera on top.
+#
+# Garbage: lines a player sends are routed to one or more opponents
+# (config['garbage_routing']) and queued there; the receiver gets them all
+# in one batch the next time one of their own stones locks. Players are
+# numbered from 1, everywhere.
+#
+# Telemetry: when core.telemetry is set (a telemetry.MatchRecorder), locks,
+# garbage and top-outs are reported to it as they happen. It only buffers;
+# with it unset each hook costs one attribute test.
+
+import random
+
+from board import (config, shape_rotations, next_rotation, check_collision,
+                   join_matrices, clear_lines, new_board, add_garbage,
+                   line_scores)
+from randomizer import PieceGenerator
+
+
+def level(lines):
+    return lines // config['lines_per_level']
+
+def gravity_ticks(lines):
+    """Ticks between gravity rows for a player who has cleared `lines`."""
+    ms = config['delay'] * config['gravity_speedup'] ** level(lines)
+    return max(1, round(ms * config['tick_rate'] / 1000.0))
+
+def garbage_sent(lines, b2b):
+    """Lines a clear sends: one less than cleared, 4 for a Tetris, 5 back-to-back."""
+    if lines == 4:
+        return 5 if b2b else 4
+    return max(0, lines - 1)
+
+
+ACTIONS = ('left', 'right', 'rotate', 'drop', 'garbage')
+ROUTINGS = ('random', 'attacker', 'even')
+
+
+class PlayerState:
+    """Everything one player owns."""
+
+    def __init__(self, number):
+        self.number   = number
+        self.board    = new_board()
+        self.gameover = False
+        self.b2b      = False   # last clear was a Tetris
+
+        # Falling stone: (piece, rot) index shape_rotations
+        self.piece = self.rot = self.x = self.y = 0
+
+        # Gravity and lock delay, in ticks. fall counts up to the next
+        # gravity row; lock counts down once the stone has landed (None
+        # while it is still in the air)
+        self.fall       = 0
+        self.fall_every = 1
+        self.lock       = None
+        self.resets     = 0
+
+        # Counters, for stats
+        self.pieces  = 0
+        self.lines   = 0
+        self.garbage = 0        # garbage lines sent
+        self.score   = 0
+
+        # Garbage waiting for this player's next lock, and who sent the last
+        self.incoming = 0
+        self.attacker = 0       # player number, 0 for nobody yet
+        self.split    = 0       # where the next even split starts
+
+        self.latch = []         # inputs since the last tick
+
+    @property
+    def stone(self):
+        return shape_rotations[self.piece][self.rot].shape
+
+
+class TetrisCore:
+    def __init__(self, seed=None, players=2, routing=None):
+        # All randomness (piece streams, garbage holes, random targets)
+        # derives from the match seed, so a seed plus the inputs replays a
+        # match exactly
+        self.bag  = PieceGenerator(len(shape_rotations), seed, config['shared_bag'], players)
+        self.seed = self.bag.seed
+        self.routing = config['garbage_routing'] if routing is None else routing
+        if self.routing not in ROUTINGS:
+            raise ValueError("unknown garbage routing %r" % self.routing)
+
+        # State; one tick is 1/tick_rate seconds of game time
+        self.ticks  = 0
+        self.paused = False
+        self.telemetry = None
+        self.lock_ticks = max(1, round(config['lock_delay'] * config['tick_rate'] / 1000.0))
+
+        self.players = [PlayerState(n) for n in range(1, players + 1)]
+        for player in self.players:
+            self.new_stone(player)
+
+    def player(self, number):
+        return self.players[number - 1]
+
+    # ----------------------------------------------------------------
+    # Stone Management
+    # ----------------------------------------------------------------
+    # Stones are (piece, rotation) indices into shape_rotations; the shape
+    # itself is a shared immutable tuple looked up on demand.
+    def new_stone(self, p):
+        p.piece = self.bag.next(p.number)
+        p.rot = 0
+        p.x = config['cols'] // 2 - shape_rotations[p.piece][0].width // 2
+        p.y = 0
+        p.fall = 0
+        p.fall_every = gravity_ticks(p.lines)
+        p.lock = None
+        p.resets = config['lock_resets']
+        if check_collision(p.board, p.stone, (p.x, p.y)):
+            p.gameover = True
+            if self.telemetry is not None:
+                self.telemetry.emit('topout', p.number)
+
+    # ----------------------------------------------------------------
+    # Moves
+    # ----------------------------------------------------------------
+    def move(self, p, delta_x):
+        new_x = p.x + delta_x
+        if new_x < 0:
+            new_x = 0
+        width = shape_rotations[p.piece][p.rot].width
+        if new_x > config['cols'] - width:
+            new_x = config['cols'] - width
+        if new_x != p.x and not check_collision(p.board, p.stone, (new_x, p.y)):
+            p.x = new_x
+            self.moved(p)
+
+    def rotate(self, p):
+        new_rot = next_rotation(p.piece, p.rot)
+        new_stone = shape_rotations[p.piece][new_rot].shape
+        if not check_collision(p.board, new_stone, (p.x, p.y)):
+            p.rot = new_rot
+            self.moved(p)
+
+    def moved(self, p):
+        # A landed stone that slides off its ledge falls again; one that is
+        # still resting gets its lock delay back, a limited number of times
+        if p.lock is None:
+            return
+        if not check_collision(p.board, p.stone, (p.x, p.y + 1)):
+            p.lock = None
+        elif p.resets > 0:
+            p.resets -= 1
+            p.lock = self.lock_ticks
+
+    def gravity(self, p):
+        if p.lock is not None:
+            p.lock -= 1
+            if p.lock <= 0:
+                p.lock = None
+                self.drop(p)
+            return
+        p.fall += 1
+        if p.fall < p.fall_every:
+            return
+        p.fall = 0
+        if check_collision(p.board, p.stone, (p.x, p.y + 1)):
+            p.lock = self.lock_ticks
+        else:
+            p.y += 1
+
+    def drop(self, p):
+        p.y += 1
+        if not check_collision(p.board, p.stone, (p.x, p.y)):
+            return
+        p.y -= 1
+        p.board = join_matrices(p.board, p.stone, (p.x, p.y))
+        p.board, lines_cleared = clear_lines(p.board)
+        p.pieces += 1
+        p.lines  += lines_cleared
+        p.score  += line_scores[lines_cleared]
+        if lines_cleared > 0:
+            garbage = garbage_sent(lines_cleared, p.b2b)
+            p.b2b = lines_cleared == 4
+        if self.telemetry is not None:
+            self.telemetry.emit('lock', p.number, piece=p.piece, lines=lines_cleared, b2b=p.b2b)
+        if lines_cleared > 0:
+            self.send_garbage(p, garbage)
+        # Everything that queued up while this stone fell arrives at once
+        if p.incoming:
+            if self.telemetry is not None:
+                self.telemetry.emit('received', p.number, lines=p.incoming)
+            p.board = add_garbage(p.board, p.incoming, self.bag.garbage)
+            p.incoming = 0
+        self.new_stone(p)
+
+    # ----------------------------------------------------------------
+    # Garbage routing
+    # ----------------------------------------------------------------
+    def send_garbage(self, p, lines):
+        if lines <= 0:
+            return
+        # Only lines that reach somebody count as sent
+        for target, count in self.targets(p, lines):
+            target.incoming += count
+            target.attacker = p.number
+            p.garbage += count
+            if self.telemetry is not None:
+                self.telemetry.emit('garbage', p.number, target=target.number, lines=count)
+
+    def targets(self, p, lines):
+        """[(opponent, lines)] for `lines` sent by `p` under the match's routing."""
+        opponents = [q for q in self.players if q is not p and not q.gameover]
+        if not opponents:
+            return []
+        if len(opponents) == 1:
+            return [(opponents[0], lines)]
+        if self.routing == 'even':
+            # Whole shares for everyone, the remainder rotates round the table
+            share, extra = divmod(lines, len(opponents))
+            start = p.split % len(opponents)
+            p.split = start + extra
+            order = opponents[start:] + opponents[:start]
+            return [(q, share + (i < extra)) for i, q in enumerate(order) if share + (i < extra)]
+        if self.routing == 'attacker':
+            for q in opponents:
+                if q.number == p.attacker:
+                    return [(q, lines)]
+        # Random target, seeded by who is sending and when so that it
+        # replays without a stream of its own
+        rng = random.Random("%s:target:%d:%d" % (self.seed, p.number, p.pieces))
+        return [(rng.choice(opponents), lines)]
+
+    # ----------------------------------------------------------------
+    # Misc
+    # ----------------------------------------------------------------
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+    def stone_state(self):
+        """Cheap fingerprint that changes whenever a stone moves or locks."""
+        return tuple((p.x, p.y, p.rot, p.pieces) for p in self.players)
+
+    def alive(self):
+        return [p for p in self.players if not p.gameover]
+
+    @property
+    def gameover(self):
+        """True once at most one player is left (or the only one topped out)."""
+        return len(self.alive()) < min(2, len(self.players))
+
+    def winner(self):
+        """Number of the last player standing, 0 if there isn't exactly one."""
+        alive = self.alive()
+        return alive[0].number if len(alive) == 1 else 0
+
+    def tick(self):
+        """Advance every player by one fixed logic step (1/tick_rate seconds)."""
+        if self.paused:
+            return
+        self.ticks += 1
+        for p in self.players:
+            if p.latch:
+                latch, p.latch = p.latch, []
+                for action in latch:
+                    if p.gameover:
+                        break
+                    self.apply(p, action)
+            if not p.gameover:
+                self.gravity(p)
+
+    def handle(self, player, action):
+        """Latch one input event ('left', 'right', 'rotate', 'drop', 'garbage') for the next tick."""
+        if not 1 <= player <= len(self.players):
+            return
+        p = self.players[player - 1]
+        if not p.gameover and not self.paused:
+            p.latch.append(action)
+
+    def apply(self, p, action):
+        if action == 'left':
+            self.move(p, -1)
+        elif action == 'right':
+            self.move(p, +1)
+        elif action == 'rotate':
+            self.rotate(p)
+        elif action == 'drop':
+            self.drop(p)
+        elif action == 'garbage':
+            # One line for whoever the routing picks
+            self.send_garbage(p, 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Vectorised hand-gesture classification.
+#
+# A Mediapipe result is turned into one (N_hands, 21, 3) float array, and
+# every hand in it is classified in a single batch of NumPy operations. A
+# finger counts as extended when it is nearly straight at the PIP joint and
+# its tip is further from the wrist than the PIP joint, which holds no
+# matter how the hand is turned. Everything below works on plain arrays,
+# so stored landmarks can be classified without a camera.
+
+import numpy as np
+
+# Mediapipe hand landmark indices
+WRIST = 0
+
+# (MCP, PIP, DIP, TIP) per finger; for the thumb (CMC, MCP, IP, TIP)
+FINGERS = np.array([
+    [1,  2,  3,  4],   # thumb
+    [5,  6,  7,  8],   # index
+    [9,  10, 11, 12],  # middle
+    [13, 14, 15, 16],  # ring
+    [17, 18, 19, 20],  # pinky
+])
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+TIPS = FINGERS[:, 3]
+
+# Bones, for drawing: each finger chain plus the palm outline
+HAND_CONNECTIONS = (
+    [(WRIST, 1), (WRIST, 5), (5, 9), (9, 13), (13, 17), (WRIST, 17)] +
+    [(int(a), int(b)) for finger in FINGERS for a, b in zip(finger, finger[1:])]
+)
+
+# Gesture codes
+NONE, OPEN, CLOSED, POINTING, SPECIAL = range(5)
+GESTURE_NAMES = ('none', 'open', 'closed', 'pointing', 'special')
+
+STRAIGHT_COS = 0.5   # cos of the bend at the PIP joint above which a finger is straight
+
+
+# ------------------------------------------------------------------
+# CONVERSION
+# ------------------------------------------------------------------
+def landmarks_to_array(results):
+    """All hands in a Mediapipe result as an (N, 21, 3) float32 array."""
+    hands = results.multi_hand_landmarks if results is not None else None
+    if not hands:
+        return np.empty((0, 21, 3), np.float32)
+    return np.array([[(p.x, p.y, p.z) for p in hand.landmark] for hand in hands],
+                    dtype=np.float32)
+
+
+# ------------------------------------------------------------------
+# FEATURES
+# ------------------------------------------------------------------
+def _unit(v):
+    return v / np.maximum(np.linalg.norm(v, axis=-1, keepdims=True), 1e-6)
+
+def finger_features(hands):
+    """Per-finger (N, 5) arrays: PIP straightness (cosine) and tip reach.
+
+    Reach is the tip's distance from the wrist minus the PIP joint's,
+    divided by the palm length (wrist to middle MCP).
+    """
+    joints = hands[:, FINGERS]                      # (N, 5, 4, 3)
+    proximal = _unit(joints[:, :, 1] - joints[:, :, 0])
+    distal   = _unit(joints[:, :, 3] - joints[:, :, 1])
+    straight = np.einsum('nfk,nfk->nf', proximal, distal)
+
+    wrist = hands[:, WRIST][:, None]                # (N, 1, 3)
+    palm = np.linalg.norm(hands[:, FINGERS[MIDDLE, 0]] - hands[:, WRIST], axis=-1)
+    tip_dist = np.linalg.norm(joints[:, :, 3] - wrist, axis=-1)
+    pip_dist = np.linalg.norm(joints[:, :, 1] - wrist, axis=-1)
+    reach = (tip_dist - pip_dist) / np.maximum(palm, 1e-6)[:, None]
+    return straight, reach
+
+def extended_fingers(hands):
+    """(N, 5) bool: which fingers of each hand are extended."""
+    straight, reach = finger_features(hands)
+    return (straight > STRAIGHT_COS) & (reach > 0)
+
+def hand_centers(hands):
+    """(N,) x of each hand: the mean of the five fingertips."""
+    return hands[:, TIPS, 0].mean(axis=1)
+
+
+# ------------------------------------------------------------------
+# CLASSIFIER
+# ------------------------------------------------------------------
+def classify(hands):
+    """(N,) gesture codes for an (N, 21, 3) landmark array.
+
+    closed   - no finger extended (fist)                  -> drop
+    pointing - only the index finger extended              -> rotate
+    special  - only the middle finger extended             -> send garbage
+    open     - anything else                               -> move by position
+    The thumb is ignored; it is too unreliable side-on.
+    """
+    if len(hands) == 0:
+        return np.empty(0, np.int8)
+    ext = extended_fingers(hands)[:, INDEX:]        # index, middle, ring, pinky
+    count = ext.sum(axis=1)
+    codes = np.full(len(hands), OPEN, np.int8)
+    codes[count == 0] = CLOSED
+    only = count == 1
+    codes[only & ext[:, 0]] = POINTING
+    codes[only & ext[:, 1]] = SPECIAL
+    return codes
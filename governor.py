@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Adaptive inference governor for the hand detector.
+#
+# Keeps the gesture-update rate near a target on slow CPUs by adjusting
+# three things:
+#   - resolution: frames are downscaled along a ladder while the smoothed
+#     inference time is over budget, and scaled back up when it is well under
+#   - ROI: once hands are found, only a padded box around them is processed;
+#     every `full_every` detections (or when a hand goes missing) the whole
+#     frame is searched again
+#   - frame skip: while every hand is holding still, detection runs on every
+#     other frame and the frames in between get landmarks extrapolated from
+#     the last two detections; any motion goes straight back to full rate
+#
+# Landmarks always come back normalised to the full, unscaled frame.
+
+import cv2
+import numpy as np
+
+
+class InferenceGovernor:
+    def __init__(self, target_hz=15, scales=(1.0, 0.75, 0.5, 0.35),
+                 roi_pad=0.6, full_every=15, still=0.01, smoothing=0.2):
+        self.budget     = 1.0 / target_hz
+        self.scales     = scales
+        self.roi_pad    = roi_pad     # box padding, as a fraction of hand size
+        self.full_every = full_every
+        self.still      = still       # mean landmark shift that still counts as holding still
+        self.smoothing  = smoothing
+
+        self.level      = 0           # index into scales
+        self.cost       = None        # smoothed seconds per detection
+        self.cooldown   = 0
+        self.since_full = 0
+        self.skipped    = False
+
+        # Last two detections, for motion and extrapolation
+        self.prev = None              # (t, hands)
+        self.last = None
+
+        # Counters
+        self.detections  = 0
+        self.predictions = 0
+
+    # --------------------------------------------------------------
+    # Per frame
+    # --------------------------------------------------------------
+    def should_detect(self):
+        """False when this frame can be filled in with predict()."""
+        if self.skipped or not self.stable():
+            self.skipped = False
+            return True
+        self.skipped = True
+        return False
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def stable(self):
+        if self.prev is None or self.last is None:
+            return False
+        a, b = self.prev[1], self.last[1]
+        if len(a) != len(b) or len(b) == 0:
+            return False
+        return float(np.abs(b - a).mean(axis=(1, 2)).max()) < self.still
+
+    def predict(self, t):
+        """Landmarks at time `t`, extrapolated from the last two detections."""
+        self.predictions += 1
+        (t0, a), (t1, b) = self.prev, self.last
+        if t1 <= t0:
+            return b
+        step = min((t - t1) / (t1 - t0), 1.0)
+        return b + (b - a) * step
+
+    def prepare(self, frame):
+        """The image to run detection on, plus the box it was cut from."""
+        h, w = frame.shape[:2]
+        roi = self.roi()
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+        scale = self.scale
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale,
+                               interpolation=cv2.INTER_AREA)
+        return frame, roi
+
+    def restore(self, hands, roi):
+        """Map landmarks found inside `roi` back to full-frame coordinates."""
+        if roi is None or len(hands) == 0:
+            return hands
+        x0, y0, x1, y1 = roi
+        hands = hands.copy()
+        hands[:, :, 0] = x0 + hands[:, :, 0] * (x1 - x0)
+        hands[:, :, 1] = y0 + hands[:, :, 1] * (y1 - y0)
+        return hands
+
+    def update(self, t, hands, seconds, roi=None):
+        """Feed back a finished detection and how long it took."""
+        self.detections += 1
+        lost = self.last is not None and len(hands) < len(self.last[1])
+        self.since_full = 0 if roi is None else self.since_full + 1
+        if lost:
+            self.since_full = self.full_every   # search the whole frame next
+        self.prev, self.last = self.last, (t, hands)
+
+        if self.cost is None:
+            self.cost = seconds
+        else:
+            self.cost += self.smoothing * (seconds - self.cost)
+        self._adjust()
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+    def roi(self):
+        if self.last is None or len(self.last[1]) == 0:
+            return None
+        if self.since_full >= self.full_every:
+            return None
+        hands = self.last[1]
+        lo = hands[:, :, :2].min(axis=(0, 1))
+        hi = hands[:, :, :2].max(axis=(0, 1))
+        pad = (hi - lo).max() * self.roi_pad
+        x0, y0 = np.clip(lo - pad, 0.0, 1.0)
+        x1, y1 = np.clip(hi + pad, 0.0, 1.0)
+        if x1 - x0 < 0.05 or y1 - y0 < 0.05:
+            return None
+        return float(x0), float(y0), float(x1), float(y1)
+
+    def _adjust(self):
+        # Only move one step at a time, and let the average settle in between
+        if self.cooldown:
+            self.cooldown -= 1
+            return
+        if self.cost > self.budget and self.level < len(self.scales) - 1:
+            self.level += 1
+        elif self.cost < 0.5 * self.budget and self.level > 0:
+            self.level -= 1
+        else:
+            return
+        self.cooldown = 10
+
+    def stats(self):
+        return "Governor: %d detections, %d predicted, scale %.2f, %.1f ms/detection" % (
+            self.detections, self.predictions, self.scale,
+            (self.cost or 0.0) * 1e3)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Input event bus.
+#
+# Everything that can move a piece publishes InputEvents - timestamped,
+# player-tagged actions ('left', 'right', 'rotate', 'drop', 'garbage') - and
+# everything that reacts to them subscribes. The loop that owns the bus calls
+# flush() once per tick, which hands every consumer that tick's events as one
+# batch, in publish order.
+#
+# Producers:  GestureProducer (hand landmarks), KeyboardProducer (pygame keys),
+#             EventReplay (a log written by LogSink)
+# Consumers:  GameConsumer (an in-process TetrisCore), KeyInjector (OS key
+#             presses for an external game), LogSink (JSON lines)
+
+import json
+import time
+from collections import deque, namedtuple
+
+from gestures import classify, hand_centers, CLOSED, POINTING, SPECIAL
+from calibration import hand_features
+from smoothing import GestureFilter, RELEASE
+
+InputEvent = namedtuple('InputEvent', 't player action source')
+
+
+class InputBus:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.consumers = []
+        # Producers on other threads may publish; deque append/popleft are atomic
+        self.pending = deque()
+        self.published = 0
+
+    def subscribe(self, consumer):
+        """`consumer(events)` is called with each non-empty batch."""
+        self.consumers.append(consumer)
+        return consumer
+
+    def publish(self, player, action, source, t=None):
+        self.pending.append(InputEvent(self.clock() if t is None else t,
+                                       player, action, source))
+        self.published += 1
+
+    def flush(self):
+        """Deliver everything published since the last flush; returns the batch."""
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        if batch:
+            for consumer in self.consumers:
+                consumer(batch)
+        return batch
+
+
+# ------------------------------------------------------------------
+# PRODUCERS
+# ------------------------------------------------------------------
+# Open-hand move zones per player, as (left below x, right above x, right below x)
+TWO_PLAYER_ZONES = {1: (0.3, 0.35, 0.5), 2: (0.7, 0.75, 1.0)}
+ONE_PLAYER_ZONES = {1: (0.4, 0.6, 1.0)}
+
+def player_zones(players):
+    """Zones for `players` side by side, each in an equal strip of the frame."""
+    if players == 1:
+        return ONE_PLAYER_ZONES
+    if players == 2:
+        return TWO_PLAYER_ZONES
+    width = 1.0 / players
+    return {p: (width * (p - 0.4), width * (p - 0.3), width * p)
+            for p in range(1, players + 1)}
+
+
+class GestureProducer:
+    """Turns classified hands into debounced events (see smoothing.py)."""
+
+    def __init__(self, bus, zones, window=5, enter=3, release=2, repeats=None, first=1,
+                 calibration=None):
+        self.bus = bus
+        self.zones = zones
+        self.first = first  # game player the tracker's player 0 controls
+        # {player: PlayerCalibration}; replaces the zones and finger rules
+        # for the players it covers (see calibration.py)
+        self.calibration = calibration or {}
+        self.filters = {player: GestureFilter(window, enter, release, repeats)
+                        for player in zones}
+
+    def action(self, player, gesture, hand_center_x):
+        """The raw action one classified hand stands for this frame."""
+        if gesture == POINTING:
+            return 'rotate'
+        if gesture == CLOSED:
+            return 'drop'
+        if gesture == SPECIAL:
+            #Special super secret move: try at your own risk
+            return 'garbage'
+        # Open hand: move left or right by where it is
+        left_below, right_above, right_below = self.zones[player]
+        if hand_center_x < left_below:
+            return 'left'
+        if right_above < hand_center_x < right_below:
+            return 'right'
+        return None
+
+    def update(self, t, hands, players):
+        """Feed one vision result; `players` are 0-based as the tracker gives them."""
+        actions = dict.fromkeys(self.filters)
+        if len(hands):
+            features = hand_features(hands) if self.calibration else None
+            for i, (gesture, hand_center_x, player) in enumerate(
+                    zip(classify(hands), hand_centers(hands), players)):
+                player = int(player) + self.first
+                if player in actions and actions[player] is None:
+                    calibration = self.calibration.get(player)
+                    if calibration is not None and gesture != SPECIAL:
+                        actions[player] = calibration.action(features[i], hand_center_x)
+                    else:
+                        actions[player] = self.action(player, gesture, hand_center_x)
+        # A missing hand counts as nothing, which lets held actions go
+        for player, gesture_filter in self.filters.items():
+            for kind, action in gesture_filter.update(actions[player]):
+                if kind != RELEASE:
+                    self.bus.publish(player, action, 'gesture', t)
+
+
+# pygame key name -> (player, action)
+DEFAULT_KEYS = {
+    'a': (1, 'left'), 'd': (1, 'right'), 'w': (1, 'rotate'), 's': (1, 'drop'),
+    'left': (2, 'left'), 'right': (2, 'right'), 'up': (2, 'rotate'), 'down': (2, 'drop'),
+}
+
+
+class KeyboardProducer:
+    """Publishes pygame KEYDOWN events (key repeat comes from pygame.key.set_repeat)."""
+
+    def __init__(self, bus, keys=DEFAULT_KEYS):
+        import pygame
+        self.bus = bus
+        self.keys = {pygame.key.key_code(name): binding for name, binding in keys.items()}
+
+    def handle(self, event):
+        """True if the key was one of ours."""
+        binding = self.keys.get(event.key)
+        if binding is None:
+            return False
+        self.bus.publish(binding[0], binding[1], 'keyboard')
+        return True
+
+
+class EventReplay:
+    """Re-publishes a LogSink file, keeping the original spacing between events."""
+
+    def __init__(self, bus, path, realtime=True):
+        self.bus = bus
+        self.realtime = realtime
+        with open(path) as f:
+            self.events = deque(InputEvent(**json.loads(line)) for line in f if line.strip())
+        self._start = None   # (bus clock, log clock) at the first poll
+
+    def poll(self):
+        """Publish every event that is due; False once the log is used up."""
+        if not self.events:
+            return False
+        now = self.bus.clock()
+        if self._start is None:
+            self._start = (now, self.events[0].t)
+        while self.events:
+            event = self.events[0]
+            t = self._start[0] + event.t - self._start[1]
+            if self.realtime and t > now:
+                break
+            self.events.popleft()
+            self.bus.publish(event.player, event.action, 'replay', t)
+        return True
+
+
+# ------------------------------------------------------------------
+# CONSUMERS
+# ------------------------------------------------------------------
+class GameConsumer:
+    """Applies events to an in-process game through TetrisCore.handle()."""
+
+    def __init__(self, game):
+        self.game = game
+
+    def __call__(self, events):
+        for event in events:
+            self.game.handle(event.player, event.action)
+
+
+# action -> key for the single-player keyboard layout of external games
+DEFAULT_INJECT_KEYS = {'left': 'left', 'right': 'right', 'rotate': 'up', 'drop': 'down'}
+
+
+class KeyInjector:
+    """Presses OS keys for an external game; `press` defaults to pyautogui.press."""
+
+    def __init__(self, keys=DEFAULT_INJECT_KEYS, player=1, press=None):
+        if press is None:
+            import pyautogui
+            pyautogui.PAUSE = 0   # its default 0.1 s sleep after every press
+            press = pyautogui.press
+        self.keys = keys
+        self.player = player
+        self.press = press
+
+    def __call__(self, events):
+        for event in events:
+            key = self.keys.get(event.action)
+            if key is not None and event.player == self.player:
+                self.press(key)
+
+
+class LogSink:
+    """Appends every event to a JSON-lines file that EventReplay can play back."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def __call__(self, events):
+        for event in events:
+            self.file.write(json.dumps(event._asdict()) + "\n")
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Kiosk host: several independent stations on one machine.
+#
+# A station is one match with its own capture source - a camera, a
+# recording, or generated frames for load tests - and its own gesture
+# pipeline and TetrisCore. Stations share detector processes, one per core,
+# instead of bringing a detector thread each:
+#
+#   capture    one thread per station reads its source into a LatestSlot,
+#              so a frame that is not picked up in time is replaced by the
+#              next one (and counted as dropped) rather than queued
+#   workers    each station is pinned to one process when it sends its
+#              first frame, to the process with the fewest live stations.
+#              That process keeps the station's detector, so Mediapipe's
+#              tracking sees every frame of the station in order, and no
+#              process holds detectors for stations it never serves
+#   dispatch   a process works on one frame at a time. Every station counts
+#              the frames it has been served, and free processes take the
+#              frames of the least-served waiting stations first, so a fast
+#              camera cannot crowd out a slow one and a saturated pool
+#              pushes back by dropping stale frames at the stations
+#   fairness   affinity means stations cannot always be spread evenly: 3
+#              stations on 2 processes leave one station alone on its
+#              process. By default a station that is ahead of every other
+#              waiting station is not served, so its process idles until
+#              the rest catch up - every station gets the same rate, at the
+#              cost of some pool throughput. --greedy lets processes serve
+#              their own stations whenever they are free instead: more
+#              frames overall, but the lone station gets about twice the
+#              rate of the two sharing a process. A station that had nothing
+#              waiting (a slower camera) rejoins at the others' count, so
+#              it neither holds them back nor gets a burst to catch up
+#
+# Recordings with stored landmarks skip the pool entirely. The main loop
+# feeds results through each station's gestures into its match, ticks every
+# match at tick_rate, starts a new match when one ends, and reports per
+# station the results per second, capture->landmarks latency, inference time
+# and dropped frames. A station whose source or detector fails is reported
+# and taken out; the other stations play on until none is left.
+#
+#   python kiosk.py [--station SOURCE ...] [--players 2] [--processes N] [--greedy]
+#
+# SOURCE is camera:INDEX, replay:DIR (stored landmarks), replay-frames:DIR
+# (stored frames, re-detected) or synthetic[:FPS].
+
+import argparse
+import glob
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+from board import config
+from core import TetrisCore
+from gestures import hand_centers
+from inputbus import InputBus, GestureProducer, player_zones
+from profiler import Profiler
+from telemetry import TelemetryLog
+from timestep import FixedStep
+from vision import LatestSlot
+
+
+# ------------------------------------------------------------------
+# SOURCES
+# ------------------------------------------------------------------
+class SyntheticSource:
+    """Generated frames at a fixed rate, to load the detector without a camera."""
+
+    def __init__(self, fps=30, width=320, height=240, seed=0):
+        self.name = "synthetic %d fps" % fps
+        self.step = 1.0 / fps
+        self.base = np.random.default_rng(seed).integers(0, 256, (height, width, 3), np.uint8)
+        self.count = 0
+        self.due = None
+
+    def read(self):
+        now = time.monotonic()
+        if self.due is None:
+            self.due = now
+        elif self.due > now:
+            time.sleep(self.due - now)
+            now = self.due
+        self.due += self.step
+        self.count += 1
+        # Slide the noise along so consecutive frames differ
+        return now, np.roll(self.base, self.count * 4, axis=1), None
+
+    def release(self):
+        pass
+
+
+def open_source(spec, width=320, height=240):
+    kind, _, arg = spec.partition(':')
+    if kind == 'synthetic':
+        return SyntheticSource(int(arg) if arg else 30, width, height)
+    if kind in ('replay', 'replay-frames'):
+        from capture import ReplaySource
+        if not glob.glob(os.path.join(arg, 'chunk_*.npz')):
+            raise ValueError("%s is not a recording (no chunk_*.npz files)" % arg)
+        return ReplaySource(arg, realtime=True, landmarks=kind == 'replay', loop=True)
+    if kind == 'camera':
+        from capture import CameraSource
+        return CameraSource(int(arg or 0), width, height)
+    raise ValueError("unknown station source %r" % spec)
+
+
+# ------------------------------------------------------------------
+# POOL WORKERS
+# ------------------------------------------------------------------
+_detectors = {}     # station -> detector, for the stations pinned to this process
+_max_hands = 2
+
+def _init_worker(max_hands):
+    global _max_hands
+    _max_hands = max_hands
+
+def _detect(station, frame):
+    """(hands, seconds) for one BGR frame of `station`; runs in a pool process."""
+    import cv2
+    from gestures import landmarks_to_array
+    from startup import make_detector
+    detector = _detectors.get(station)
+    if detector is None:
+        detector = _detectors[station] = make_detector(_max_hands)
+    start = time.perf_counter()
+    hands = landmarks_to_array(detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+    return hands, time.perf_counter() - start
+
+
+def strip_players(hands, players):
+    """(N,) 0-based player of each hand, by which equal strip of the frame it is in."""
+    return np.minimum(hand_centers(hands) * players, players - 1).astype(np.int8)
+
+
+# ------------------------------------------------------------------
+# STATIONS
+# ------------------------------------------------------------------
+class Station:
+    """One match, its source and its gestures."""
+
+    def __init__(self, index, source, players=2, seed=None, telemetry=None, wake=None):
+        self.index     = index
+        self.source    = source
+        self.players   = players
+        self.seed      = seed
+        self.telemetry = telemetry
+        self.wake      = wake
+
+        self.frames  = LatestSlot()      # capture thread -> dispatcher
+        self.results = LatestSlot()      # pool / capture thread -> main loop
+        self.detects = False             # the source hands out frames, not landmarks
+        self.worker  = None              # pool process this station is pinned to
+        self.busy    = False             # a frame of this station is in the pool
+        self.waiting = False             # busy or a frame ready, at the last dispatch
+        self.served  = 0                 # frames sent to the pool, for fair dispatch
+        self.error   = None
+        self.down    = False             # failed; the host no longer serves it
+        self.running = True
+
+        self.bus = InputBus()
+        self.bus.subscribe(self.inputs)
+        repeats = {
+            'left':  (config['repeat_delay'], config['repeat_interval']),
+            'right': (config['repeat_delay'], config['repeat_interval']),
+            'drop':  (config['drop_repeat_delay'], config['drop_repeat_interval']),
+        }
+        self.gestures = GestureProducer(self.bus, player_zones(players), config['gesture_window'],
+                                        config['gesture_enter'], config['gesture_release'],
+                                        repeats)
+        self.core = None
+        self.matches = 0
+        self.new_match()
+
+        # Results handled since the last report, and their latencies
+        self.profiler = Profiler()
+        self.seen     = 0
+
+        self.thread = threading.Thread(target=self.capture, name="station-%d" % index,
+                                       daemon=True)
+
+    def new_match(self):
+        if self.core is not None and self.core.telemetry is not None:
+            self.core.telemetry.end()
+        seed = None if self.seed is None else self.seed + self.matches
+        self.core = TetrisCore(seed, self.players)
+        if self.telemetry is not None:
+            self.telemetry.match(self.core, ["S%d-P%d" % (self.index, p.number)
+                                             for p in self.core.players])
+        self.matches += 1
+
+    def inputs(self, events):
+        core = self.core
+        for event in events:
+            core.handle(event.player, event.action)
+        if core.telemetry is not None:
+            core.telemetry.inputs(events)
+
+    def capture(self):
+        try:
+            while self.running:
+                item = self.source.read()
+                if item is None:
+                    self.error = "No more frames from %s" % self.source.name
+                    break
+                t, frame, hands = item
+                if hands is not None:
+                    self.results.put((t, hands, None))
+                else:
+                    self.detects = True
+                    self.frames.put((t, frame))
+                if self.wake is not None:
+                    self.wake.set()
+        except Exception as exc:
+            self.error = exc
+        # Wake the host so it sees the error (or the end) straight away
+        if self.wake is not None:
+            self.wake.set()
+
+    def done(self, t):
+        """Pool callback for the frame captured at `t`."""
+        def callback(result):
+            hands, seconds = result
+            self.results.put((t, hands, seconds))
+            self.wake.set()
+        return callback
+
+    def failed(self, exc):
+        self.error = exc
+        # No landmarks, but the process is free again
+        self.results.put((None, None, 0.0))
+        self.wake.set()
+
+    def handle_result(self, result):
+        t, hands, seconds = result
+        prof = self.profiler
+        prof.since('capture->landmarks', t)
+        if seconds is not None:
+            prof.record('inference', seconds)
+        self.gestures.update(t, hands, strip_players(hands, self.players))
+        self.bus.flush()
+        self.seen += 1
+
+
+# ------------------------------------------------------------------
+# HOST
+# ------------------------------------------------------------------
+class KioskHost:
+    def __init__(self, sources, players=2, processes=None, seed=None, telemetry=None,
+                 fair=True):
+        self.processes = processes or os.cpu_count() or 1
+        self.wake      = threading.Event()
+        self.stations  = [Station(i, source, players, seed, telemetry, self.wake)
+                          for i, source in enumerate(sources, 1)]
+        self.workers   = []          # one single-process pool per core
+        self.working   = [False] * self.processes
+        self.fair      = fair        # idle a process rather than let a station run ahead
+        self.floor     = 0           # fewest frames served to a waiting station, last dispatch
+        self.timestep  = FixedStep(config['tick_rate'])
+        self.started   = None
+        self.reported  = None
+
+    def start(self):
+        self.workers = [multiprocessing.Pool(1, _init_worker, (self.players,))
+                        for _ in range(self.processes)]
+        for station in self.stations:
+            station.thread.start()
+        self.started = self.reported = time.monotonic()
+        return self
+
+    @property
+    def players(self):
+        return self.stations[0].players if self.stations else 1
+
+    def dispatch(self):
+        """Give free processes frames, least-served waiting station first."""
+        live = [station for station in self.stations if not station.down]
+        for station in live:
+            if station.detects and station.worker is None:
+                load = [0] * self.processes
+                for other in live:
+                    if other.worker is not None:
+                        load[other.worker] += 1
+                station.worker = load.index(min(load))
+
+        waiting = [station for station in live if station.worker is not None
+                   and (station.busy or station.frames.ready)]
+        if not waiting:
+            for station in live:
+                station.waiting = False
+            return
+
+        # Stations that had nothing waiting rejoin at the last dispatch's count
+        for station in live:
+            if station in waiting and not station.waiting:
+                station.served = max(station.served, self.floor)
+            station.waiting = station in waiting
+        floor = self.floor = min(station.served for station in waiting)
+        for station in sorted(waiting, key=lambda station: station.served):
+            if self.fair and station.served > floor:
+                break
+            if station.busy or self.working[station.worker]:
+                continue
+            item = station.frames.take()
+            if item is None:
+                continue
+            t, frame = item
+            station.busy = True
+            station.served += 1
+            self.working[station.worker] = True
+            self.workers[station.worker].apply_async(
+                _detect, (station.index, frame),
+                callback=station.done(t), error_callback=station.failed)
+
+    def step(self):
+        """One pass of the host loop; returns False once every station has failed."""
+        self.wake.wait(self.timestep.step)
+        self.wake.clear()
+        for station in self.stations:
+            result = station.results.take()
+            # A frame still in flight when its station failed frees the process too
+            if result is not None and result[2] is not None:
+                self.working[station.worker] = False
+                station.busy = False
+            if station.down:
+                continue
+            if station.error is not None:
+                self.fail(station)
+            elif result is not None:
+                station.handle_result(result)
+        self.dispatch()
+        live = [station for station in self.stations if not station.down]
+        for _ in range(self.timestep.advance()):
+            for station in live:
+                station.core.tick()
+                if station.core.gameover:
+                    station.new_match()
+        return bool(live)
+
+    def fail(self, station):
+        """Take a failed station out of the host; the others play on."""
+        print("Station %d stopped: %s" % (station.index, station.error))
+        station.down = True
+        station.running = False
+        if station.core.telemetry is not None:
+            station.core.telemetry.end()
+
+    def report(self):
+        """[{station, source, fps, p50_ms, p99_ms, inference_ms, dropped, matches}] since the last report."""
+        now = time.monotonic()
+        elapsed = max(1e-9, now - self.reported)
+        self.reported = now
+        rows = []
+        for station in self.stations:
+            stats = station.profiler.stats()
+            latency = stats.get('capture->landmarks', {})
+            rows.append({
+                'station':      station.index,
+                'source':       station.source.name,
+                'fps':          station.seen / elapsed,
+                'p50_ms':       latency.get('p50_ms', 0.0),
+                'p99_ms':       latency.get('p99_ms', 0.0),
+                'inference_ms': stats.get('inference', {}).get('p50_ms', 0.0),
+                'dropped':      station.frames.dropped + station.results.dropped,
+                'matches':      station.matches,
+            })
+            station.seen = 0
+        return rows
+
+    def errors(self):
+        return [(station.index, station.error) for station in self.stations
+                if station.error is not None]
+
+    def close(self):
+        for station in self.stations:
+            station.running = False
+        for station in self.stations:
+            station.thread.join(timeout=1.0)
+            station.source.release()
+            if station.core.telemetry is not None:
+                station.core.telemetry.end()
+        for worker in self.workers:
+            worker.terminate()
+            worker.join()
+
+
+def print_report(rows):
+    print("%-3s %-28s %6s %8s %8s %9s %8s %7s" % (
+        "#", "source", "fps", "p50 ms", "p99 ms", "infer ms", "dropped", "matches"))
+    for row in rows:
+        print("%-3d %-28s %6.1f %8.1f %8.1f %9.1f %8d %7d" % (
+            row['station'], row['source'][:28], row['fps'], row['p50_ms'], row['p99_ms'],
+            row['inference_ms'], row['dropped'], row['matches']))
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def run(sources, players, processes, seconds, every, seed, telemetry, greedy=False):
+    host = KioskHost(sources, players, processes, seed, telemetry, not greedy).start()
+    print("Kiosk: %d stations, %d detector processes" % (len(host.stations), host.processes))
+    end = None if seconds is None else time.monotonic() + seconds
+    try:
+        while end is None or time.monotonic() < end:
+            if not host.step():
+                break
+            if time.monotonic() - host.reported >= every:
+                print_report(host.report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.close()
+        if telemetry is not None:
+            telemetry.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several Tetris stations on one machine.")
+    parser.add_argument('--station', action='append', metavar='SOURCE',
+                        help="camera:INDEX, replay:DIR, replay-frames:DIR or synthetic[:FPS]; "
+                             "repeat for every station (default: two synthetic stations)")
+    parser.add_argument('--players', type=int, default=2, help="players per station")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="detector processes shared by all stations (default: core count)")
+    parser.add_argument('--greedy', action='store_true',
+                        help="let processes serve their stations whenever free: more frames "
+                             "overall, uneven rates when stations don't divide evenly")
+    parser.add_argument('--seconds', type=float, default=None, help="stop after this long")
+    parser.add_argument('--report', type=float, default=5.0, help="seconds between reports")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--telemetry', metavar='FILE',
+                        help="append every station's matches to a JSON-lines log")
+    args = parser.parse_args()
+
+    try:
+        sources = [open_source(spec) for spec in args.station or ['synthetic', 'synthetic']]
+    except ValueError as exc:
+        parser.error(str(exc))
+    run(sources, args.players, args.processes, args.seconds, args.report, args.seed,
+        TelemetryLog(args.telemetry) if args.telemetry else None, args.greedy)
@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Networked mode, for two or more players per match.
+#
+# Each player runs their own camera and gesture pipeline and sends only
+# input events; the server runs the authoritative TetrisCore for every match
+# (garbage included) and streams back what changed. Everything is asyncio
+# streams carrying length-prefixed binary messages:
+#
+#   client -> server
+#     HELLO                                       join the next free match
+#     INPUT  tick u32, action u8                  apply ACTIONS[action] at `tick`
+#     PING   client time f64
+#   server -> client
+#     WELCOME player u8, tick_rate u16, delay u8, cols u8, rows u8, players u8
+#     PONG   client time f64, tick u32
+#     STATE  tick u32, players x player block, rows u8, rows x (player u8, y u8, cells)
+#              player block: piece u8, rot u8, x i8, y i8, next u8, flags u8,
+#                            score u32, lines u16, pieces u16
+#              cells: the row's colors packed two per byte
+#     END    winner u8 (0 = nobody)
+#
+# STATE only carries board rows that changed since the last one, so a tick
+# where a stone merely falls is 34 bytes in a 2-player match. A match starts
+# once all its seats are taken; a player who leaves tops out, and the match
+# ends when one player is left standing.
+#
+# Input delay: inputs are stamped with the server tick they should apply at,
+# the client's estimate of the current tick plus `delay` ticks. The server
+# holds them until then, so every player's inputs land the same fixed time
+# after they were made however far each is from the server, as long as the
+# one-way latency stays under the delay. Later inputs apply on arrival.
+#
+#   python net.py serve [--port 7777] [--players 2]
+#   python net.py play HOST [--port 7777] [--replay DIR]
+
+import argparse
+import asyncio
+import struct
+import time
+from collections import defaultdict
+
+from board import config, shape_rotations
+from core import TetrisCore, ACTIONS
+from telemetry import TelemetryLog
+from timestep import FixedStep
+
+HELLO, WELCOME, INPUT, STATE, PING, PONG, END = range(1, 8)
+
+LENGTH  = struct.Struct('!H')
+T_WELCOME = struct.Struct('!BBHBBBB')
+T_INPUT = struct.Struct('!BIB')
+T_PING  = struct.Struct('!Bd')
+T_PONG  = struct.Struct('!BdI')
+T_STATE = struct.Struct('!BI')
+T_PLAYER = struct.Struct('!BBbbBBIHH')
+T_ROWS  = struct.Struct('!B')
+T_ROW   = struct.Struct('!BB')
+T_END   = struct.Struct('!BB')
+
+GAMEOVER = 1
+
+
+# ------------------------------------------------------------------
+# WIRE FORMAT
+# ------------------------------------------------------------------
+def frame(payload):
+    return LENGTH.pack(len(payload)) + payload
+
+async def read_message(reader):
+    """Next payload from the stream, or None once it is closed."""
+    try:
+        size, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        return await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+def pack_row(row):
+    row = list(row) + [0] * (len(row) % 2)
+    return bytes((row[i] << 4) | row[i + 1] for i in range(0, len(row), 2))
+
+def unpack_row(data, cols):
+    row = []
+    for byte in data:
+        row.append(byte >> 4)
+        row.append(byte & 15)
+    return row[:cols]
+
+def changed_rows(core, shown):
+    """Packed row records for every row that differs from `shown`, which is updated."""
+    rows = []
+    for p in core.players:
+        last = shown[p.number]
+        for y, row in enumerate(p.board):
+            if last[y] != row:
+                last[y] = list(row)
+                rows.append(T_ROW.pack(p.number, y) + pack_row(row))
+    return rows
+
+def encode_state(core, tick, rows):
+    out = [T_STATE.pack(STATE, tick)]
+    for p in core.players:
+        out.append(T_PLAYER.pack(p.piece, p.rot, p.x, p.y, core.bag.peek(p.number, 1)[0],
+                                 GAMEOVER if p.gameover else 0,
+                                 p.score, p.lines, p.pieces & 0xffff))
+    out.append(T_ROWS.pack(len(rows)))
+    out.extend(rows)
+    return b''.join(out)
+
+
+# ------------------------------------------------------------------
+# SERVER
+# ------------------------------------------------------------------
+class Match:
+    def __init__(self, match_id, seed=None, players=2):
+        self.id      = match_id
+        self.core    = TetrisCore(seed, players)
+        self.writers = {}                    # player -> StreamWriter
+        self.pending = defaultdict(list)     # tick -> [(player, action)]
+        # What the clients were last sent; None forces the first full board
+        self.shown   = {p.number: [None] * config['rows'] for p in self.core.players}
+        self.last    = None                  # what stones/scores looked like at the last send
+        self.done    = False
+        self.late    = 0
+
+    @property
+    def started(self):
+        return len(self.writers) == len(self.core.players)
+
+    def seat(self, writer):
+        """Give `writer` the lowest free player number."""
+        player = min(set(range(1, len(self.core.players) + 1)) - set(self.writers))
+        self.writers[player] = writer
+        return player
+
+    def queue(self, player, tick, action, delay):
+        now = self.core.ticks
+        if tick <= now:
+            self.late += 1
+            tick = now + 1
+        # Never let a client park inputs further out than twice the delay
+        self.pending[min(tick, now + 2 * delay)].append((player, action))
+
+    def step(self):
+        core = self.core
+        for player, action in self.pending.pop(core.ticks + 1, ()):
+            core.handle(player, action)
+            if core.telemetry is not None:
+                core.telemetry.emit('input', player, action=action, source='net')
+        core.tick()
+
+    def broadcast(self, payload):
+        data = frame(payload)
+        for writer in self.writers.values():
+            if not writer.is_closing():
+                writer.write(data)
+
+
+class MatchServer:
+    """Pairs connections into matches and ticks every match from one task."""
+
+    def __init__(self, delay=None, seed=None, players=2, telemetry=None):
+        self.delay    = config['net_input_delay'] if delay is None else delay
+        self.telemetry = telemetry  # telemetry.TelemetryLog shared by all matches
+        self.seed     = seed
+        self.players  = players    # seats per match
+        self.matches  = {}
+        self.waiting  = None       # match that still has free seats
+        self.next_id  = 0
+        self.ticks    = 0
+        self.sent     = 0          # bytes of STATE/END sent
+        self.finished = 0
+        self.late     = 0          # inputs that arrived after their tick
+        self.server   = None
+        self._ticker  = None
+
+    async def start(self, host='127.0.0.1', port=7777):
+        self.server = await asyncio.start_server(self.connection, host, port)
+        self._ticker = asyncio.ensure_future(self.run())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._ticker.cancel()
+        for match in list(self.matches.values()) + [self.waiting]:
+            for writer in (match.writers.values() if match is not None else ()):
+                writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connection(self, reader, writer):
+        if await read_message(reader) != bytes([HELLO]):
+            writer.close()
+            return
+        match = self.waiting
+        if match is None:
+            seed = None if self.seed is None else self.seed + self.next_id
+            match = self.waiting = Match(self.next_id, seed, self.players)
+            self.next_id += 1
+        player = match.seat(writer)
+        writer.write(frame(T_WELCOME.pack(WELCOME, player, config['tick_rate'], self.delay,
+                                          config['cols'], config['rows'], self.players)))
+        if match.started:
+            self.waiting = None
+            self.matches[match.id] = match
+            if self.telemetry is not None:
+                self.telemetry.match(match.core)
+
+        while True:
+            payload = await read_message(reader)
+            if payload is None:
+                break
+            kind = payload[0]
+            if kind == INPUT:
+                _, tick, action = T_INPUT.unpack(payload)
+                if action < len(ACTIONS) and match.started and not match.done:
+                    match.queue(player, tick, ACTIONS[action], self.delay)
+            elif kind == PING:
+                _, sent = T_PING.unpack(payload)
+                writer.write(frame(T_PONG.pack(PONG, sent, match.core.ticks)))
+
+        # A player leaving before the start frees the seat; afterwards they
+        # top out, which ends the match once only one player is left
+        if match is self.waiting:
+            del match.writers[player]
+        elif not match.done:
+            match.core.player(player).gameover = True
+            if match.core.telemetry is not None:
+                match.core.telemetry.emit('topout', player)
+        writer.close()
+
+    def end(self, match, winner):
+        match.done = True
+        payload = T_END.pack(END, winner)
+        match.broadcast(payload)
+        self.sent += (len(payload) + LENGTH.size) * len(match.writers)
+        self.matches.pop(match.id, None)
+        self.finished += 1
+        self.late += match.late
+        if match.core.telemetry is not None:
+            match.core.telemetry.end()
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        clock = FixedStep(config['tick_rate'], clock=loop.time)
+        step = clock.step
+        while True:
+            await asyncio.sleep(step)
+            for _ in range(clock.advance()):
+                self.ticks += 1
+                for match in list(self.matches.values()):
+                    match.step()
+            for match in list(self.matches.values()):
+                self.send(match)
+
+    def send(self, match):
+        core = match.core
+        state = (core.stone_state(), [(p.score, p.gameover) for p in core.players])
+        rows = changed_rows(core, match.shown)
+        if rows or state != match.last:
+            match.last = state
+            payload = encode_state(core, core.ticks, rows)
+            match.broadcast(payload)
+            self.sent += (len(payload) + LENGTH.size) * len(match.writers)
+        if core.gameover:
+            self.end(match, core.winner())
+
+    def stats(self):
+        return "Server: %d matches running, %d finished, %d ticks, %d bytes sent, %d late inputs" % (
+            len(self.matches), self.finished, self.ticks, self.sent, self.late)
+
+
+# ------------------------------------------------------------------
+# CLIENT
+# ------------------------------------------------------------------
+class MirrorPlayer:
+    """One player's part of a MatchMirror, named like core.PlayerState."""
+
+    def __init__(self, number, cols, rows):
+        self.number = number
+        self.board  = [[0] * cols for _ in range(rows)]
+        self.piece = self.rot = self.x = self.y = self.next = 0
+        self.score = self.lines = self.pieces = 0
+        self.gameover = False
+
+    @property
+    def stone(self):
+        return shape_rotations[self.piece][self.rot].shape
+
+
+class MatchMirror:
+    """The client's copy of a match, rebuilt from STATE messages.
+
+    Its players have the same board/stone attributes as TetrisCore's, so
+    the renderer and the batch bots can read it directly.
+    """
+
+    def __init__(self, cols, rows, players=2):
+        self.cols = cols
+        self.tick = 0
+        self.players = [MirrorPlayer(n, cols, rows) for n in range(1, players + 1)]
+
+    def player(self, number):
+        return self.players[number - 1]
+
+    def apply(self, payload):
+        _, self.tick = T_STATE.unpack_from(payload)
+        offset = T_STATE.size
+        for p in self.players:
+            (p.piece, p.rot, p.x, p.y, p.next, flags, p.score, p.lines,
+             p.pieces) = T_PLAYER.unpack_from(payload, offset)
+            p.gameover = bool(flags & GAMEOVER)
+            offset += T_PLAYER.size
+        count, = T_ROWS.unpack_from(payload, offset)
+        offset += T_ROWS.size
+        width = (self.cols + 1) // 2
+        for _ in range(count):
+            number, y = T_ROW.unpack_from(payload, offset)
+            offset += T_ROW.size
+            self.players[number - 1].board[y] = unpack_row(payload[offset:offset + width],
+                                                           self.cols)
+            offset += width
+
+
+class NetClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.player = None
+        self.delay  = 0
+        self.mirror = None
+        self.winner = None
+        self.rtt    = 0.0
+        self.rate   = config['tick_rate']
+        self._seen  = (0, time.monotonic())   # (server tick, local time it was seen)
+        self.received = 0                      # bytes of server messages
+        self.on_state = None                   # optional callback(mirror)
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=7777):
+        reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        writer.write(frame(bytes([HELLO])))
+        payload = await read_message(reader)
+        if payload is None or payload[0] != WELCOME:
+            raise ConnectionError("no welcome from %s:%d" % (host, port))
+        (_, client.player, client.rate, client.delay, cols, rows,
+         players) = T_WELCOME.unpack(payload)
+        client.mirror = MatchMirror(cols, rows, players)
+        client._task = asyncio.ensure_future(client.listen())
+        return client
+
+    async def listen(self):
+        while True:
+            payload = await read_message(self.reader)
+            if payload is None:
+                break
+            self.received += len(payload) + LENGTH.size
+            kind = payload[0]
+            if kind == STATE:
+                self.mirror.apply(payload)
+                self.saw(self.mirror.tick, time.monotonic())
+                if self.on_state is not None:
+                    self.on_state(self.mirror)
+            elif kind == PONG:
+                _, sent, tick = T_PONG.unpack(payload)
+                now = time.monotonic()
+                self.rtt = now - sent
+                self.saw(tick, now)
+            elif kind == END:
+                self.winner = T_END.unpack(payload)[1]
+                break
+        self.writer.close()
+
+    @property
+    def done(self):
+        return self._task.done()
+
+    def saw(self, tick, now):
+        """The server was on `tick` when it sent what arrived at `now`."""
+        # It has moved on by the one-way latency since; STATE and PONG both
+        # need that, or the clock runs a latency behind and every player
+        # gets their own effective delay
+        self._seen = (tick + self.rtt / 2 * self.rate, now)
+
+    def server_tick(self):
+        """Best guess at the tick the server is on right now."""
+        tick, seen = self._seen
+        return tick + (time.monotonic() - seen) * self.rate
+
+    def send(self, action):
+        target = int(self.server_tick()) + self.delay
+        self.writer.write(frame(T_INPUT.pack(INPUT, target, ACTIONS.index(action))))
+
+    def send_events(self, events):
+        """InputBus consumer: whoever the events were tagged for, they are ours."""
+        for event in events:
+            self.send(event.action)
+
+    def ping(self):
+        self.writer.write(frame(T_PING.pack(PING, time.monotonic())))
+
+    async def close(self):
+        self.writer.close()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+async def serve(port, players, telemetry=None):
+    server = MatchServer(players=players, telemetry=telemetry)
+    port = await server.start('0.0.0.0', port)
+    print("Serving on port %d" % port)
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(server.stats())
+    finally:
+        await server.close()
+        if telemetry is not None:
+            telemetry.close()
+
+async def play(host, port, replay):
+    import pygame
+    import mediapipe as mp
+
+    from capture import CameraSource, ReplaySource
+    from inputbus import InputBus, GestureProducer, ONE_PLAYER_ZONES
+    from render import BoardRenderer
+    from vision import VisionWorker
+
+    client = await NetClient.connect(host, port)
+    print("Connected as player %d" % client.player)
+
+    pygame.init()
+    size = config['cell_size']
+    players = len(client.mirror.players)
+    screen = pygame.display.set_mode((size * (config['cols'] + 2) * players - 2 * size,
+                                      size * config['rows']))
+    pygame.display.set_caption("Tetris - player %d" % client.player)
+    renderers = [BoardRenderer(screen, i * (config['cols'] + 2)) for i in range(players)]
+
+    # Same gesture path as the local game, for one player, into the socket
+    source = ReplaySource(replay) if replay else CameraSource(0, 320, 240)
+    detector = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=1,
+                                        min_detection_confidence=0.8,
+                                        min_tracking_confidence=0.5)
+    vision = VisionWorker(source, detector)
+    vision.start()
+    bus = InputBus()
+    bus.subscribe(client.send_events)
+    gestures = GestureProducer(bus, ONE_PLAYER_ZONES, config['gesture_window'],
+                               config['gesture_enter'], config['gesture_release'], {
+                                   'left':  (config['repeat_delay'], config['repeat_interval']),
+                                   'right': (config['repeat_delay'], config['repeat_interval']),
+                                   'drop':  (config['drop_repeat_delay'], config['drop_repeat_interval']),
+                               })
+
+    next_ping = 0.0
+    try:
+        while not client.done:
+            latest = vision.poll()
+            if latest is not None:
+                t, _, hands, _ = latest
+                gestures.update(t, hands[:1], [0])
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                                 event.key == pygame.K_ESCAPE):
+                    return
+            bus.flush()
+            if time.monotonic() >= next_ping:
+                client.ping()
+                next_ping = time.monotonic() + 1.0
+
+            dirty = []
+            for renderer, p in zip(renderers, client.mirror.players):
+                dirty += renderer.draw(p.board, None if p.gameover else p.stone, p.x, p.y)
+            pygame.display.update(dirty)
+            await asyncio.sleep(1.0 / config['maxfps'])
+        print("You win" if client.winner == client.player else "Game over")
+    finally:
+        vision.stop()
+        source.release()
+        await client.close()
+        pygame.quit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Networked multiplayer Tetris.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    srv = commands.add_parser('serve', help="run a match server")
+    srv.add_argument('--port', type=int, default=7777)
+    srv.add_argument('--players', type=int, default=2, help="players per match")
+    srv.add_argument('--telemetry', metavar='FILE',
+                     help="append every match's statistics to a JSON-lines log")
+    cli = commands.add_parser('play', help="join a server with the local camera")
+    cli.add_argument('host')
+    cli.add_argument('--port', type=int, default=7777)
+    cli.add_argument('--replay', metavar='DIR', help="use a landmark recording instead")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(args.port, args.players,
+                              TelemetryLog(args.telemetry) if args.telemetry else None))
+        else:
+            asyncio.run(play(args.host, args.port, args.replay))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Per-stage timing for the capture -> inference -> game -> display path.
+#
+# Stages are timed with laps:
+#
+#     t = prof.clock()
+#     ... read the camera ...
+#     t = prof.lap('capture', t)
+#     ... run the detector ...
+#     t = prof.lap('inference', t)
+#
+# and end-to-end latencies are recorded against the capture timestamp of the
+# frame that caused them (prof.since('camera->board', frame_t)). Each stage
+# keeps a rolling window of samples for p50/p95/p99. NULL_PROFILER has the
+# same methods but does nothing, so a disabled profiler costs one call.
+
+import csv
+import json
+import time
+from collections import deque
+
+STAT_FIELDS = ('count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.samples = {}   # stage -> deque of seconds
+        self.counts = {}    # stage -> total samples ever recorded
+        self.clock = time.monotonic
+
+    def record(self, stage, seconds):
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.window)
+            self.counts[stage] = 0
+        samples.append(seconds)
+        self.counts[stage] += 1
+
+    def lap(self, stage, start):
+        now = self.clock()
+        self.record(stage, now - start)
+        return now
+
+    def since(self, stage, start):
+        self.record(stage, self.clock() - start)
+
+    def stats(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        out = {}
+        for stage, samples in list(self.samples.items()):
+            values = sorted(samples)
+            if not values:
+                continue
+            n = len(values)
+            pick = lambda q: values[min(n - 1, int(q * n))] * 1e3
+            out[stage] = {
+                'count':   self.counts[stage],
+                'mean_ms': sum(values) / n * 1e3,
+                'p50_ms':  pick(0.50),
+                'p95_ms':  pick(0.95),
+                'p99_ms':  pick(0.99),
+                'max_ms':  values[-1] * 1e3,
+            }
+        return out
+
+    def summary_lines(self):
+        return ["%-15s%5.1f %5.1f %5.1f" % (stage, s['p50_ms'], s['p95_ms'], s['p99_ms'])
+                for stage, s in sorted(self.stats().items())]
+
+    def dump(self, path):
+        """Write the current stats as JSON, or CSV if `path` ends in .csv."""
+        stats = self.stats()
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.csv'):
+                writer = csv.writer(f)
+                writer.writerow(('stage',) + STAT_FIELDS)
+                for stage, s in sorted(stats.items()):
+                    writer.writerow([stage] + [round(s[k], 4) for k in STAT_FIELDS])
+            else:
+                json.dump(stats, f, indent=2, sort_keys=True)
+
+
+class NullProfiler:
+    enabled = False
+
+    def clock(self):
+        return 0.0
+
+    def record(self, stage, seconds):
+        pass
+
+    def lap(self, stage, start):
+        return 0.0
+
+    def since(self, stage, start):
+        pass
+
+    def stats(self):
+        return {}
+
+    def summary_lines(self):
+        return []
+
+    def dump(self, path):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Seeded piece and garbage randomness for one match.
+#
+# Pieces come from a 7-bag: every run of 7 pieces is a shuffled copy of all
+# seven shapes, so droughts and floods can't happen. With shared=True both
+# players draw from the same sequence (each at their own pace); otherwise
+# every player gets an independent stream. Garbage holes use a stream of
+# their own, so the same seed always replays the same match. How far every
+# stream has got is two small numbers (positions(), garbage.draws), which is
+# all a snapshot needs to rebuild the generator with seek().
+
+import random
+
+
+class CountingRandom(random.Random):
+    """Random that counts randrange() calls, so its state can be re-reached."""
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.draws = 0
+
+    def randrange(self, *args, **kwargs):
+        self.draws += 1
+        return super().randrange(*args, **kwargs)
+
+
+class PieceGenerator:
+    def __init__(self, kinds, seed=None, shared=True, players=2):
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed    = seed
+        self.kinds   = kinds
+        self.shared  = shared
+        self.garbage = CountingRandom("%s:garbage" % seed)
+
+        streams = 1 if shared else players
+        self._rngs   = [random.Random("%s:pieces:%d" % (seed, i)) for i in range(streams)]
+        self._queues = [[] for _ in range(streams)]
+        self._base   = [0] * streams          # sequence index of queue[0]
+        self._pos    = [0] * (players + 1)    # next sequence index, per player
+
+    def _stream(self, player):
+        return 0 if self.shared else player - 1
+
+    def _fill(self, stream, upto):
+        queue = self._queues[stream]
+        while self._base[stream] + len(queue) < upto:
+            bag = list(range(self.kinds))
+            self._rngs[stream].shuffle(bag)
+            queue.extend(bag)
+
+    def peek(self, player, count=1):
+        """The next `count` pieces for `player`, without consuming them."""
+        stream = self._stream(player)
+        pos = self._pos[player]
+        self._fill(stream, pos + count)
+        start = pos - self._base[stream]
+        return self._queues[stream][start:start + count]
+
+    def next(self, player):
+        piece = self.peek(player)[0]
+        self._pos[player] += 1
+        self._trim(self._stream(player))
+        return piece
+
+    def positions(self):
+        """How many pieces each player has drawn, indexed by player."""
+        return list(self._pos)
+
+    def seek(self, positions, garbage_draws, garbage_range):
+        """Fast-forward a fresh generator to saved positions.
+
+        Garbage holes are always randrange(garbage_range), so replaying that
+        many draws lands the garbage stream in exactly the same state.
+        """
+        for player, pos in enumerate(positions):
+            self._pos[player] = pos
+            if player:
+                # Bags have to be shuffled in order to come out the same
+                self._fill(self._stream(player), pos)
+        for stream in range(len(self._queues)):
+            self._trim(stream)
+        while self.garbage.draws < garbage_draws:
+            self.garbage.randrange(garbage_range)
+
+    def _trim(self, stream):
+        # Forget pieces every player on this stream has already drawn
+        if self.shared:
+            done = min(self._pos[1:])
+        else:
+            done = self._pos[stream + 1]
+        drop = done - self._base[stream]
+        if drop >= self.kinds:
+            del self._queues[stream][:drop]
+            self._base[stream] = done
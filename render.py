@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Incremental board rendering.
+#
+# Every cell color is pre-rendered to its own surface once, the empty board
+# is cached as a background surface, and each board remembers what it last
+# put on screen. A frame only blits the cells that differ from that and
+# hands back the dirty rects, so display.update() can skip everything that
+# didn't move. Text goes through TextCache, so a message that stays on
+# screen is rasterised once rather than every frame.
+
+from collections import OrderedDict
+
+import pygame
+
+from board import config, colors
+
+
+class BoardRenderer:
+    def __init__(self, screen, offset_x=0, offset_y=0):
+        size = config['cell_size']
+        self.screen = screen
+        self.size   = size
+        self.left   = offset_x * size
+        self.top    = offset_y * size
+
+        # One sprite per color; empty cells are copied from the background
+        self.sprites = [None]
+        for color in colors[1:]:
+            sprite = pygame.Surface((size, size)).convert()
+            sprite.fill(color)
+            self.sprites.append(sprite)
+        self.background = pygame.Surface(
+            (config['cols'] * size, config['rows'] * size)).convert()
+        self.background.fill(colors[0])
+        self.bounds = self.background.get_rect(topleft=(self.left, self.top))
+
+        self.shown = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget what is on screen; the next draw repaints the whole board."""
+        self.shown = None
+
+    def invalidate_area(self, rect):
+        """Repaint the cells under `rect` (screen coords) on the next draw."""
+        if self.shown is None:
+            return
+        area = self.bounds.clip(rect)
+        if not area:
+            return
+        size = self.size
+        x0 = (area.left - self.left) // size
+        x1 = (area.right - 1 - self.left) // size
+        for y in range((area.top - self.top) // size, (area.bottom - 1 - self.top) // size + 1):
+            row = self.shown[y] = list(self.shown[y])
+            for x in range(x0, x1 + 1):
+                row[x] = -1
+
+    def draw(self, board, stone=None, stone_x=0, stone_y=0):
+        """Bring the screen up to date with `board` (+ `stone`), return dirty rects."""
+        frame = [list(row) for row in board]
+        if stone is not None:
+            for cy, row in enumerate(stone):
+                for cx, val in enumerate(row):
+                    if val:
+                        frame[stone_y + cy][stone_x + cx] = val
+
+        dirty = []
+        if self.shown is None:
+            self.screen.blit(self.background, self.bounds)
+            self.shown = [[0] * config['cols'] for _ in range(config['rows'])]
+            dirty.append(self.bounds)
+
+        size, left, top = self.size, self.left, self.top
+        blit, sprites, background = self.screen.blit, self.sprites, self.background
+        for y, (row, shown) in enumerate(zip(frame, self.shown)):
+            if row == shown:
+                continue
+            first = last = None
+            for x, val in enumerate(row):
+                if val != shown[x]:
+                    pos = (left + x * size, top + y * size)
+                    if val:
+                        blit(sprites[val], pos)
+                    else:
+                        blit(background, pos, (x * size, y * size, size, size))
+                    if first is None:
+                        first = x
+                    last = x
+            # One rect per row covering its changed span
+            dirty.append(pygame.Rect(left + first * size, top + y * size,
+                                     (last - first + 1) * size, size))
+            self.shown[y] = row
+        return dirty
+
+
+class TextCache:
+    """Fonts loaded once per size, rendered lines kept in a bounded LRU."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.fonts    = {}
+        self.surfaces = OrderedDict()
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(pygame.font.get_default_font(), size)
+        return font
+
+    def render(self, text, size=18, color=(255,255,255), background=(0,0,0)):
+        key = (text, size, color, background)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font(size).render(text, False, color, background)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
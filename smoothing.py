@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Temporal smoothing and debouncing for per-frame gesture actions.
+#
+# Mediapipe flickers: a fist can read as "pointing" for one frame, a hand on
+# a zone boundary alternates between "left" and nothing. Each player gets a
+# GestureFilter that keeps the last `window` raw actions in a ring buffer and
+# only believes an action once it holds `enter` of those votes. The active
+# action is let go when its votes drop below `release` (< enter, so there is
+# hysteresis), or as soon as another action reaches `enter`.
+#
+# update() returns explicit events:
+#   ('enter',   action)  the action just became active - perform it once
+#   ('hold',    action)  it is still held and its repeat is due
+#   ('release', action)  it is no longer held
+# Actions without a repeat rate (rotate, garbage) fire on enter only.
+
+import time
+
+from autorepeat import AutoRepeat
+
+ENTER, HOLD, RELEASE = 'enter', 'hold', 'release'
+
+
+class GestureFilter:
+    def __init__(self, window=5, enter=3, release=2, repeats=None,
+                 clock=time.monotonic):
+        self.window  = window
+        self.enter   = enter
+        self.release = release
+        # action -> AutoRepeat; anything not listed never repeats
+        self.repeats = {action: AutoRepeat(delay, interval, clock)
+                        for action, (delay, interval) in (repeats or {}).items()}
+
+        self.history = [None] * window   # ring buffer of raw actions
+        self.pos     = 0
+        self.active  = None
+
+    def update(self, action):
+        """Feed this frame's raw action (None for none); returns a list of events."""
+        self.history[self.pos] = action
+        self.pos = (self.pos + 1) % self.window
+
+        events = []
+        leader, votes = self._leader()
+        active = self.active
+        if active is not None:
+            if leader != active and votes >= self.enter:
+                events.append(self._release())
+            elif self.history.count(active) < self.release:
+                events.append(self._release())
+        if self.active is None and leader is not None and votes >= self.enter:
+            self.active = leader
+            events.append((ENTER, leader))
+            if leader in self.repeats:
+                self.repeats[leader].update(0, leader)   # starts the repeat delay
+        elif self.active is not None and self.active in self.repeats:
+            if self.repeats[self.active].update(0, self.active):
+                events.append((HOLD, self.active))
+        return events
+
+    def reset(self):
+        """Forget the history, releasing whatever was active."""
+        events = [self._release()] if self.active is not None else []
+        self.history = [None] * self.window
+        self.pos = 0
+        return events
+
+    def _leader(self):
+        best, votes = None, 0
+        for action in set(self.history):
+            if action is None:
+                continue
+            count = self.history.count(action)
+            if count > votes:
+                best, votes = action, count
+        return best, votes
+
+    def _release(self):
+        action, self.active = self.active, None
+        if action in self.repeats:
+            self.repeats[action].release(0)
+        return RELEASE, action
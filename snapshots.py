@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Memory-mapped ring buffer of per-tick game snapshots.
+#
+# The writer (the game loop) packs a compact snapshot of the whole match
+# straight into a preallocated file with struct.pack_into, one fixed-size
+# slot per tick, wrapping around after `slots` ticks. Readers - spectators,
+# recorders, a restarted game - map the same file and never take a lock:
+# every slot starts with a sequence number the writer makes odd before it
+# touches the slot and even again afterwards (a seqlock), so a reader that
+# sees an odd or changed number knows it raced the writer and retries.
+#
+# A snapshot holds, per player: the board as one u16 bitmask per row plus
+# the colors packed two cells per byte, the stone (piece, rotation, x, y),
+# gravity/lock state, counters, queued garbage, and how far into the piece
+# bag the player is; plus the garbage stream position. With the seed and
+# garbage routing from the header that is enough to resume a match exactly
+# where the last snapshot left it.
+#
+#   python snapshots.py info FILE
+#   python snapshots.py watch FILE
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from board import config, shape_rotations, new_board, board_bits
+from bitboard import BitBoard
+from core import gravity_ticks, ROUTINGS
+from randomizer import PieceGenerator
+
+MAGIC   = b'TSNP'
+VERSION = 3
+
+HEADER  = struct.Struct('<4sHIIBBBBQB')    # magic, version, slot size, slots, cols, rows, shared,
+                                           # players, seed, garbage routing (index in ROUTINGS)
+HEAD    = struct.Struct('<Q')              # snapshots written so far
+HEAD_AT = 32
+SLOTS_AT = 64
+
+SEQ     = struct.Struct('<Q')
+TICK    = struct.Struct('<QIIB')           # seq, tick, garbage draws, paused
+PLAYER  = struct.Struct('<BBbbBBHhIIIIIHBB')  # piece, rot, x, y, flags, resets, fall, lock,
+                                              # pieces, lines, garbage, score, bag position,
+                                              # incoming, attacker, split
+GAMEOVER, B2B = 1, 2
+
+Snapshot = namedtuple('Snapshot', 'index tick paused garbage_draws players boards')
+PlayerRecord = namedtuple('PlayerRecord', 'piece rot x y gameover b2b resets fall lock '
+                                          'pieces lines garbage score position '
+                                          'incoming attacker split')
+
+
+def _sizes(cols, rows, players):
+    color_bytes = rows * ((cols + 1) // 2)
+    board = PLAYER.size + 2 * rows + color_bytes
+    slot = TICK.size + players * board
+    return board, color_bytes, (slot + 7) & ~7
+
+
+def _pack_colors(board, cols):
+    out = bytearray()
+    for row in board:
+        row = list(row) + [0] * (cols % 2)
+        out.extend((row[i] << 4) | row[i + 1] for i in range(0, cols, 2))
+    return bytes(out)
+
+
+# ------------------------------------------------------------------
+# WRITER
+# ------------------------------------------------------------------
+class SnapshotLog:
+    """Appends snapshots of a TetrisCore to the ring buffer at `path`.
+
+    With `resume`, an existing file with the same geometry is continued,
+    so a resumed match keeps its history. Otherwise any earlier match in
+    the file is wiped before the header names the new one.
+    """
+
+    def __init__(self, path, core, slots=4096, resume=False):
+        cols, rows = config['cols'], config['rows']
+        if cols > 16:
+            raise ValueError("snapshots pack rows into 16 bits; %d columns is too wide" % cols)
+        if not isinstance(core.seed, int):
+            raise ValueError("snapshots need an integer match seed to resume from")
+        # The piece and garbage streams hash the seed's decimal text, so it
+        # has to come back as the very same integer
+        if not 0 <= core.seed < 2**64:
+            raise ValueError("snapshots need a match seed in 0 .. 2**64-1, not %d" % core.seed)
+        players = len(core.players)
+        self.cols, self.rows = cols, rows
+        self.board_size, self.color_bytes, self.slot_size = _sizes(cols, rows, players)
+        self.bits = struct.Struct('<%dH' % rows)
+        size = SLOTS_AT + slots * self.slot_size
+
+        reuse = os.path.exists(path) and os.path.getsize(path) == size
+        self.file = open(path, 'r+b' if reuse else 'w+b')
+        if not reuse:
+            self.file.truncate(size)
+        self.mm = mmap.mmap(self.file.fileno(), size)
+        if resume and reuse and HEADER.unpack_from(self.mm, 0)[:6] == (
+                MAGIC, VERSION, self.slot_size, slots, cols, rows):
+            self.written, = HEAD.unpack_from(self.mm, HEAD_AT)
+        else:
+            # Readers go by HEAD and the slot sequence numbers: empty the
+            # ring first, so nothing of the old match is ever read under
+            # the new header
+            self.written = 0
+            HEAD.pack_into(self.mm, HEAD_AT, 0)
+            for slot in range(slots):
+                SEQ.pack_into(self.mm, SLOTS_AT + slot * self.slot_size, 0)
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.slot_size, slots, cols, rows,
+                         bool(config['shared_bag']), players, core.seed,
+                         ROUTINGS.index(core.routing))
+        self.slots = slots
+        # Colors only change together with the bitmasks, so repack them only then
+        self._colors = [(None, None)] * players
+
+    def write(self, core):
+        n = self.written
+        mm = self.mm
+        base = SLOTS_AT + (n % self.slots) * self.slot_size
+        SEQ.pack_into(mm, base, 2 * n + 1)
+        TICK.pack_into(mm, base, 2 * n + 1, core.ticks, core.bag.garbage.draws, core.paused)
+        offset = base + TICK.size
+        positions = core.bag.positions()
+        for i, p in enumerate(core.players):
+            flags = (GAMEOVER if p.gameover else 0) | (B2B if p.b2b else 0)
+            PLAYER.pack_into(mm, offset, p.piece, p.rot, p.x, p.y, flags, p.resets, p.fall,
+                             -1 if p.lock is None else p.lock,
+                             p.pieces, p.lines, p.garbage, p.score, positions[p.number],
+                             p.incoming, p.attacker, p.split)
+            offset += PLAYER.size
+            bits = board_bits(p.board)
+            self.bits.pack_into(mm, offset, *bits)
+            offset += self.bits.size
+            key = tuple(bits)
+            last, colors = self._colors[i]
+            if key != last:
+                colors = _pack_colors(p.board, self.cols)
+                self._colors[i] = (key, colors)
+            mm[offset:offset + self.color_bytes] = colors
+            offset += self.color_bytes
+        SEQ.pack_into(mm, base, 2 * n + 2)
+        self.written = n + 1
+        HEAD.pack_into(mm, HEAD_AT, self.written)
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        self.file.close()
+
+
+# ------------------------------------------------------------------
+# READER
+# ------------------------------------------------------------------
+class SnapshotReader:
+    """Reads a snapshot file while a game may still be writing it."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.slot_size, self.slots, self.cols, self.rows,
+         self.shared, self.players, self.seed, routing) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a snapshot file" % path)
+        self.routing = ROUTINGS[routing]
+        self.board_size, self.color_bytes, _ = _sizes(self.cols, self.rows, self.players)
+        self.bits = struct.Struct('<%dH' % self.rows)
+
+    @property
+    def written(self):
+        return HEAD.unpack_from(self.mm, HEAD_AT)[0]
+
+    def read(self, index, retries=100):
+        """Snapshot number `index`, or None once it has been overwritten."""
+        base = SLOTS_AT + (index % self.slots) * self.slot_size
+        want = 2 * index + 2
+        for _ in range(retries):
+            if SEQ.unpack_from(self.mm, base)[0] != want:
+                if self.written > index + self.slots:
+                    return None        # lapped by the writer
+                continue               # being written right now
+            data = self.mm[base:base + self.slot_size]
+            if SEQ.unpack_from(self.mm, base)[0] == want:
+                return self._decode(index, data)
+        return None
+
+    def latest(self):
+        written = self.written
+        while written:
+            snap = self.read(written - 1)
+            if snap is not None:
+                return snap
+            written = self.written
+        return None
+
+    def _decode(self, index, data):
+        _, tick, draws, paused = TICK.unpack_from(data, 0)
+        offset = TICK.size
+        players, boards = [], []
+        width = (self.cols + 1) // 2
+        for _ in range(self.players):
+            (piece, rot, x, y, flags, resets, fall, lock, pieces, lines, garbage, score,
+             position, incoming, attacker, split) = PLAYER.unpack_from(data, offset)
+            players.append(PlayerRecord(piece, rot, x, y, bool(flags & GAMEOVER),
+                                        bool(flags & B2B), resets, fall,
+                                        None if lock < 0 else lock, pieces, lines, garbage,
+                                        score, position, incoming, attacker, split))
+            offset += PLAYER.size
+            bits = self.bits.unpack_from(data, offset)
+            offset += self.bits.size
+            colors = []
+            for y in range(self.rows):
+                row = []
+                for byte in data[offset + y * width:offset + (y + 1) * width]:
+                    row.append(byte >> 4)
+                    row.append(byte & 15)
+                colors.append(row[:self.cols])
+            offset += self.color_bytes
+            boards.append((bits, colors))
+        return Snapshot(index, tick, bool(paused), draws, players, boards)
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+def restore(core, snap, seed, shared, routing):
+    """Put `core` back into the state recorded in `snap`."""
+    if len(snap.players) != len(core.players):
+        raise ValueError("snapshot is of a %d-player match, not %d" % (
+            len(snap.players), len(core.players)))
+    core.bag = PieceGenerator(len(shape_rotations), seed, shared, len(snap.players))
+    core.bag.seek([0] + [player.position for player in snap.players],
+                  snap.garbage_draws, config['cols'])
+    core.seed = seed
+    core.routing = routing
+    core.ticks = snap.tick
+    core.paused = snap.paused
+    for p, record, (bits, colors) in zip(core.players, snap.players, snap.boards):
+        board = new_board()
+        if isinstance(board, BitBoard):
+            board.bits = list(bits)
+            board.cells = [list(row) for row in colors]
+        else:
+            board[:] = [list(row) for row in colors]
+        p.board = board
+        for name in ('piece', 'rot', 'x', 'y', 'gameover', 'b2b', 'resets', 'fall', 'lock',
+                     'pieces', 'lines', 'garbage', 'score', 'incoming', 'attacker', 'split'):
+            setattr(p, name, getattr(record, name))
+        p.fall_every = gravity_ticks(record.lines)
+        p.latch = []
+
+def resume(core, path):
+    """Restore `core` from the newest snapshot in `path`; returns it, or None."""
+    reader = SnapshotReader(path)
+    try:
+        snap = reader.latest()
+        if snap is not None:
+            restore(core, snap, reader.seed, bool(reader.shared), reader.routing)
+        return snap
+    finally:
+        reader.close()
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def render_text(snap):
+    lines = []
+    for y in range(len(snap.boards[0][1])):
+        cells = []
+        for p, (bits, colors) in enumerate(snap.boards):
+            row = ['#' if bits[y] >> x & 1 else '.' for x in range(len(colors[y]))]
+            player = snap.players[p]
+            rotation = shape_rotations[player.piece][player.rot]
+            for cx, cy in rotation.cells:
+                if cy + player.y == y and 0 <= cx + player.x < len(row):
+                    row[cx + player.x] = '@'
+            cells.append(''.join(row))
+        lines.append('   '.join(cells))
+    for p, player in enumerate(snap.players, 1):
+        lines.append("P%d  score %d  lines %d%s" % (p, player.score, player.lines,
+                                                   "  GAME OVER" if player.gameover else ""))
+    return "\n".join(lines)
+
+def info(path):
+    reader = SnapshotReader(path)
+    written = reader.written
+    first = reader.read(max(0, written - reader.slots)) if written else None
+    last = reader.latest()
+    print("%s: %d snapshots written, %d kept (%d bytes each), seed %d, %s routing" % (
+        path, written, min(written, reader.slots), reader.slot_size, reader.seed,
+        reader.routing))
+    if last is not None:
+        print("ticks %d..%d" % (first.tick if first else last.tick, last.tick))
+    reader.close()
+
+def watch(path, interval):
+    reader = SnapshotReader(path)
+    shown = None
+    try:
+        while True:
+            snap = reader.latest()
+            if snap is not None and snap.index != shown:
+                shown = snap.index
+                print("\033[H\033[J" + "tick %d\n" % snap.tick + render_text(snap))
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or spectate a snapshot log.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('info', help="summarise a snapshot file")
+    show.add_argument('path')
+    spectate = commands.add_parser('watch', help="follow a running match in the terminal")
+    spectate.add_argument('path')
+    spectate.add_argument('--interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        info(args.path)
+    else:
+        watch(args.path, args.interval)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Staged startup for the camera side of the game.
+#
+# Importing OpenCV and Mediapipe, opening the camera and building the hand
+# detectors take seconds, and none of it is needed to put a window up.
+# VisionLoader does all of it on a background thread while the game shows
+# which stage it is waiting for, then runs every detector once on a blank
+# frame: Mediapipe builds its graph and allocates on the first process()
+# call, and that should not land on the first frame a player sees.
+#
+# Stages, in order, with their time kept in VisionLoader.timings:
+#   imports   cv2, mediapipe and the modules that need them
+#   camera    opening the camera (or the recording)
+#   model     building the shared detector and the per-player ones
+#   warm-up   one inference per detector on a blank frame
+
+import threading
+import time
+
+from board import config
+from profiler import NULL_PROFILER
+
+STAGES = ('imports', 'camera', 'model', 'warm-up')
+
+MESSAGES = {
+    'imports': "Loading libraries",
+    'camera':  "Connecting camera",
+    'model':   "Loading hand model",
+    'warm-up': "Warming up",
+}
+
+
+def make_detector(max_hands):
+    import mediapipe as mp
+    return mp.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=max_hands,
+        min_detection_confidence=0.8,
+        min_tracking_confidence=0.5
+    )
+
+def warm_up(detector, width=320, height=240):
+    """One throwaway inference, so graph setup is paid now rather than in play."""
+    import numpy as np
+    detector.process(np.zeros((height, width, 3), np.uint8))
+
+
+class VisionLoader(threading.Thread):
+    """Builds the capture source, detectors and VisionWorker off the main thread.
+
+    Options are the game's command line; load() starts the work once the
+    game knows how many hands to look for. Poll `stage` for the loading
+    screen and `ready` / `error` to know when it is over.
+    """
+
+    def __init__(self, replay=None, realtime=True, record=None, record_frames=False,
+                 governed=True, width=320, height=240):
+        threading.Thread.__init__(self, name="vision-loader", daemon=True)
+        self.replay        = replay
+        self.realtime      = realtime
+        self.record        = record
+        self.record_frames = record_frames
+        self.governed      = governed
+        self.size          = (width, height)
+
+        self.stage   = None
+        self.timings = {}        # stage -> seconds
+        self.error   = None
+
+        # Filled in by the thread
+        self.source   = None
+        self.detector = None
+        self.tracker  = None
+        self.vision   = None
+
+    def load(self, hands=2, tracked=2, profiler=NULL_PROFILER):
+        """Start loading: `hands` for the shared detector, `tracked` players to follow."""
+        self.hands    = hands
+        self.tracked  = tracked
+        self.profiler = profiler
+        self.start()
+        return self
+
+    @property
+    def ready(self):
+        return self.vision is not None
+
+    @property
+    def message(self):
+        return MESSAGES.get(self.stage, "Starting")
+
+    def _enter(self, stage):
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.timings[self.stage] = now - self._since
+        self.stage, self._since = stage, now
+
+    def run(self):
+        try:
+            self._enter('imports')
+            from capture import CameraSource, ReplaySource, LandmarkRecorder
+            from governor import InferenceGovernor
+            from tracking import PlayerTracker
+            from vision import VisionWorker
+            import mediapipe  # noqa: F401  (the bulk of the import time)
+
+            self._enter('camera')
+            if self.replay:
+                source = ReplaySource(self.replay, realtime=self.realtime)
+            else:
+                source = CameraSource(0, *self.size)
+            recorder = LandmarkRecorder(self.record, self.record_frames) if self.record else None
+            self.source = source
+
+            self._enter('model')
+            self.detector = make_detector(self.hands)
+            self.tracker = PlayerTracker(self.tracked, make_detector)
+
+            self._enter('warm-up')
+            for detector in [self.detector] + list(self.tracker.detectors or ()):
+                warm_up(detector, *self.size)
+
+            self._enter(None)
+            governor = InferenceGovernor(config['gesture_hz']) if self.governed else None
+            vision = VisionWorker(source, self.detector, recorder, self.profiler,
+                                  governor, self.tracker)
+            vision.start()
+            self.vision = vision
+        except Exception as exc:
+            self.error = exc
+
+    def summary(self):
+        return "Startup: " + ", ".join("%s %.0f ms" % (stage, self.timings[stage] * 1e3)
+                                       for stage in STAGES if stage in self.timings)
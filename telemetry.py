@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Match telemetry: an event stream per match, written off the game thread.
+#
+# TetrisCore reports what happens to the MatchRecorder in core.telemetry;
+# an InputBus subscription adds every input event. Recording an event is a
+# deque append of a small tuple - no formatting, no I/O. A background thread
+# drains the deque every `interval` seconds (or as soon as `batch` events
+# have piled up), turns them into JSON lines and appends them to the log in
+# one write. Several matches can share a log; every line carries its match.
+#
+# One JSON object per line, always with match, tick, kind and player (0 for
+# match-wide events):
+#   start     seed, players, names, routing, tick_rate
+#   lock      piece, lines (cleared by this lock), b2b
+#   garbage   target, lines                 sent by `player`
+#   received  lines                         added to `player`'s board
+#   topout
+#   input     action, source
+#   end       winner, abandoned (closed before the match was over)
+#
+#   python telemetry.py stats LOG [LOG ...] [--json] [--processes N]
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque, defaultdict
+
+from board import config
+
+ENCODE = json.JSONEncoder(separators=(',', ':')).encode
+
+
+# ------------------------------------------------------------------
+# WRITER
+# ------------------------------------------------------------------
+class TelemetryLog:
+    """Append-only JSONL log fed from a lock-free buffer by a writer thread."""
+
+    def __init__(self, path, batch=1024, interval=1.0):
+        self.path     = path
+        self.batch    = batch
+        self.interval = interval
+        self.pending  = deque()           # (match, tick, kind, player, fields)
+        self.wake     = threading.Event()
+        self.running  = True
+        self.written  = 0                 # events written, for stats
+        self.file     = open(path, 'a')
+        self.thread   = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def match(self, core, names=None):
+        """A recorder for a new match on `core`, hooked into it."""
+        recorder = MatchRecorder(self, core, names)
+        core.telemetry = recorder
+        return recorder
+
+    def put(self, event):
+        self.pending.append(event)
+        if len(self.pending) >= self.batch:
+            self.wake.set()
+
+    def _run(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        # The fixed keys are plain strings and numbers, so only the fields
+        # go through the JSON encoder - a third cheaper than dumping a dict
+        pending = self.pending
+        lines = []
+        while pending:
+            match, tick, kind, player, fields = pending.popleft()
+            head = '{"match":"%s","tick":%d,"kind":"%s","player":%d' % (match, tick, kind, player)
+            lines.append(head + ',' + ENCODE(fields)[1:] if fields else head + '}')
+        if lines:
+            self.file.write("\n".join(lines) + "\n")
+            self.file.flush()
+            self.written += len(lines)
+
+    def close(self):
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+        self.file.close()
+
+
+class MatchRecorder:
+    """Tags one match's events and hands them to the log."""
+
+    def __init__(self, log, core, names=None):
+        self.log  = log
+        self.core = core
+        self.id   = "%s-%x" % (core.seed, time.time_ns() & 0xffffffffff)
+        self.ended = False
+        self.emit('start', 0, seed=core.seed, players=len(core.players),
+                  names=list(names) if names else ["P%d" % p.number for p in core.players],
+                  routing=core.routing, tick_rate=config['tick_rate'])
+
+    def emit(self, kind, player, **fields):
+        # After 'end' the game may run on (the survivor keeps falling), but
+        # none of that belongs to the match any more
+        if not self.ended:
+            self.log.put((self.id, self.core.ticks, kind, player, fields))
+
+    def inputs(self, batch):
+        """InputBus consumer."""
+        for event in batch:
+            self.emit('input', event.player, action=event.action, source=event.source)
+
+    def end(self):
+        """Close the match; only the first call counts.
+
+        Ending a match that is not over (the game quit, the host shut down)
+        marks it abandoned, and the leaderboard leaves it out.
+        """
+        if not self.ended:
+            over = self.core.gameover
+            self.emit('end', 0, winner=self.core.winner() if over else 0, abandoned=not over)
+            self.ended = True
+
+
+# ------------------------------------------------------------------
+# AGGREGATION
+# ------------------------------------------------------------------
+def summarise(path):
+    """Per-match summaries from one log: [{names, ticks, rate, winner, players: [...]}]."""
+    matches = {}
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            kind = event['kind']
+            if kind == 'start':
+                matches[event['match']] = {
+                    'names': event['names'], 'rate': event['tick_rate'], 'ticks': 0,
+                    'winner': 0, 'done': False, 'ended': False,
+                    'players': [dict(pieces=0, lines=0, sent=0, received=0, inputs=0,
+                                     topout=False) for _ in range(event['players'])]}
+                continue
+            match = matches.get(event['match'])
+            if match is None or match['ended']:
+                continue
+            match['ticks'] = max(match['ticks'], event['tick'])
+            if kind == 'end':
+                match['winner'] = event['winner']
+                match['done'] = not event.get('abandoned', False)
+                match['ended'] = True
+                continue
+            stats = match['players'][event['player'] - 1]
+            if kind == 'input':
+                stats['inputs'] += 1
+            elif kind == 'lock':
+                stats['pieces'] += 1
+                stats['lines'] += event['lines']
+            elif kind == 'garbage':
+                stats['sent'] += event['lines']
+            elif kind == 'received':
+                stats['received'] += event['lines']
+            elif kind == 'topout':
+                stats['topout'] = True
+    return list(matches.values())
+
+
+def leaderboard(matches, unfinished=False):
+    """Per-player totals over finished matches (all of them with `unfinished`), best first."""
+    table = defaultdict(lambda: dict(matches=0, wins=0, pieces=0, lines=0, sent=0,
+                                     received=0, inputs=0, topouts=0, seconds=0.0))
+    for match in matches:
+        if not (match['done'] or unfinished):
+            continue
+        seconds = match['ticks'] / float(match['rate'])
+        for number, (name, stats) in enumerate(zip(match['names'], match['players']), 1):
+            row = table[name]
+            row['matches'] += 1
+            row['wins'] += match['winner'] == number
+            row['topouts'] += stats['topout']
+            row['seconds'] += seconds
+            for key in ('pieces', 'lines', 'sent', 'received', 'inputs'):
+                row[key] += stats[key]
+    rows = []
+    for name, row in table.items():
+        minutes = row['seconds'] / 60.0
+        row['apm'] = row['inputs'] / minutes if minutes else 0.0
+        row['pps'] = row['pieces'] / row['seconds'] if row['seconds'] else 0.0
+        row['name'] = name
+        rows.append(row)
+    rows.sort(key=lambda row: (-row['wins'], -row['lines'], row['name']))
+    return rows
+
+
+def stats(paths, processes=None, as_json=False, unfinished=False):
+    start = time.perf_counter()
+    if len(paths) > 1 and processes != 1:
+        import multiprocessing
+        with multiprocessing.Pool(processes) as pool:
+            per_file = pool.map(summarise, paths)
+    else:
+        per_file = [summarise(path) for path in paths]
+    matches = [match for summaries in per_file for match in summaries]
+    rows = leaderboard(matches, unfinished)
+    elapsed = time.perf_counter() - start
+
+    if as_json:
+        print(json.dumps({'matches': len(matches),
+                          'finished': sum(match['done'] for match in matches),
+                          'players': rows}, indent=2))
+        return
+    size = sum(os.path.getsize(path) for path in paths)
+    print("%d matches (%d finished) from %d log(s), %.1f MB in %.2f s" % (
+        len(matches), sum(match['done'] for match in matches), len(paths), size / 1e6, elapsed))
+    print("%-4s %-16s %5s %5s %7s %6s %6s %6s %7s %5s" % (
+        "#", "player", "games", "wins", "pieces", "lines", "sent", "recv", "apm", "pps"))
+    for rank, row in enumerate(rows, 1):
+        print("%-4d %-16s %5d %5d %7d %6d %6d %6d %7.1f %5.2f" % (
+            rank, row['name'][:16], row['matches'], row['wins'], row['pieces'], row['lines'],
+            row['sent'], row['received'], row['apm'], row['pps']))
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate match telemetry logs.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    agg = commands.add_parser('stats', help="leaderboard and APM/PPS over one or more logs")
+    agg.add_argument('paths', nargs='+')
+    agg.add_argument('--processes', type=int, default=None)
+    agg.add_argument('--json', action='store_true')
+    agg.add_argument('--unfinished', action='store_true',
+                     help="count abandoned and cut-off matches too")
+    args = parser.parse_args()
+    stats(args.paths, args.processes, args.json, args.unfinished)
@@ -0,0 +1,114 @@
+from autorepeat import AutoRepeat
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000.0
+
+
+def fires(repeat, clock, player, action, until_ms, step_ms=1):
+    """Times (ms from now) at which update() fired while `action` was held."""
+    start = clock.now
+    out = []
+    for _ in range(0, until_ms, step_ms):
+        if repeat.update(player, action):
+            out.append(round((clock.now - start) * 1000))
+        clock.advance(step_ms)
+    return out
+
+
+def test_fires_on_press_then_after_delay_then_every_interval():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    assert fires(repeat, clock, 1, 'left', 560) == [0, 250, 350, 450, 550]
+
+
+def test_nothing_before_delay():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    assert repeat.update(1, 'left')
+    clock.advance(249)
+    assert not repeat.update(1, 'left')
+    clock.advance(1)
+    assert repeat.update(1, 'left')
+
+
+def test_release_stops_repeats():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    repeat.update(1, 'left')
+    assert repeat.held(1) == 'left'
+    repeat.release(1)
+    assert repeat.held(1) is None
+    clock.advance(300)
+    # Holding again is a fresh press: fires at once, then waits the full delay
+    assert repeat.update(1, 'left')
+    clock.advance(100)
+    assert not repeat.update(1, 'left')
+
+
+def test_falsy_action_releases():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    repeat.update(1, 'left')
+    clock.advance(300)
+    assert not repeat.update(1, None)
+    assert repeat.held(1) is None
+
+
+def test_players_keep_separate_schedules():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    assert repeat.update(1, 'left')
+    clock.advance(200)
+    assert repeat.update(2, 'left')
+    clock.advance(50)
+    assert repeat.update(1, 'left')          # 250 ms into player 1's hold
+    assert not repeat.update(2, 'left')      # only 50 ms into player 2's
+    clock.advance(200)
+    assert repeat.update(2, 'left')
+    repeat.release(1)
+    assert repeat.held(2) == 'left'
+
+
+def test_actions_keep_separate_schedules():
+    # GestureFilter keeps one AutoRepeat per action; each runs on its own clock
+    clock = FakeClock()
+    moves = AutoRepeat(250, 100, clock=clock)
+    drops = AutoRepeat(100, 50, clock=clock)
+    assert moves.update(1, 'left')
+    assert drops.update(1, 'drop')
+    clock.advance(100)
+    assert drops.update(1, 'drop')
+    assert not moves.update(1, 'left')
+    clock.advance(150)
+    assert moves.update(1, 'left')
+
+
+def test_switching_action_restarts_the_schedule():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    repeat.update(1, 'left')
+    clock.advance(300)
+    assert repeat.update(1, 'right')         # new action fires at once
+    assert repeat.held(1) == 'right'
+    clock.advance(200)
+    assert not repeat.update(1, 'right')     # and waits its own delay
+    clock.advance(50)
+    assert repeat.update(1, 'right')
+
+
+def test_schedule_does_not_drift_with_late_frames():
+    clock = FakeClock()
+    repeat = AutoRepeat(250, 100, clock=clock)
+    repeat.update(1, 'left')
+    clock.advance(260)
+    assert repeat.update(1, 'left')          # due at 250, next due at 350
+    clock.advance(90)
+    assert repeat.update(1, 'left')
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from capture import LandmarkRecorder, ReplaySource, read_chunks
+
+
+def synthetic_stream(frames=7):
+    """[(t, hands)] with 0, 1 or 2 hands per frame and distinct landmarks."""
+    rng = np.random.default_rng(3)
+    return [(100.0 + i * 0.01, rng.random((i % 3, 21, 3)).astype(np.float32))
+            for i in range(frames)]
+
+
+def record(path, stream, frames=False, chunk_size=3):
+    recorder = LandmarkRecorder(str(path), frames, chunk_size)
+    for i, (t, hands) in enumerate(stream):
+        recorder.write(t, hands, np.full((4, 6, 3), i, np.uint8))
+    recorder.close()
+
+
+def replay_all(source):
+    out = []
+    while True:
+        item = source.read()
+        if item is None:
+            return out
+        out.append(item)
+
+
+def test_round_trip(tmp_path):
+    stream = synthetic_stream()
+    record(tmp_path, stream)
+    assert len(list(tmp_path.glob('chunk_*.npz'))) == 3
+
+    times = np.concatenate([chunk[0] for chunk in read_chunks(str(tmp_path))])
+    np.testing.assert_array_equal(times, [t for t, _ in stream])
+
+    replayed = replay_all(ReplaySource(str(tmp_path), realtime=False))
+    assert len(replayed) == len(stream)
+    for (t, frame, hands), (_, expected) in zip(replayed, stream):
+        assert frame is None
+        assert hands.shape == expected.shape
+        np.testing.assert_array_equal(hands, expected)
+    stamps = [t for t, _, _ in replayed]
+    assert stamps == sorted(stamps)
+
+
+def test_realtime_keeps_recorded_spacing(tmp_path):
+    stream = synthetic_stream(5)
+    record(tmp_path, stream)
+    stamps = [t for t, _, _ in replay_all(ReplaySource(str(tmp_path), realtime=True))]
+    np.testing.assert_allclose(np.diff(stamps), 0.01, atol=0.008)
+
+
+def test_frames_round_trip_for_reinference(tmp_path):
+    stream = synthetic_stream(4)
+    record(tmp_path, stream, frames=True)
+    replayed = replay_all(ReplaySource(str(tmp_path), realtime=False, landmarks=False))
+    assert [hands for _, _, hands in replayed] == [None] * 4
+    assert [int(frame[0, 0, 0]) for _, frame, _ in replayed] == [0, 1, 2, 3]
+
+
+def test_release_while_another_thread_reads(tmp_path):
+    record(tmp_path, synthetic_stream())
+    source = ReplaySource(str(tmp_path), realtime=False, loop=True)
+    reading = threading.Event()
+
+    def reader():
+        while source.read() is not None:
+            reading.set()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    reading.wait(1.0)
+    time.sleep(0.01)
+    source.release()
+    thread.join(1.0)
+    assert not thread.is_alive()
+    assert source.read() is None
+
+
+def test_looping_over_an_empty_recording_raises(tmp_path):
+    source = ReplaySource(str(tmp_path), realtime=False, loop=True)
+    with pytest.raises(ValueError):
+        source.read()
+    source.release()
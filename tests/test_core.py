@@ -0,0 +1,124 @@
+from board import config, check_collision, join_matrices
+from core import TetrisCore, gravity_ticks
+
+
+def test_garbage_to_nobody_is_not_counted():
+    core = TetrisCore(1, players=1)
+    core.send_garbage(core.player(1), 4)
+    assert core.player(1).garbage == 0
+
+
+def test_garbage_stops_counting_once_opponents_are_out():
+    core = TetrisCore(1, players=3)
+    p1, p2, p3 = core.players
+    core.send_garbage(p1, 2)
+    assert p1.garbage == 2 and p2.incoming + p3.incoming == 2
+    p2.gameover = p3.gameover = True
+    core.send_garbage(p1, 3)
+    assert p1.garbage == 2
+
+
+def test_even_split_counts_every_routed_line():
+    core = TetrisCore(1, players=4, routing='even')
+    p1 = core.player(1)
+    core.send_garbage(p1, 5)
+    assert p1.garbage == 5
+    assert sorted(q.incoming for q in core.players[1:]) == [1, 2, 2]
+
+
+# ------------------------------------------------------------------
+# Gravity and lock delay, driven by tick() alone
+# ------------------------------------------------------------------
+def ticks(core, count):
+    for _ in range(count):
+        core.tick()
+
+
+def resting(p):
+    return check_collision(p.board, p.stone, (p.x, p.y + 1))
+
+
+def land(core, p):
+    """Tick until p's stone is resting and its lock delay has started."""
+    for _ in range(config['rows'] * p.fall_every + 1):
+        if p.lock is not None:
+            return
+        core.tick()
+    raise AssertionError("stone never landed")
+
+
+def test_gravity_moves_one_row_every_fall_interval():
+    core = TetrisCore(1, players=1)
+    p = core.player(1)
+    assert p.fall_every == gravity_ticks(0)
+    ticks(core, p.fall_every - 1)
+    assert p.y == 0
+    core.tick()
+    assert p.y == 1
+
+
+def test_gravity_speeds_up_with_level():
+    per_level = config['lines_per_level']
+    steps = [gravity_ticks(level * per_level) for level in range(40)]
+    assert steps[0] == round(config['delay'] * config['tick_rate'] / 1000.0)
+    assert steps[1] < steps[0]
+    assert all(b <= a for a, b in zip(steps, steps[1:])) and steps[-1] == 1
+    # Lines within a level don't change the speed
+    assert gravity_ticks(per_level - 1) == steps[0]
+
+    core = TetrisCore(1, players=1)
+    p = core.player(1)
+    p.lines = 3 * per_level
+    core.new_stone(p)
+    assert p.fall_every == steps[3]
+    ticks(core, steps[3])
+    assert p.y == 1
+
+
+def test_landed_stone_locks_after_the_lock_delay():
+    core = TetrisCore(1, players=1)
+    p = core.player(1)
+    land(core, p)
+    assert resting(p) and p.lock == core.lock_ticks
+    ticks(core, core.lock_ticks - 1)
+    assert p.pieces == 0
+    core.tick()
+    assert p.pieces == 1 and p.y == 0
+
+
+def test_moves_restart_the_lock_delay_a_limited_number_of_times():
+    core = TetrisCore(1, players=1)
+    p = core.player(1)
+    land(core, p)
+    wait = core.lock_ticks - 2
+    for i in range(config['lock_resets']):
+        ticks(core, wait)
+        core.handle(1, 'left' if i % 2 else 'right')
+        core.tick()
+        assert p.pieces == 0
+    assert p.resets == 0
+    # Out of resets: moving no longer buys time, the stone locks on schedule
+    ticks(core, wait)
+    assert p.pieces == 0
+    core.handle(1, 'left')
+    core.tick()
+    assert p.pieces == 1
+
+
+def test_stone_sliding_off_a_ledge_falls_again():
+    core = TetrisCore(1, players=1)
+    p = core.player(1)
+    width = len(p.stone[0])
+    p.x = 0
+    # A shelf half way down, just as wide as the stone
+    ledge = config['rows'] // 2
+    p.board = join_matrices(p.board, [[1] * width], (0, ledge))
+    land(core, p)
+    assert p.y + len(p.stone) <= ledge
+    for _ in range(width):
+        core.handle(1, 'right')
+        core.tick()
+    assert p.x == width and not resting(p) and p.lock is None
+    y = p.y
+    ticks(core, p.fall_every)
+    assert p.y == y + 1 and p.pieces == 0
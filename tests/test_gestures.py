@@ -0,0 +1,62 @@
+import numpy as np
+
+from gestures import (classify, hand_centers, OPEN, CLOSED, POINTING, SPECIAL,
+                      FINGERS, THUMB, INDEX, MIDDLE, RING, PINKY, WRIST)
+from inputbus import GestureProducer, InputBus, ONE_PLAYER_ZONES
+
+OFFSETS = {THUMB: -0.06, INDEX: -0.03, MIDDLE: 0.0, RING: 0.03, PINKY: 0.06}
+
+
+def hand(x=0.5, extended=()):
+    """(21, 3) landmarks of an upright hand centred on `x`.
+
+    Extended fingers carry on straight up from their knuckle; the others
+    bend back down towards the wrist at the PIP joint.
+    """
+    points = np.zeros((21, 3), np.float32)
+    points[WRIST] = (x, 0.8, 0.0)
+    for finger, joints in enumerate(FINGERS):
+        fx = x + OFFSETS[finger]
+        ys = (0.6, 0.5, 0.45, 0.4) if finger in extended else (0.6, 0.52, 0.58, 0.6)
+        for joint, y in zip(joints, ys):
+            points[joint] = (fx, y, 0.0)
+    return points
+
+
+def batch(*hands):
+    return np.array(hands, np.float32).reshape(-1, 21, 3)
+
+
+def test_shapes():
+    hands = batch(hand(extended=()),
+                  hand(extended=(INDEX,)),
+                  hand(extended=(MIDDLE,)),
+                  hand(extended=(INDEX, MIDDLE, RING, PINKY)))
+    assert classify(hands).tolist() == [CLOSED, POINTING, SPECIAL, OPEN]
+
+
+def test_thumb_is_ignored():
+    hands = batch(hand(extended=(THUMB,)), hand(extended=(THUMB, INDEX)))
+    assert classify(hands).tolist() == [CLOSED, POINTING]
+
+
+def test_two_fingers_count_as_open():
+    assert classify(batch(hand(extended=(INDEX, MIDDLE)))).tolist() == [OPEN]
+
+
+def test_open_hand_positions():
+    open_fingers = (INDEX, MIDDLE, RING, PINKY)
+    hands = batch(hand(0.2, open_fingers), hand(0.5, open_fingers), hand(0.8, open_fingers))
+    assert classify(hands).tolist() == [OPEN, OPEN, OPEN]
+    np.testing.assert_allclose(hand_centers(hands), [0.2, 0.5, 0.8], atol=1e-6)
+
+    producer = GestureProducer(InputBus(), ONE_PLAYER_ZONES)
+    actions = [producer.action(1, OPEN, x) for x in hand_centers(hands)]
+    assert actions == ['left', None, 'right']
+
+
+def test_empty_batch():
+    hands = np.empty((0, 21, 3), np.float32)
+    codes = classify(hands)
+    assert codes.shape == (0,) and codes.dtype == np.int8
+    assert hand_centers(hands).shape == (0,)
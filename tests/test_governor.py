@@ -0,0 +1,123 @@
+import numpy as np
+
+from governor import InferenceGovernor
+
+
+def hand(x, y, size=0.1):
+    """(21, 3) landmarks spread over a `size` box with its corner at (x, y)."""
+    points = np.zeros((21, 3), np.float32)
+    points[:, 0] = x + np.linspace(0.0, size, 21)
+    points[:, 1] = y + np.linspace(size, 0.0, 21)
+    return points
+
+
+def hands(*corners):
+    return np.stack([hand(x, y) for x, y in corners]) if corners else np.zeros((0, 21, 3), np.float32)
+
+
+def test_skips_every_other_frame_while_hands_are_still():
+    governor = InferenceGovernor()
+    assert governor.should_detect()            # nothing to go on yet
+    governor.update(0.0, hands((0.2, 0.3)), 0.01)
+    assert governor.should_detect()            # one detection is not enough
+    governor.update(0.1, hands((0.2, 0.3)), 0.01)
+    assert [governor.should_detect() for _ in range(4)] == [False, True, False, True]
+    np.testing.assert_allclose(governor.predict(0.15), hands((0.2, 0.3)))
+    assert governor.predictions == 1
+
+
+def test_motion_goes_back_to_full_rate():
+    governor = InferenceGovernor()
+    governor.update(0.0, hands((0.2, 0.3)), 0.01)
+    governor.update(0.1, hands((0.2, 0.3)), 0.01)
+    assert not governor.should_detect()
+    governor.update(0.2, hands((0.3, 0.3)), 0.01)
+    assert [governor.should_detect() for _ in range(3)] == [True, True, True]
+
+
+def test_a_new_or_lost_hand_is_never_still():
+    governor = InferenceGovernor()
+    governor.update(0.0, hands((0.2, 0.3)), 0.01)
+    governor.update(0.1, hands((0.2, 0.3), (0.6, 0.3)), 0.01)
+    assert governor.should_detect() and governor.should_detect()
+    governor.update(0.2, hands(), 0.01)
+    governor.update(0.3, hands(), 0.01)
+    assert governor.should_detect() and governor.should_detect()
+
+
+def test_predict_extrapolates_at_most_one_interval():
+    governor = InferenceGovernor()
+    governor.update(1.0, hands((0.2, 0.3)), 0.01)
+    governor.update(1.1, hands((0.3, 0.3)), 0.01)
+    np.testing.assert_allclose(governor.predict(1.15), hands((0.35, 0.3)), atol=1e-5)
+    np.testing.assert_allclose(governor.predict(5.0), hands((0.4, 0.3)), atol=1e-5)
+
+
+def test_roi_round_trips_through_restore():
+    governor = InferenceGovernor(roi_pad=0.5)
+    found = hands((0.4, 0.5))
+    governor.update(0.0, found, 0.01)
+    roi = governor.roi()
+    x0, y0, x1, y1 = roi
+    assert roi == governor.prepare(np.zeros((480, 640, 3), np.uint8))[1]
+    np.testing.assert_allclose(roi, (0.35, 0.45, 0.55, 0.65), atol=1e-6)
+    image, _ = governor.prepare(np.zeros((480, 640, 3), np.uint8))
+    assert image.shape == (int(y1 * 480) - int(y0 * 480), int(x1 * 640) - int(x0 * 640), 3)
+
+    # The detector reports the hand relative to the crop
+    inside = found.copy()
+    inside[:, :, 0] = (found[:, :, 0] - x0) / (x1 - x0)
+    inside[:, :, 1] = (found[:, :, 1] - y0) / (y1 - y0)
+    np.testing.assert_allclose(governor.restore(inside, roi), found, atol=1e-6)
+    assert governor.restore(inside, None) is inside
+
+
+def test_roi_is_clipped_to_the_frame():
+    governor = InferenceGovernor(roi_pad=0.5)
+    governor.update(0.0, hands((0.0, 0.9)), 0.01)
+    x0, y0, x1, y1 = governor.roi()
+    assert x0 == 0.0 and y1 == 1.0
+
+
+def test_full_frame_search_after_a_hand_is_lost():
+    governor = InferenceGovernor()
+    governor.update(0.0, hands((0.2, 0.3), (0.6, 0.3)), 0.01)
+    roi = governor.roi()
+    assert roi is not None
+    governor.update(0.1, hands((0.2, 0.3)), 0.01, roi)
+    assert governor.roi() is None
+    # The full-frame search finds it again and cropping resumes
+    governor.update(0.2, hands((0.2, 0.3), (0.6, 0.3)), 0.01)
+    assert governor.roi() is not None
+
+
+def test_full_frame_search_every_so_often():
+    governor = InferenceGovernor(full_every=3)
+    governor.update(0.0, hands((0.2, 0.3)), 0.01)
+    for i in range(3):
+        roi = governor.roi()
+        assert roi is not None
+        governor.update(0.1 * (i + 1), hands((0.2, 0.3)), 0.01, roi)
+    assert governor.roi() is None
+
+
+def test_resolution_ladder_follows_the_budget():
+    governor = InferenceGovernor(target_hz=10, smoothing=1.0)
+    frame = np.zeros((480, 640, 3), np.uint8)
+    slow, fast, fine = 0.2, 0.02, 0.07          # budget is 0.1 s
+    levels = []
+    for i in range(40):
+        governor.update(0.1 * i, hands(), slow)
+        levels.append(governor.level)
+    # One step at a time, ten detections apart, and no further than the ladder
+    assert levels[:12] == [1] + [1] * 10 + [2]
+    assert levels[-1] == len(governor.scales) - 1
+    assert governor.prepare(frame)[0].shape[1] == int(640 * governor.scales[-1] + 0.5)
+
+    for i in range(12):
+        governor.update(4 + 0.1 * i, hands(), fine)
+    assert governor.level == len(governor.scales) - 1   # within budget: stay put
+    for i in range(40):
+        governor.update(6 + 0.1 * i, hands(), fast)
+    assert governor.level == 0
+    assert governor.prepare(frame)[0].shape == frame.shape
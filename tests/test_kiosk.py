@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+
+from kiosk import KioskHost
+
+
+class BrokenSource:
+    name = "broken"
+
+    def read(self):
+        raise IOError("camera unplugged")
+
+    def release(self):
+        pass
+
+
+class FrameSource:
+    name = "frames"
+
+    def read(self):
+        time.sleep(0.001)
+        return time.monotonic(), np.zeros((4, 4, 3), np.uint8), None
+
+    def release(self):
+        pass
+
+
+class RecordingWorker:
+    """Stands in for a pool process: remembers which stations sent it frames."""
+
+    def __init__(self):
+        self.stations = []
+
+    def apply_async(self, func, args, callback=None, error_callback=None):
+        self.stations.append(args[0])
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def start(host, workers):
+    host.workers = [RecordingWorker() for _ in range(workers)]
+    for station in host.stations:
+        station.thread.start()
+    return host
+
+
+def finish(host):
+    """Every process finishes its frame at once."""
+    host.working = [False] * host.processes
+    for station in host.stations:
+        station.busy = False
+
+
+def serve(host, rounds):
+    for _ in range(rounds):
+        time.sleep(0.005)
+        host.dispatch()
+        finish(host)
+    host.close()
+    return [sum(worker.stations.count(station.index) for worker in host.workers)
+            for station in host.stations]
+
+
+def test_a_failed_station_leaves_the_others_running():
+    host = start(KioskHost([BrokenSource(), FrameSource()], processes=1), 1)
+    host.stations[0].thread.join(1.0)
+    for _ in range(5):
+        time.sleep(0.005)
+        assert host.step()
+        finish(host)
+    (index, error), = host.errors()
+    assert index == 1 and isinstance(error, IOError)
+    assert host.stations[0].down and not host.stations[1].down
+    assert set(host.workers[0].stations) == {2}
+    host.close()
+
+
+def test_the_host_stops_when_every_station_has_failed():
+    host = start(KioskHost([BrokenSource(), BrokenSource()], processes=1), 1)
+    for station in host.stations:
+        station.thread.join(1.0)
+    assert not host.step()
+    assert [index for index, _ in host.errors()] == [1, 2]
+    host.close()
+
+
+def test_a_detector_error_frees_its_process():
+    host = start(KioskHost([FrameSource()], processes=1), 1)
+    time.sleep(0.005)
+    host.dispatch()
+    assert host.working == [True]
+    host.stations[0].failed(RuntimeError("detector crashed"))
+    assert not host.step()
+    assert host.working == [False]
+    host.close()
+
+
+def test_stations_stay_on_one_worker():
+    host = start(KioskHost([FrameSource() for _ in range(4)], processes=2), 2)
+    counts = serve(host, 20)
+
+    assert sorted(station.worker for station in host.stations) == [0, 0, 1, 1]
+    for number, worker in enumerate(host.workers):
+        assert set(worker.stations) == {s.index for s in host.stations if s.worker == number}
+    # Its stations take turns
+    assert max(counts) - min(counts) <= 1
+
+
+def test_uneven_stations_get_the_same_rate():
+    # One of the three stations has a process to itself
+    host = start(KioskHost([FrameSource() for _ in range(3)], processes=2), 2)
+    counts = serve(host, 30)
+    assert sorted(station.worker for station in host.stations) == [0, 0, 1]
+    assert min(counts) >= 10 and max(counts) - min(counts) <= 1
+
+
+def test_greedy_keeps_every_process_busy():
+    host = start(KioskHost([FrameSource() for _ in range(3)], processes=2, fair=False), 2)
+    counts = serve(host, 30)
+    alone, = [station.index - 1 for station in host.stations if station.worker == 1]
+    shared = [count for i, count in enumerate(counts) if i != alone]
+    assert counts[alone] >= 25 and max(shared) <= 16 and sum(counts) >= 55
+
+
+def test_a_slow_station_does_not_hold_the_others_back():
+    host = start(KioskHost([FrameSource(), FrameSource()], processes=1), 1)
+    slow = host.stations[1]
+    slow.served = -100          # far behind, as if its camera had paused
+    slow.waiting = False
+    counts = serve(host, 20)
+    assert abs(counts[0] - counts[1]) <= 1
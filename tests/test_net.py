@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from net import MatchServer, NetClient
+
+DELAY = 6
+
+
+async def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out"
+        await asyncio.sleep(0.002)
+
+
+def boards_match(client, core):
+    return all(mirror.board == [list(row) for row in p.board]
+               for mirror, p in zip(client.mirror.players, core.players))
+
+
+async def loopback_match():
+    server = MatchServer(delay=DELAY, seed=5, players=2)
+    port = await server.start('127.0.0.1', 0)
+    one = await NetClient.connect('127.0.0.1', port)
+    two = await NetClient.connect('127.0.0.1', port)
+    assert (one.player, two.player) == (1, 2)
+    assert one.delay == two.delay == DELAY
+    match, = server.matches.values()
+    core = match.core
+
+    await wait_for(lambda: one.mirror.tick > 0 and two.mirror.tick > 0)
+    one.ping()
+    await wait_for(lambda: one.rtt > 0)
+
+    # An input is stamped `delay` ticks ahead of the server's clock, and the
+    # stone doesn't move before then
+    x = core.player(1).x
+    sent_at = core.ticks
+    one.send('left')
+    await wait_for(lambda: match.pending)
+    (tick, inputs), = match.pending.items()
+    assert inputs == [(1, 'left')]
+    assert abs(tick - (sent_at + DELAY)) <= 1
+    await wait_for(lambda: core.ticks >= tick - 1)
+    assert core.player(1).x == x
+    await wait_for(lambda: core.ticks >= tick)
+    assert core.player(1).x == x - 1
+    await wait_for(lambda: one.mirror.player(1).x == x - 1)
+    assert match.late == 0
+
+    # Both mirrors follow the server's boards once a few pieces have locked
+    end = time.monotonic() + 10
+    while core.player(1).pieces < 2 or core.player(2).pieces < 2:
+        assert time.monotonic() < end, "timed out"
+        one.send('drop')
+        two.send('drop')
+        await asyncio.sleep(0.02)
+    await wait_for(lambda: boards_match(one, core) and boards_match(two, core))
+
+    # Leaving tops you out, and the one left standing wins
+    await two.close()
+    await wait_for(lambda: one.done)
+    assert core.player(2).gameover
+    assert one.winner == 1
+    assert server.finished == 1 and not server.matches
+    await one.close()
+    await server.close()
+
+
+def test_loopback_match():
+    asyncio.run(loopback_match())
+
+
+def test_client_clock_includes_one_way_latency():
+    client = NetClient(None, None)
+    client.rtt = 0.1
+    client.saw(600, time.monotonic())
+    # 50 ms one way at 60 ticks/s: the server is 3 ticks further on
+    assert 603 <= client.server_tick() < 604
@@ -0,0 +1,94 @@
+from smoothing import GestureFilter, ENTER, HOLD, RELEASE
+from test_autorepeat import FakeClock
+
+
+def make(clock, **repeats):
+    return GestureFilter(window=5, enter=3, release=2, clock=clock,
+                         repeats=repeats or {'left': (250, 125), 'drop': (125, 62.5)})
+
+
+def feed(gestures, clock, actions, step_ms=31.25):
+    """Events per frame for `actions`, one frame every `step_ms` (exact in binary)."""
+    out = []
+    for action in actions:
+        out.append(gestures.update(action))
+        clock.advance(step_ms)
+    return out
+
+
+def test_enters_after_enough_votes():
+    clock = FakeClock()
+    gestures = make(clock)
+    assert feed(gestures, clock, ['rotate', None, 'rotate']) == [[], [], []]
+    assert gestures.update('rotate') == [(ENTER, 'rotate')]
+    assert gestures.active == 'rotate'
+
+
+def test_single_frame_flicker_is_ignored():
+    clock = FakeClock()
+    gestures = make(clock)
+    assert feed(gestures, clock, ['left', None, None, 'left', None, None]) == [[]] * 6
+    assert gestures.active is None
+
+
+def test_no_repeat_for_actions_without_a_rate():
+    clock = FakeClock()
+    gestures = make(clock)
+    events = feed(gestures, clock, ['garbage'] * 60)
+    assert [e for frame in events for e in frame] == [(ENTER, 'garbage')]
+
+
+def test_held_actions_repeat_on_their_own_schedule():
+    clock = FakeClock()
+    gestures = make(clock)
+    events = feed(gestures, clock, ['drop'] * 13)
+    # Enters on the third frame, then repeats after 4 frames and every 2
+    fired = [(i, e) for i, frame in enumerate(events) for e in frame]
+    assert fired == [(2, (ENTER, 'drop')), (6, (HOLD, 'drop')), (8, (HOLD, 'drop')),
+                     (10, (HOLD, 'drop')), (12, (HOLD, 'drop'))]
+
+    gestures = make(clock)
+    events = feed(gestures, clock, ['left'] * 20)
+    fired = [i for i, frame in enumerate(events) for e in frame if e == (HOLD, 'left')]
+    assert fired == [10, 14, 18]
+
+
+def test_releases_below_the_hysteresis_threshold():
+    clock = FakeClock()
+    gestures = make(clock)
+    feed(gestures, clock, ['drop'] * 5)
+    # Down to 3 then 2 votes of 5: still held
+    assert RELEASE not in [e[0] for e in gestures.update(None) + gestures.update(None)]
+    assert gestures.active == 'drop'
+    # 1 vote left
+    assert gestures.update(None) + gestures.update(None) == [(RELEASE, 'drop')]
+    assert gestures.active is None
+
+
+def test_switches_when_another_action_reaches_enter():
+    clock = FakeClock()
+    gestures = make(clock)
+    feed(gestures, clock, ['left'] * 5)
+    assert feed(gestures, clock, ['right'] * 3) == [[], [], [(RELEASE, 'left'), (ENTER, 'right')]]
+    assert gestures.active == 'right'
+
+
+def test_released_action_starts_a_fresh_schedule():
+    clock = FakeClock()
+    gestures = make(clock)
+    feed(gestures, clock, ['drop'] * 15)
+    feed(gestures, clock, [None] * 5)
+    events = feed(gestures, clock, ['drop'] * 7)
+    # Enters again and waits the full delay before repeating
+    assert [i for i, frame in enumerate(events) for e in frame] == [2, 6]
+
+
+def test_reset_releases_and_forgets():
+    clock = FakeClock()
+    gestures = make(clock)
+    feed(gestures, clock, ['left'] * 4)
+    assert gestures.reset() == [(RELEASE, 'left')]
+    assert gestures.history == [None] * 5 and gestures.pos == 0
+    assert gestures.reset() == []
+    # Needs the full enter votes again
+    assert feed(gestures, clock, ['left'] * 3) == [[], [], [(ENTER, 'left')]]
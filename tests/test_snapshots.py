@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from board import config
+from core import TetrisCore
+from snapshots import SnapshotLog, resume
+
+
+def play(core, ticks, seed):
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        for p in core.players:
+            core.handle(p.number, rng.choice(('left', 'right', 'rotate', 'drop', 'garbage')))
+        core.tick()
+
+
+def fingerprint(core):
+    return (core.ticks, core.routing,
+            [(p.piece, p.rot, p.x, p.y, p.pieces, p.lines, p.garbage, p.incoming,
+              p.gameover, [list(row) for row in p.board]) for p in core.players])
+
+
+def test_resume_restores_routing(tmp_path):
+    path = str(tmp_path / "match.snap")
+    core = TetrisCore(7, players=4, routing='even')
+    log = SnapshotLog(path, core, slots=64)
+    play(core, 300, 1)
+    log.write(core)
+    log.close()
+
+    resumed = TetrisCore(7, players=4, routing='random')
+    assert resume(resumed, path) is not None
+    assert resumed.routing == 'even'
+    play(core, 300, 2)
+    play(resumed, 300, 2)
+    assert fingerprint(resumed) == fingerprint(core)
+
+
+@pytest.mark.parametrize('seed', [-1, 2**64])
+def test_rejects_seeds_that_do_not_round_trip(tmp_path, seed):
+    with pytest.raises(ValueError):
+        SnapshotLog(str(tmp_path / "match.snap"), TetrisCore(seed, players=2))
+
+
+def test_accepts_largest_seed(tmp_path):
+    core = TetrisCore(2**64 - 1, players=2)
+    path = str(tmp_path / "match.snap")
+    log = SnapshotLog(path, core, slots=4)
+    log.write(core)
+    log.close()
+    resumed = TetrisCore(0, players=2)
+    resume(resumed, path)
+    assert resumed.seed == 2**64 - 1
+    assert resumed.routing == config['garbage_routing']
+
+
+def test_new_match_does_not_inherit_the_old_one(tmp_path):
+    path = str(tmp_path / "match.snap")
+    old = TetrisCore(1, players=2)
+    log = SnapshotLog(path, old, slots=64)
+    for _ in range(50):
+        old.tick()
+        log.write(old)
+    log.close()
+
+    # A new match opens the same file and crashes before its first tick
+    SnapshotLog(path, TetrisCore(2, players=2), slots=64).close()
+    assert resume(TetrisCore(2, players=2), path) is None
+
+
+def test_resume_continues_the_ring(tmp_path):
+    path = str(tmp_path / "match.snap")
+    core = TetrisCore(1, players=2)
+    log = SnapshotLog(path, core, slots=64)
+    for _ in range(50):
+        core.tick()
+        log.write(core)
+    log.close()
+
+    resumed = TetrisCore(1, players=2)
+    snap = resume(resumed, path)
+    log = SnapshotLog(path, resumed, slots=64, resume=True)
+    assert snap.tick == 50 and log.written == 50
+    log.close()
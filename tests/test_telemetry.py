@@ -0,0 +1,64 @@
+from batch import play_match
+from board import config
+from core import TetrisCore
+from telemetry import TelemetryLog, summarise, leaderboard
+
+
+def test_finished_and_abandoned_matches(tmp_path):
+    path = str(tmp_path / "matches.jsonl")
+    log = TelemetryLog(path)
+    finished = play_match(1, 0.3, 1000 * config['tick_rate'], 0.1, 2, log)
+
+    quit_early = TetrisCore(2, players=2)
+    recorder = log.match(quit_early, ["ann", "bo"])
+    for _ in range(120):
+        quit_early.tick()
+    recorder.end()
+    recorder.end()                       # only the first end counts
+    log.close()
+
+    done, abandoned = summarise(path)
+    assert done['done'] and not abandoned['done']
+    assert done['winner'] == [n for n, out in enumerate(finished['topout'], 1) if not out][0]
+    assert abandoned['winner'] == 0
+    assert [p['pieces'] for p in done['players']] == finished['pieces']
+    assert [p['sent'] for p in done['players']] == finished['garbage']
+
+    rows = leaderboard([done, abandoned])
+    assert sorted(row['name'] for row in rows) == ["P1", "P2"]
+    assert sum(row['wins'] for row in rows) == 1
+    seconds = finished['ticks'] / float(config['tick_rate'])
+    assert all(abs(row['seconds'] - seconds) < 1e-9 for row in rows)
+
+    everything = leaderboard([done, abandoned], unfinished=True)
+    assert len(everything) == 4
+
+
+def test_nothing_counts_after_the_end(tmp_path):
+    path = str(tmp_path / "matches.jsonl")
+    log = TelemetryLog(path)
+    core = TetrisCore(3, players=2)
+    recorder = log.match(core)
+    for _ in range(120):
+        core.tick()
+    core.player(1).gameover = True
+    recorder.emit('topout', 1)
+    recorder.end()
+    end_tick = core.ticks
+
+    # The survivor keeps playing on until they top out too
+    while not core.player(2).gameover:
+        core.handle(2, 'drop')
+        recorder.inputs([])
+        core.tick()
+    log.close()
+
+    with open(path) as f:
+        assert '"kind":"end"' in f.readlines()[-1]
+    match, = summarise(path)
+    assert match['done'] and match['winner'] == 2
+    assert match['ticks'] == end_tick
+    assert match['players'][1]['topout'] is False
+    assert match['players'][1]['pieces'] == 0
+    row = [row for row in leaderboard([match]) if row['name'] == "P2"][0]
+    assert row['topouts'] == 0 and row['seconds'] == end_tick / float(config['tick_rate'])
@@ -0,0 +1,57 @@
+from timestep import FixedStep
+from test_autorepeat import FakeClock
+
+# 64 steps a second: 15.625 ms, exact in binary
+RATE, STEP_MS = 64, 15.625
+
+
+def test_first_call_only_starts_the_clock():
+    clock = FakeClock()
+    clock.advance(1000)
+    timestep = FixedStep(RATE, clock=clock)
+    assert timestep.advance() == 0
+
+
+def test_whole_steps_and_the_remainder():
+    clock = FakeClock()
+    timestep = FixedStep(RATE, clock=clock)
+    timestep.advance()
+    clock.advance(STEP_MS / 2)
+    assert timestep.advance() == 0
+    assert timestep.alpha == 0.5
+    clock.advance(STEP_MS / 2)
+    assert timestep.advance() == 1
+    assert timestep.alpha == 0.0
+    clock.advance(STEP_MS * 3.25)
+    assert timestep.advance() == 3
+    assert timestep.alpha == 0.25
+
+
+def test_catch_up_is_capped_after_a_stall():
+    clock = FakeClock()
+    timestep = FixedStep(RATE, max_steps=5, clock=clock)
+    timestep.advance()
+    clock.advance(1000)
+    assert timestep.advance() == 5
+    assert timestep.skipped == RATE - 5
+    # The rest of the backlog is dropped, not run later
+    assert timestep.alpha == 0.0
+    clock.advance(STEP_MS)
+    assert timestep.advance() == 1
+    # A backlog at the cap is run in full
+    clock.advance(STEP_MS * 5)
+    assert timestep.advance() == 5
+    assert timestep.skipped == RATE - 5
+
+
+def test_reset_forgets_the_time_that_passed():
+    clock = FakeClock()
+    timestep = FixedStep(RATE, clock=clock)
+    timestep.advance()
+    clock.advance(STEP_MS * 1.5)
+    timestep.reset()
+    clock.advance(STEP_MS * 100)
+    assert timestep.advance() == 0
+    assert timestep.alpha == 0.0 and timestep.skipped == 0
+    clock.advance(STEP_MS)
+    assert timestep.advance() == 1
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Fixed-timestep accumulator.
+#
+# Game logic advances in whole steps of 1/rate seconds however fast or slow
+# frames come in: advance() adds the wall time since the last call to an
+# accumulator and returns how many steps are now due. After a stall the
+# backlog is capped at `max_steps`, so the game catches up a little and then
+# skips the rest instead of spiralling. alpha is how far into the next step
+# the clock is (0..1), for anything that wants to draw between steps.
+#
+# Headless code doesn't need one of these at all: call TetrisCore.tick() as
+# fast as it likes and it simulates the same 1/rate seconds per call.
+
+import time
+
+
+class FixedStep:
+    def __init__(self, rate=60, max_steps=5, clock=time.monotonic):
+        self.step      = 1.0 / rate
+        self.max_steps = max_steps
+        self.clock     = clock
+        self.last      = None
+        self.acc       = 0.0
+        self.skipped   = 0   # steps dropped after stalls
+
+    def advance(self):
+        """Number of logic steps to run this frame."""
+        now = self.clock()
+        if self.last is not None:
+            self.acc += now - self.last
+        self.last = now
+        steps = int(self.acc / self.step)
+        if steps > self.max_steps:
+            self.skipped += steps - self.max_steps
+            steps = self.max_steps
+            self.acc = 0.0
+        else:
+            self.acc -= steps * self.step
+        return steps
+
+    def reset(self):
+        """Forget the time that passed, e.g. after a pause or a long load."""
+        self.last = None
+        self.acc = 0.0
+
+    @property
+    def alpha(self):
+        return self.acc / self.step
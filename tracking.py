@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Per-player hand tracking.
+#
+# Every player keeps the box around their hand from the last frame and gets
+# a detector of their own (max_num_hands=1) that only ever sees that padded
+# crop. Full-frame detection is the fallback for players whose hand was lost:
+# immediately after a crop comes up empty, then every `search_every` frames
+# while someone else is still tracked (every frame when nobody is).
+#
+# Identity sticks to the hand, not to a half of the frame: new hands go to
+# the lost player whose hand was last seen closest, and players who were
+# never seen are anchored at their side of the frame. assign() applies the
+# same matching to landmarks that did not come from detect(), e.g. a replay.
+
+import cv2
+import numpy as np
+
+from gestures import landmarks_to_array, hand_centers
+
+
+def side_players(hands):
+    """(N,) player index by frame half: left is player 0, right is player 1."""
+    return (hand_centers(hands) >= 0.5).astype(np.int8)
+
+
+def _center(hand):
+    return hand[:, :2].mean(axis=0)
+
+
+class PlayerTracker:
+    def __init__(self, players=2, make_detector=None, pad=0.6, search_every=5):
+        self.players      = players
+        self.pad          = pad           # box padding, as a fraction of hand size
+        self.search_every = search_every
+        self.detectors    = [make_detector(1) for _ in range(players)] if make_detector else None
+
+        self.boxes   = [None] * players   # normalised (x0, y0, x1, y1) or None when lost
+        self.centers = [np.array([(p + 0.5) / players, 0.5]) for p in range(players)]
+        self.since_search = 0
+
+        # Counters
+        self.crops    = 0
+        self.searches = 0
+        self.lost     = 0
+
+    # --------------------------------------------------------------
+    # Detection
+    # --------------------------------------------------------------
+    def detect(self, frame, full_detector, scale=1.0):
+        """Landmarks (N, 21, 3) in full-frame coordinates, plus (N,) players."""
+        h, w = frame.shape[:2]
+        found = [None] * self.players
+
+        retry = False
+        for p, box in enumerate(self.boxes):
+            if box is None:
+                continue
+            x0, y0, x1, y1 = box
+            crop = frame[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+            self.crops += 1
+            hands = self._run(self.detectors[p], crop, scale)
+            if len(hands):
+                found[p] = self._restore(hands[0], box)
+            else:
+                # Left its box: look for it in the whole frame straight away
+                self.boxes[p] = None
+                self.lost += 1
+                retry = True
+
+        missing = [p for p in range(self.players) if found[p] is None]
+        self.since_search += 1
+        if missing and (retry or len(missing) == self.players
+                        or self.since_search >= self.search_every):
+            self.since_search = 0
+            self.searches += 1
+            hands = [hand for hand in self._run(full_detector, frame, scale)
+                     if not any(f is not None and self._same(hand, f) for f in found)]
+            for p, i in self._match(hands, missing):
+                found[p] = hands[i]
+
+        hands = [hand for hand in found if hand is not None]
+        players = [p for p, hand in enumerate(found) if hand is not None]
+        self._update(found)
+        if not hands:
+            return landmarks_to_array(None), np.empty(0, np.int8)
+        return np.stack(hands).astype(np.float32), np.array(players, np.int8)
+
+    def assign(self, hands):
+        """(N,) players for landmarks detected elsewhere; -1 for extra hands."""
+        owners = np.full(len(hands), -1, np.int8)
+        found = [None] * self.players
+        for p, i in self._match(list(hands), range(self.players)):
+            owners[i] = p
+            found[p] = hands[i]
+        self._update(found)
+        return owners
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+    def _run(self, detector, image, scale):
+        if image.shape[0] < 16 or image.shape[1] < 16:
+            return landmarks_to_array(None)
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return landmarks_to_array(detector.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+
+    @staticmethod
+    def _restore(hand, box):
+        x0, y0, x1, y1 = box
+        hand = hand.copy()
+        hand[:, 0] = x0 + hand[:, 0] * (x1 - x0)
+        hand[:, 1] = y0 + hand[:, 1] * (y1 - y0)
+        return hand
+
+    @staticmethod
+    def _same(a, b):
+        return np.abs(_center(a) - _center(b)).max() < 0.05
+
+    def _match(self, hands, players):
+        """Greedy nearest (player, hand index) pairs against last known positions."""
+        pairs = sorted((float(np.linalg.norm(_center(hand) - self.centers[p])), i, p)
+                       for i, hand in enumerate(hands) for p in players)
+        used_hands, used_players, out = set(), set(), []
+        for _, i, p in pairs:
+            if i in used_hands or p in used_players:
+                continue
+            used_hands.add(i)
+            used_players.add(p)
+            out.append((p, i))
+        return out
+
+    def _box(self, hand):
+        lo = hand[:, :2].min(axis=0)
+        hi = hand[:, :2].max(axis=0)
+        pad = (hi - lo).max() * self.pad
+        x0, y0 = np.clip(lo - pad, 0.0, 1.0)
+        x1, y1 = np.clip(hi + pad, 0.0, 1.0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+    def _update(self, found):
+        for p, hand in enumerate(found):
+            if hand is None:
+                continue
+            self.centers[p] = _center(hand)
+            if self.detectors is not None:
+                self.boxes[p] = self._box(hand)
+
+    def stats(self):
+        return "Tracker: %d crop detections, %d full-frame searches, %d times lost" % (
+            self.crops, self.searches, self.lost)
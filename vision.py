@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+# Background capture + Mediapipe inference.
+#
+# Reading the camera and running the hand detector are by far the slowest
+# parts of a frame, so they live on their own thread. The game loop only
+# picks up the newest finished result; anything it was too slow to see is
+# overwritten and counted as dropped.
+#
+# Frames come from a capture source (see capture.py): the camera, or a
+# recording whose stored landmarks skip the detector entirely. An optional
+# InferenceGovernor (governor.py) shrinks, crops or skips detector work when
+# it cannot keep up, and an optional PlayerTracker (tracking.py) detects each
+# player's hand in its own crop and keeps player identity across frames.
+
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from gestures import landmarks_to_array, HAND_CONNECTIONS
+from profiler import NULL_PROFILER
+from tracking import side_players
+
+
+# ------------------------------------------------------------------
+# LATEST-VALUE SLOT
+# ------------------------------------------------------------------
+class LatestSlot:
+    """Holds only the newest value. put() overwrites, take() empties."""
+
+    def __init__(self):
+        # deque.append / deque.popleft are atomic, so producer and consumer
+        # never need a lock. maxlen=1 silently discards the stale value.
+        self._slot = deque(maxlen=1)
+        self.published = 0   # only written by the producer
+        self.consumed  = 0   # only written by the consumer
+
+    def put(self, value):
+        self._slot.append(value)
+        self.published += 1
+
+    def take(self):
+        try:
+            value = self._slot.popleft()
+        except IndexError:
+            return None
+        self.consumed += 1
+        return value
+
+    @property
+    def ready(self):
+        return bool(self._slot)
+
+    @property
+    def dropped(self):
+        return self.published - self.consumed - len(self._slot)
+
+
+# ------------------------------------------------------------------
+# VISION WORKER
+# ------------------------------------------------------------------
+class VisionWorker(threading.Thread):
+    """Pulls frames from a source and runs the hand detector as fast as it can."""
+
+    def __init__(self, source, hands_detector=None, recorder=None,
+                 profiler=NULL_PROFILER, governor=None, tracker=None):
+        super().__init__(daemon=True)
+        self.profiler = profiler
+        self.source = source
+        self.hands_detector = hands_detector
+        self.governor = governor
+        self.tracker = tracker
+        self.players = side_players(landmarks_to_array(None))
+        self.recorder = recorder
+        self.results = LatestSlot()
+        self.running = True
+        self.error = None
+
+    def run(self):
+        prof = self.profiler
+        while self.running:
+            lap = prof.clock()
+            item = self.source.read()
+            if item is None:
+                self.error = "No more frames from %s" % self.source.name
+                break
+            lap = prof.lap('capture', lap)
+            t, frame, hands = item
+            if hands is None:
+                hands, players = self.detect(t, frame, lap)
+            else:
+                players = None
+            if players is None:
+                players = (self.tracker.assign(hands) if self.tracker is not None
+                           else side_players(hands))
+            self.players = players
+            if self.recorder is not None:
+                self.recorder.write(t, hands, frame)
+            self.results.put((t, frame, hands, players))
+
+    def detect(self, t, frame, lap):
+        """(hands, players) for a frame; players is None if not yet known."""
+        prof = self.profiler
+        governor = self.governor
+        tracker = self.tracker
+        if governor is not None and not governor.should_detect():
+            hands = governor.predict(t)
+            prof.lap('predict', lap)
+            return hands, self.players
+
+        start = time.monotonic()
+        if tracker is not None and tracker.detectors is not None:
+            scale = governor.scale if governor is not None else 1.0
+            hands, players = tracker.detect(frame, self.hands_detector, scale)
+            if governor is not None:
+                governor.update(t, hands, time.monotonic() - start)
+            prof.lap('inference', lap)
+            return hands, players
+
+        if governor is None:
+            image, roi = frame, None
+        else:
+            image, roi = governor.prepare(frame)
+            lap = prof.lap('prepare', lap)
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        lap = prof.lap('convert', lap)
+        results = self.hands_detector.process(image_rgb)
+        lap = prof.lap('inference', lap)
+        hands = landmarks_to_array(results)
+        if governor is not None:
+            hands = governor.restore(hands, roi)
+            governor.update(t, hands, time.monotonic() - start, roi)
+        prof.lap('landmarks', lap)
+        return hands, None
+
+    def poll(self):
+        """Newest (timestamp, frame, hands, players), or None if nothing new is ready.
+
+        `hands` is the (N, 21, 3) landmark array and `players` the (N,) player
+        index of each hand (-1 for a hand nobody owns); `frame` may be None
+        when replaying a recording without frames.
+        """
+        return self.results.take()
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=1.0)
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def stats(self):
+        text = "Vision frames: %d consumed, %d dropped" % (
+            self.results.consumed, self.results.dropped)
+        if self.governor is not None:
+            text += "\n" + self.governor.stats()
+        if self.tracker is not None:
+            text += "\n" + self.tracker.stats()
+        return text
+
+
+def draw_hands(frame, hands):
+    """Draw landmark arrays onto a BGR debug frame."""
+    h, w = frame.shape[:2]
+    for hand in hands:
+        points = [(int(x * w), int(y * h)) for x, y, _ in hand]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(frame, points[a], points[b], (255, 255, 255), 1)
+        for point in points:
+            cv2.circle(frame, point, 2, (0, 0, 255), -1)